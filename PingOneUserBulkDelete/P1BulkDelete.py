@@ -1,33 +1,55 @@
 # PingOne Bulk Delete Tool
-# Last Update: July 31, 2025
+# Last Update: October 19, 2026
 # Authors: Jeremy Carrier
 
 import requests
 import os
-import base64
-from ratelimit import limits, sleep_and_retry
+import sys
+import argparse
+import configparser
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import glob
+import json
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import re
 import pwinput
-from datetime import datetime, timedelta
-
-logFormat = logging.Formatter("%(asctime)s - %(message)s")
-
-# Setup info logging
-handler = logging.FileHandler("P1UserDelete.log")
-handler.setFormatter(logFormat)
+from datetime import datetime
+
+# Make the shared pingoneutilities package importable when run from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pingoneutilities.logpipeline import addLoggingArguments, startLogging
+from pingoneutilities.governor import addGovernorArguments, startGovernor
+from pingoneutilities.p1http import createSession, attachReport
+from pingoneutilities.runreport import RunReport, defaultReportName
+from pingoneutilities.profiling import addProfilingArguments, finishProfiling, spans, startProfiling
+from pingoneutilities.jsoncodec import decodeResponse
+from pingoneutilities.journal import JournalError, readJournal
+from pingoneutilities.auth import P1ApiError, TokenManager, requestToken
+from pingoneutilities.dashboard import Dashboard
+from pingoneutilities.scan import PartitionedScanner, balancedPartitions, countUsers, getUserPage, listPopulations, scanUsers, usersUrl
+from pingoneutilities.archive import ArchiveWriter
+from pingoneutilities.credpool import CredentialPool, CredentialPoolError, readClientSections
+from pingoneutilities.criteria import CriteriaError, compileCriteria, localAttributes, pageEvaluator
+from pingoneutilities.snapshot import DeleteWatermark, SnapshotError, SnapshotReader, SnapshotWriter, readProgress
+
+# Log files are attached to these loggers by startLogging() in main()
 infoLogger = logging.getLogger("mainLog")
 infoLogger.setLevel(logging.INFO)
-infoLogger.addHandler(handler)
-
-# Setup error logging
-handler = logging.FileHandler("P1UserDeleteFailuresDetail.log")
-handler.setFormatter(logFormat)
 detailedFailureLogger = logging.getLogger("dFLog")
 detailedFailureLogger.setLevel(logging.ERROR)
-detailedFailureLogger.addHandler(handler)
+
+# Usernames shown in a dry run
+previewSampleSize = 10
+
+guidPattern = r"^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+
+# All PingOne API calls share one pooled session so connections are reused across the delete threads
+p1Session = createSession(poolSize=100)
 
 def printWelcome(version):
     #######
@@ -119,117 +141,48 @@ def getP1ClientSecret():
     print(f'')
     return getClientSecret
 
-def convertCreds(p1ClientId, p1ClientSecret):
-    # *********
-    # Converts the client ID and secret to a base64-encoded string for HTTP Basic Auth.
-    # *********
-    credString = p1ClientId + ":" + p1ClientSecret
-    credBytes = credString.encode("ascii")
-    b64CredBytes = base64.b64encode(credBytes)
-    b64CredString = b64CredBytes.decode("ascii") 
-    return b64CredString
-
-def performClientTestBasic(p1ClientId, p1ClientSecret, p1Geography, p1Environment):
+def performClientTest(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType):
     # *********
-    # Attempts to authenticate with PingOne using the provided credentials using BASIC auth.
+    # Attempts to authenticate with PingOne using the provided credentials and client type (basic or post).
+    # Returns (True, access token) or (False, "").
     # *********
-    requestHeaders = ""
+    authName = p1ClientType.upper()
 
     print(f'')
-    print(f'Checking client credentials with PingOne - attempting BASIC auth.')
+    print(f'Checking client credentials with PingOne - attempting {authName} auth.')
     print(f'')
 
-    # Call P1 token endpoint to get an access token with basic encoding
-    p1CredsB64 = convertCreds(p1ClientId, p1ClientSecret)
-    requestHeaders = {}
-    requestHeaders['Authorization'] = 'Basic ' + p1CredsB64
-    requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-    requestBody = {'grant_type':'client_credentials'}
-
-
     try:
-        hostCheckResult = requests.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token",headers=requestHeaders,data=requestBody)
-        if hostCheckResult.status_code == 200:
-            print(f"Client connection validated with BASIC auth.")
-            print(f'')
-            infoLogger.info(f"Successfully connected to PingOne client with BASIC auth.")
-            return True, hostCheckResult.json()['access_token']
-        else:
-            print(f'')
-            print(f"****************************************************")
-            print(f"Failed to connect to PingOne client with BASIC auth.")
-            print(f"****************************************************")
-            print(f'')
-            return False,""
-    except requests.exceptions.RequestException:
+        p1At = requestToken(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+    except (P1ApiError, requests.exceptions.RequestException):
+        failureMessage = f"Failed to connect to PingOne client with {authName} auth."
         print(f'')
-        print(f"****************************************************")
-        print(f"Failed to connect to PingOne client with BASIC auth.")
-        print(f"****************************************************")
+        print("*" * len(failureMessage))
+        print(failureMessage)
+        print("*" * len(failureMessage))
         print(f'')
-        return False,""
-
-def performClientTestPost(p1ClientId, p1ClientSecret, p1Geography, p1Environment):
-    # *********
-    # Attempts to authenticate with PingOne using the provided credentials using POST auth.
-    # *********
-    requestHeaders = ""
+        return False, ""
 
+    print(f"Client connection validated with {authName} auth.")
     print(f'')
-    print(f'Checking client credentials with PingOne - attempting POST auth.')
-    print(f'')
-
-    # Call p1 token endpoint to get an access token with post encoding
-    requestHeaders = {}
-    requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-    requestBody = {}
-    requestBody['client_id'] = p1ClientId
-    requestBody['client_secret'] = p1ClientSecret
-    requestBody['grant_type'] = 'client_credentials'
-
-    try:
-        hostCheckResult = requests.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token",headers=requestHeaders,data=requestBody)
-        if hostCheckResult.status_code == 200:
-            print(f"Client connection validated with POST auth.")
-            print(f'')
-            infoLogger.info(f"Successfully connected to PingOne client with POST auth.")
-            return True, hostCheckResult.json()['access_token']
-        else:
-            print(f'')
-            print(f'***************************************************')
-            print(f"Failed to connect to PingOne client with POST auth.")
-            print(f'***************************************************')
-            print(f'')
-            return False,""
-    except requests.exceptions.RequestException:
-        print(f'')
-        print(f'***************************************************')
-        print(f"Failed to connect to PingOne client with POST auth.")
-        print(f'***************************************************')
-        print(f'')  
-        return False, ""
+    infoLogger.info(f"Successfully connected to PingOne client with {authName} auth.")
+    return True, p1At
 
 def getP1ClientType(p1ClientId, p1ClientSecret, p1Geography, p1Environment):
     # *********
     # Tries to determine client type (basic or post)
     # *********
 
-    # Try basic
-    tryBasic, p1At = performClientTestBasic(p1ClientId, p1ClientSecret, p1Geography, p1Environment)
+    for p1ClientType in ("basic", "post"):
+        clientTest, p1At = performClientTest(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+        if clientTest == True:
+            return p1ClientType, p1At
 
-    if tryBasic == True:
-        return "basic", p1At
-    else:
-        # Try post
-        tryPost, p1At = performClientTestPost(p1ClientId, p1ClientSecret, p1Geography, p1Environment)
-        if tryPost == True:
-            return "post", p1At
-        else:
-            print(f'')
-            print(f'**************************************************************************************************************************************')
-            print(f'Error: Failed to connect to client with both BASIC and POST.  Please re-enter client details and ensure your worker client is enabled.')
-            print(f'**************************************************************************************************************************************')
-            return "failed",""
+    print(f'')
+    print(f'**************************************************************************************************************************************')
+    print(f'Error: Failed to connect to client with both BASIC and POST.  Please re-enter client details and ensure your worker client is enabled.')
+    print(f'**************************************************************************************************************************************')
+    return "failed",""
 
 def getTokenRefreshDuration():
     # *********
@@ -270,19 +223,13 @@ def getDeleteType():
     print(f'2) Delete users in a group in the PingOne environment')
     print(f'3) Delete users whose last login time was before a certain date')
     print(f'4) Delete users who have not completed an account verification within a certain number of days of account creation')
+    print(f'5) Delete users listed in a file (usernames, email addresses or user IDs)')
+    print(f'6) Delete users matching criteria (any combination of group, population, status, creation and last login)')
     print(f'')
 
-    deleteType = input(f'Please choose from the list above: ')
-
-    if not deleteType:
-        print(f'')
-        print(f'*****************************************************************')
-        print(f"Invalid selection, please retry.")
-        print(f'*****************************************************************')
-        print(f'')
-        deleteType = getDeleteType()
+    deleteType = input(f'Please choose from the list above: ').strip()
 
-    if deleteType in ['1', '2', '3', '4']:
+    if deleteType in ['1', '2', '3', '4', '5', '6']:
         return deleteType
     else:
         print(f'')
@@ -290,7 +237,7 @@ def getDeleteType():
         print(f"Invalid selection, please retry.")
         print(f'*****************************************************************')
         print(f'')
-        deleteType = getDeleteType()
+        return getDeleteType()
 
 def getGroupSelection(p1At, p1Environment, p1Geography, guidFormat):
     ######
@@ -305,7 +252,7 @@ def getGroupSelection(p1At, p1Environment, p1Geography, guidFormat):
     requestUrl = f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/groups"
 
     try:
-        response = requests.get(requestUrl, headers=requestHeaders)
+        response = p1Session.get(requestUrl, headers=requestHeaders)
         if response.status_code == 200:
             responseJson = response.json()
             groups = responseJson['_embedded']['groups']
@@ -363,31 +310,12 @@ def getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType
     infoLogger.info(f"Getting access token from PingOne at {tokenTime}.")
     print(f'')
 
-    if p1ClientType == "basic":
-        p1CredsB64 = convertCreds(p1ClientId, p1ClientSecret)
-        requestHeaders = {}
-        requestHeaders['Authorization'] = 'Basic ' + p1CredsB64
-        requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-        requestBody = {}
-        requestBody['grant_type'] = 'client_credentials'
-
-    if p1ClientType == "post":
-        requestHeaders = {}
-        requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-        requestBody = {}
-        requestBody['client_id'] = p1ClientId
-        requestBody['client_secret'] = p1ClientSecret
-        requestBody['grant_type'] = 'client_credentials'
-
     try:
-        response = requests.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token", headers=requestHeaders, data=requestBody)
-        if response.status_code == 200:
-            responseJson = response.json()
-            return responseJson['access_token'], tokenTime
-        else:
-            print(f'Error getting access token: {response.status_code} - {response.text}')
-            infoLogger.error(f"Error getting access token: {response.status_code} - {response.text}")   
-            quit()
+        return requestToken(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType), tokenTime
+    except P1ApiError as e:
+        print(f'{e}')
+        infoLogger.error(f"{e}")
+        quit()
     except requests.exceptions.RequestException as e:
         print(f'Error connecting to PingOne: {e}')
         infoLogger.error(f"Error connecting to PingOne: {e}")
@@ -402,7 +330,8 @@ def getExistingUsercount(p1At, p1Environment, p1Geography):
     requestHeaders['Authorization'] = "Bearer " + p1At
 
     try: 
-        getCurrentUsers = requests.get(f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users",headers=requestHeaders)
+        # Only the count is needed - ask for a one user page
+        getCurrentUsers = p1Session.get(f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users",headers=requestHeaders,params={'limit': 1, 'attributes': "id"})
 
         if getCurrentUsers.status_code == 200:
             currentUserCount = getCurrentUsers.json()['count']
@@ -454,7 +383,7 @@ def getLastLoginTimeSelection():
         try:
             lastYear, lastMonth, lastDay = map(int, fullDate.split('-'))
             # Validate the date
-            datetime.datetime(lastYear, lastMonth, lastDay)
+            datetime(lastYear, lastMonth, lastDay)
             print(f'')
             print(f'Date validated: {lastYear}-{lastMonth:02d}-{lastDay:02d}.')
             print(f'')
@@ -470,11 +399,11 @@ def getLastLoginTimeSelection():
         except ValueError:
             print(f'')
             print(f'Invalid date format or date does not exist.')
-            lastDay, lastMonth, lastYear = getLastLoginTimeSelection()
+            return getLastLoginTimeSelection()
     else:
         print(f'')
         print(f'Invalid date format.')
-        lastDay, lastMonth, lastYear = getLastLoginTimeSelection()
+        return getLastLoginTimeSelection()
 
 def getCreateSelection():
     ######
@@ -496,28 +425,34 @@ def getCreateSelection():
     infoLogger.info(f"User verification check will be performed for accounts created more than {numDays} days ago.")
     return numDays
 
-def getUsers(p1At, p1Environment, p1Geography, cursor, filter):    
+def getUsers(p1At, p1Environment, p1Geography, cursor, filter, pageSize=1000, attributes=None):
     ######
     # Get page of users in PingOne Environment
+    # Only the first request carries the filter, page size and attributes - the next page cursor repeats them
     ######
 
     requestHeaders = {}
     requestHeaders['Authorization'] = "Bearer " + p1At
     requestHeaders['Content-Type'] = 'application/json'
     requestUrl = f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users"
+    requestParams = {'limit': pageSize}
     if filter != "":
-        requestUrl += f"?filter={filter}"
-    
+        requestParams['filter'] = filter
+    if attributes:
+        requestParams['attributes'] = ",".join(attributes)
+
     if cursor is not None:
         requestUrl = cursor
+        requestParams = None
 
     try:
-        response = requests.get(requestUrl, headers=requestHeaders)
+        response = p1Session.get(requestUrl, headers=requestHeaders, params=requestParams)
         if response.status_code == 200:
             print(f"User page retrieved.")
             print(f'')
             infoLogger.info(f"User page retrieved.")
-            responseJson = response.json()
+            with spans.span("parse"):
+                responseJson = decodeResponse(response)
             users = responseJson['_embedded']['users']
             if '_links' in responseJson:
                 if 'next' in responseJson['_links']:
@@ -546,13 +481,16 @@ def deleteUser(user, p1Geography, p1Environment, p1At,):
     try:
         userId = user['id']
         deleteUrl = f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users/{userId}"
-        response = requests.delete(deleteUrl, headers=requestHeaders)
+        response = p1Session.delete(deleteUrl, headers=requestHeaders)
         
         if response.status_code == 204:
-            infoLogger.info(f"User {userId} deleted successfully.")
+            infoLogger.info(f"User {userId} deleted successfully.", extra={"p1": {"event": "userDeleted", "userId": userId, "success": True}})
+            return True
+        elif response.status_code == 404:
+            infoLogger.info(f"User {userId} was already deleted.", extra={"p1": {"event": "userAlreadyDeleted", "userId": userId, "success": True}})
             return True
         else:
-            infoLogger.error(f"Error deleting user {userId}")
+            infoLogger.error(f"Error deleting user {userId}", extra={"p1": {"event": "deleteFailed", "userId": userId, "status": response.status_code}})
             detailedFailureLogger.error(f"Failed to delete user {userId}: {response.status_code} - {response.text}")
             return False
     except requests.exceptions.RequestException as e:
@@ -560,67 +498,511 @@ def deleteUser(user, p1Geography, p1Environment, p1At,):
         infoLogger.error(f"Error connecting to PingOne: {e}")
         quit()
 
-def deleteUserByLoginDate(user, p1Geography, p1Environment, p1At, msTime, neverLogged):
+def chooseServerFilter(p1At, p1Environment, p1Geography, candidateFilters):
     ######
-    # Deletes a user in PingOne Environment
+    # Use the first filter PingOne accepts - anything it cannot express is left to the local check
+    # Returns None if PingOne accepts none of them and an empty filter is not among the candidates
+    ######
+
+    requestHeaders = {}
+    requestHeaders['Authorization'] = "Bearer " + p1At
+    requestUrl = f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users"
+
+    for candidateFilter in candidateFilters:
+        if candidateFilter == "":
+            break
+        try:
+            response = p1Session.get(requestUrl, headers=requestHeaders, params={'filter': candidateFilter, 'limit': 1})
+        except requests.exceptions.RequestException as e:
+            print(f'Error connecting to PingOne: {e}')
+            infoLogger.error(f"Error connecting to PingOne: {e}")
+            quit()
+        if response.status_code == 200:
+            print(f'Users will be selected by PingOne with the filter: {candidateFilter} ({response.json().get("count", "unknown")} matching users)')
+            infoLogger.info(f"Using server filter: {candidateFilter}")
+            print(f'')
+            return candidateFilter
+        infoLogger.info(f"Server filter not supported ({response.status_code}): {candidateFilter}")
+
+    if "" not in candidateFilters:
+        return None
+    print(f'PingOne cannot filter on these criteria - every user will be read and checked.')
+    infoLogger.info(f"No server filter supported - checking every user locally")
+    print(f'')
+    return ""
+
+def resolveCriteriaName(tokenManager, kind, name):
+    ######
+    # ID of the group or population with this name, or None
     ######
+    try:
+        if kind == "population":
+            for population in listPopulations(p1Session, tokenManager):
+                if population.get('name', "").lower() == name.lower():
+                    return population['id']
+            return None
+        response = p1Session.get(tokenManager.apiUrl("/groups"), headers=tokenManager.authHeaders(), params={'filter': f'name eq "{name}"'})
+    except (P1ApiError, requests.exceptions.RequestException) as e:
+        print(f'Error looking up {kind} {name}: {e}')
+        infoLogger.error(f"Error looking up {kind} {name}: {e}")
+        quit()
+    if response.status_code != 200:
+        print(f'Error looking up group {name}: {response.status_code} - {response.text}')
+        infoLogger.error(f"Error looking up group {name}: {response.status_code} - {response.text}")
+        quit()
+    groups = response.json().get('_embedded', {}).get('groups', [])
+    return groups[0]['id'] if groups else None
 
-    userHasLogged = False
-    shouldDelete = False
-    userLastLogin = 0
+def getCriteriaExpression(tokenManager):
+    ######
+    # Prompts for delete criteria and checks they compile
+    ######
 
-    if 'lastSignOn' in user:
-        userHasLogged = True
-        userDatePart = user['lastSignOn']['at'][0:10]
-        dateTime = datetime.strptime(userDatePart, '%Y-%m-%d')
-        dateTimeMs = int(dateTime.timestamp() * 1000)
+    print(f'')
+    print(f'Enter the criteria for the users to delete.  Conditions can be joined with and, or, not and parentheses:')
+    print(f'  group = NAME|ID, population = NAME|ID, status = STATUS (each also with !=)')
+    print(f'  created before|after DATE, lastSignOn before|after DATE, lastSignOn never')
+    print(f'DATE is YYYY-MM-DD (UTC) or a number of days ago, such as 90d.  For example:')
+    print(f'  group = "Contractors" and lastSignOn never and created before 90d')
+    criteriaText = input(f'Criteria: ').strip()
+    try:
+        compileCriteria(criteriaText, lambda kind, name: resolveCriteriaName(tokenManager, kind, name))
+    except CriteriaError as e:
+        print(f'')
+        print(f'*****************************************************************')
+        print(f'{e}, please retry.')
+        print(f'*****************************************************************')
+        return getCriteriaExpression(tokenManager)
+    print(f'')
+    return criteriaText
 
-    if (neverLogged == True) and (userHasLogged == False):
-        shouldDelete = True
+def chooseCriteriaPlan(p1At, p1Environment, p1Geography, criteria):
+    ######
+    # Send PingOne the largest part of the criteria it accepts as a filter and check the rest locally
+    # Returns the server filter, the page selector (None when the filter is exact) and the attributes the selector reads
+    ######
 
-    if (neverLogged == False) and (userHasLogged):
-        if msTime < dateTimeMs:
-            shouldDelete = True
+    plans = criteria.plans()
+    filter = chooseServerFilter(p1At, p1Environment, p1Geography, [planFilter for planFilter, localConditions in plans])
+    for planFilter, localConditions in plans:
+        if planFilter == filter:
+            return filter, pageEvaluator(localConditions), localAttributes(localConditions)
 
-    if shouldDelete == True:
-        # User should be deleted
-        infoLogger.info(f"DELETING: user {user['username']} ({user['id']}).")
-        deletingUser = deleteUser(user, p1Geography, p1Environment, p1At)
-        return True
-    else:
-        # User should not be deleted
-        infoLogger.info(f"SKIPPING: user {user['username']} ({user['id']}) does not meet delete criteria.")
-        return False
+    print(f'Error: PingOne did not accept the group conditions in the criteria as a filter.')
+    infoLogger.error(f"Error: PingOne did not accept a filter for the group conditions in: {criteria.text}")
+    quit()
 
-def deleteUserByVerifyDate(user, p1Geography, p1Environment, p1At, msTime):
+def selectUserPages(pages, pageSelector, selection):
     ######
-    # Deletes a user in PingOne Environment
+    # Generator - keep the users of each page that meet the criteria, counting the others in selection['skipped']
     ######
+    for page in pages:
+        with spans.span("select"):
+            selectedUsers = pageSelector(page)
+        selectedIds = {user['id'] for user in selectedUsers}
+        for user in page:
+            if user['id'] in selectedIds:
+                infoLogger.info(f"DELETING: user {user.get('username', '')} ({user['id']}) meets the delete criteria.", extra={"p1": {"event": "userSelected", "userId": user['id'], "success": True}})
+            else:
+                infoLogger.info(f"SKIPPING: user {user.get('username', '')} ({user['id']}) does not meet the delete criteria.", extra={"p1": {"event": "userSkipped", "userId": user['id'], "success": True}})
+        selection['skipped'] += len(page) - len(selectedUsers)
+        yield selectedUsers
 
-    userStatusUnverified = False
-    shouldDelete = False
+def getListFile():
+    ######
+    # Prompts for the file of users to delete
+    ######
 
-    if user['lifecycle']['status'] == 'VERIFICATION_REQUIRED':
-        userStatusUnverified = True
-        createDatePart = user['createdAt'][0:10]
-        createDateTime = datetime.strptime(createDatePart, '%Y-%m-%d')
-        createDateTimeMs = int(createDateTime.timestamp() * 1000)
-        if createDateTimeMs < msTime:
-            infoLogger.info(f"DELETING: User {user['id']} is in VERIFICATION_REQUIRED status and created before {msTime}.")
-            deletingUser = deleteUser(user, p1Geography, p1Environment, p1At)
-            #########DO DELETE#########
-            return True
+    print(f'')
+    print(f'The file should hold one username, email address or user ID per line.  For a CSV file the first column is used.')
+    listFile = input(f'Enter the path of the file: ').strip()
+    if os.path.isfile(listFile):
+        print(f'')
+        return listFile
+    print(f'')
+    print(f'*****************************************************************')
+    print(f"File not found, please retry.")
+    print(f'*****************************************************************')
+    return getListFile()
+
+def readIdentifiers(listFile):
+    ######
+    # Generator - stream the identifiers from a text or CSV file, skipping blanks, duplicates and a header row
+    ######
+    seen = set()
+    with open(listFile, "r", newline="", encoding="utf-8-sig") as identifierFile:
+        for rowNumber, row in enumerate(csv.reader(identifierFile)):
+            if not row:
+                continue
+            identifier = row[0].strip()
+            if not identifier or (rowNumber == 0 and identifier.lower() in ("username", "email", "id", "userid")):
+                continue
+            if identifier.lower() in seen:
+                continue
+            seen.add(identifier.lower())
+            yield identifier
+
+def identifierFilter(identifiers):
+    ######
+    # One filter matching any of the identifiers - by ID, username, or email for values that look like one
+    ######
+    clauses = []
+    for identifier in identifiers:
+        quoted = identifier.replace('\\', '\\\\').replace('"', '\\"')
+        if re.match(guidPattern, identifier):
+            clauses.append(f'id eq "{quoted.lower()}"')
         else:
-            infoLogger.info(f"SKIPPING: User {user['id']} is in VERIFICATION_REQUIRED status but created after {msTime}.")
-    else:
-        infoLogger.info(f"SKIPPING: User {user['id']} is not in VERIFICATION_REQUIRED status.")
-        return False
+            clauses.append(f'username eq "{quoted}"')
+            if "@" in identifier:
+                clauses.append(f'email eq "{quoted}"')
+    return " or ".join(clauses)
+
+def resolveIdentifiers(identifiers, users):
+    ######
+    # Match the users a filter returned back to the identifiers
+    # Returns the users to delete and [(identifier, reason)] for the identifiers that cannot be deleted
+    ######
+    byId = {user['id'].lower(): user for user in users}
+    byUsername = {user.get('username', '').lower(): user for user in users}
+    byEmail = {}
+    for user in users:
+        if user.get('email'):
+            byEmail.setdefault(user['email'].lower(), []).append(user)
+
+    matchedUsers = {}
+    unresolved = []
+    for identifier in identifiers:
+        key = identifier.lower()
+        if key in byId:
+            matchedUsers[byId[key]['id']] = byId[key]
+        elif key in byUsername:
+            matchedUsers[byUsername[key]['id']] = byUsername[key]
+        elif len(byEmail.get(key, [])) == 1:
+            matchedUsers[byEmail[key][0]['id']] = byEmail[key][0]
+        elif key in byEmail:
+            unresolved.append((identifier, f"email address is shared by {len(byEmail[key])} users"))
+        else:
+            unresolved.append((identifier, "not found"))
+    return list(matchedUsers.values()), unresolved
+
+def listPages(listFile, tokenManager, unresolvedUsers, batchSize=40, attributes=("id", "username", "email")):
+    ######
+    # Generator - resolve the listed identifiers to users, many per request, and yield them a batch at a time
+    # Identifiers that cannot be resolved are added to unresolvedUsers as (identifier, reason)
+    ######
+    batch = []
+    for identifier in itertools.chain(readIdentifiers(listFile), [None]):
+        if identifier is not None:
+            batch.append(identifier)
+            if len(batch) < batchSize:
+                continue
+        if not batch:
+            break
+        users = []
+        for page in scanUsers(p1Session, tokenManager, usersUrl(tokenManager, identifierFilter(batch), 1000, attributes)):
+            users.extend(page)
+        matchedUsers, unresolved = resolveIdentifiers(batch, users)
+        unresolvedUsers.extend(unresolved)
+        for identifier, reason in unresolved:
+            infoLogger.info(f"Not deleting {identifier}: {reason}", extra={"p1": {"event": "userNotFound", "username": identifier}})
+        batch = []
+        yield matchedUsers
+
+def writeNotFound(unresolvedUsers):
+    ######
+    # Write the listed users that were not deleted to a CSV file
+    ######
+    notFoundFile = f"P1UserDeleteNotFound-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv"
+    with open(notFoundFile, "w", newline="", encoding="utf-8") as notFoundHandle:
+        notFoundWriter = csv.writer(notFoundHandle)
+        notFoundWriter.writerow(["identifier", "reason"])
+        notFoundWriter.writerows(unresolvedUsers)
+    print(f'{len(unresolvedUsers)} listed users could not be resolved and were not deleted - see {notFoundFile}')
+    print(f'')
+
+def userPages(tokenManager, p1Environment, p1Geography, filter, pageSize=1000, attributes=None):
+    ######
+    # Generator - yield each page of users matching the filter
+    ######
+    cursor = None
+    while cursor != "":
+        currentUserList, cursor, readCount = getUsers(tokenManager.getToken(), p1Environment, p1Geography, cursor, filter, pageSize, attributes)
+        yield currentUserList
 
-def printEnding(startTime, endTime):
+def partitionedUserPages(tokenManager, filter, pageSize, attributes, scanParallel, splitSize):
+    ######
+    # Generator - page one cursor chain per population (large populations split by creation date)
+    # concurrently, merged into one stream of pages
+    ######
+    try:
+        partitions = balancedPartitions(p1Session, tokenManager, filter, splitSize)
+        print(f'Reading users from {len(partitions)} partition(s), up to {scanParallel} at a time.')
+        infoLogger.info(f"Reading users from {len(partitions)} partition(s), up to {scanParallel} at a time.")
+        scanner = PartitionedScanner(p1Session, tokenManager, partitions, pageSize, attributes, scanParallel)
+        for partitionName, users in scanner.pages():
+            yield users
+    except (P1ApiError, requests.exceptions.RequestException) as e:
+        print(f'Error getting users: {e}')
+        infoLogger.error(f"Error getting users: {e}")
+        quit()
+
+def runDeletePipeline(pages, userAction, runReport, workers=100, prefetchPages=4, dashboard=None):
+    ######
+    # A producer thread reads pages ahead into a bounded queue while the delete workers drain it
+    # continuously - there is no wait for the slowest delete on a page before the next page is used
+    # Returns the processed, succeeded, failed and skipped counts
+    ######
+
+    pageQueue = queue.Queue(maxsize=prefetchPages)
+    if dashboard is not None:
+        dashboard.setGauge("queueDepth", pageQueue.qsize)
+    inFlight = threading.BoundedSemaphore(workers * 2)
+    countLock = threading.Lock()
+    counts = {"processed": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+
+    def producePages():
+        try:
+            for page in pages:
+                pageQueue.put(page)
+            pageQueue.put(None)
+        except BaseException as e:
+            # getUsers quits on errors, which only ends this thread - hand the error to the main thread
+            pageQueue.put(e)
+
+    def userDone(thread):
+        inFlight.release()
+        try:
+            threadResult = thread.result()
+        except BaseException as e:
+            print(f"Thread generated an exception: {e}")
+            infoLogger.error(f"Error: Thread generated an exception: {e}")
+            threadResult = False
+        with countLock:
+            counts["processed"] += 1
+            if threadResult == True:
+                counts["succeeded"] += 1
+            elif threadResult is None:
+                counts["skipped"] += 1
+            else:
+                counts["failed"] += 1
+        runReport.recordRows(1)
+
+    producer = threading.Thread(target=producePages, name="P1PageProducer", daemon=True)
+    producer.start()
+
+    pageError = None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            page = pageQueue.get()
+            if page is None:
+                break
+            if isinstance(page, BaseException):
+                pageError = page
+                break
+            for user in page:
+                # Bounds the users queued in the pool so memory stays flat however fast pages arrive
+                inFlight.acquire()
+                executor.submit(userAction, user).add_done_callback(userDone)
+            with countLock:
+                print(f"Processed: {counts['processed']} - deleted: {counts['succeeded']}, failed: {counts['failed']}, skipped: {counts['skipped']}")
+
+    print(f"Processed: {counts['processed']} - deleted: {counts['succeeded']}, failed: {counts['failed']}, skipped: {counts['skipped']}")
+    infoLogger.info(f"Processed: {counts['processed']} - deleted: {counts['succeeded']}, failed: {counts['failed']}, skipped: {counts['skipped']}")
+    print(f'')
+    if pageError is not None:
+        print(f'Error reading users: {pageError}')
+        infoLogger.error(f"Error reading users: {pageError}")
+    return counts["processed"], counts["succeeded"], counts["failed"], counts["skipped"]
+
+def openArchive(archiveFile):
+    ######
+    # Open the archive that every deleted user's record is written to before it is deleted
+    ######
+
+    try:
+        archiveWriter = ArchiveWriter(archiveFile)
+    except OSError as e:
+        print(f'Error creating archive file {archiveFile}: {e}')
+        infoLogger.error(f"Error creating archive file {archiveFile}: {e}")
+        quit()
+
+    print(f'The record of every user deleted will be archived in: {archiveFile}')
+    infoLogger.info(f"Deleted users will be archived in: {archiveFile}")
+    print(f'')
+    return archiveWriter
+
+def archivePages(pages, archiveWriter, pageSelector=None):
+    ######
+    # Generator - archive the selected users of each page before the page is passed on to be deleted
+    ######
+    for page in pages:
+        with spans.span("archive"):
+            archiveWriter.addPage(page if pageSelector is None else pageSelector(page))
+        yield page
+
+def writeSnapshot(snapshotFile, p1Environment, pages, pageSelector):
+    ######
+    # Snapshot phase one - record the ID of every user that meets the criteria, deleting nothing,
+    # so the scan pages through a collection that is not changing underneath it
+    # Returns the number of users selected and a sample of their usernames
+    ######
+
+    try:
+        snapshotWriter = SnapshotWriter(snapshotFile, p1Environment)
+    except OSError as e:
+        print(f'Error creating snapshot file {snapshotFile}: {e}')
+        infoLogger.error(f"Error creating snapshot file {snapshotFile}: {e}")
+        quit()
+
+    print(f'Reading the users to delete into the snapshot file {snapshotFile}.')
+    infoLogger.info(f"Reading the users to delete into the snapshot file {snapshotFile}.")
+    scanned = 0
+    sampleUsers = []
+    for page in pages:
+        selectedUsers = page if pageSelector is None else pageSelector(page)
+        snapshotWriter.add([user['id'] for user in selectedUsers])
+        sampleUsers.extend(user.get('username', user['id']) for user in selectedUsers[:previewSampleSize - len(sampleUsers)])
+        scanned += len(page)
+        print(f"Scanned: {scanned} - selected: {snapshotWriter.count}")
+    snapshotWriter.complete()
+
+    print(f'Snapshot complete - {snapshotWriter.count} users selected.')
+    infoLogger.info(f"Snapshot complete - {snapshotWriter.count} users selected from {scanned} scanned.")
+    print(f'')
+    return snapshotWriter.count, sampleUsers
+
+def openSnapshot(snapshotFile, p1Environment):
+    ######
+    # Snapshot phase two - open the ID list and find where an earlier run stopped
+    ######
+
+    try:
+        snapshotReader = SnapshotReader(snapshotFile)
+        snapshotStart = readProgress(snapshotFile)
+    except (OSError, ValueError, SnapshotError) as e:
+        print(f'Error reading snapshot file {snapshotFile}: {e}')
+        infoLogger.error(f"Error reading snapshot file {snapshotFile}: {e}")
+        quit()
+
+    if snapshotReader.p1Environment != p1Environment.lower():
+        print(f'Error: Snapshot file {snapshotFile} was written for environment {snapshotReader.p1Environment}, not {p1Environment}.')
+        infoLogger.error(f"Error: Snapshot file {snapshotFile} was written for environment {snapshotReader.p1Environment}, not {p1Environment}.")
+        quit()
+
+    snapshotStart = min(snapshotStart, snapshotReader.count)
+    print(f'{snapshotReader.count - snapshotStart} of the {snapshotReader.count} users in {snapshotFile} remain to be deleted.')
+    infoLogger.info(f"Snapshot {snapshotFile} resumes at position {snapshotStart} of {snapshotReader.count}.")
+    print(f'')
+    return snapshotReader, snapshotStart
+
+def snapshotPages(snapshotReader, watermark, snapshotStart, chunkSize):
+    ######
+    # Generator - yield the snapshot IDs in chunks, each user tagged with its chunk for the watermark
+    ######
+    for chunkStart, userIds in snapshotReader.chunks(snapshotStart, chunkSize):
+        watermark.chunkStarted(chunkStart, len(userIds))
+        yield [{'id': userId, 'snapshotChunk': chunkStart} for userId in userIds]
+
+def deleteSnapshotUser(user, watermark, p1Geography, p1Environment, tokenManager):
+    ######
+    # Delete one user from the snapshot and record the result against its chunk
+    # A failed delete, or a call that raises, keeps the watermark before its chunk, so a resumed run retries it
+    ######
+    deleteResult = deleteUser(user, p1Geography, p1Environment, tokenManager.getToken())
+    watermark.userDone(user['snapshotChunk'], deleteResult == True)
+    return deleteResult
+
+def readRollbackJournal(journalFile, p1Environment):
+    ######
+    # Open the journal of users created by an import run and check it belongs to this environment
+    ######
+
+    try:
+        journalEnvironment, journalChunks = readJournal(journalFile)
+    except (OSError, JournalError) as e:
+        print(f'Error reading journal file {journalFile}: {e}')
+        infoLogger.error(f"Error reading journal file {journalFile}: {e}")
+        quit()
+
+    if journalEnvironment != p1Environment.lower():
+        print(f'Error: Journal file {journalFile} was written for environment {journalEnvironment}, not {p1Environment}.')
+        infoLogger.error(f"Error: Journal file {journalFile} was written for environment {journalEnvironment}, not {p1Environment}.")
+        quit()
+
+    print(f'Rolling back the users created by the import run recorded in {journalFile}.')
+    infoLogger.info(f"Rolling back the users created by the import run recorded in {journalFile}.")
+    print(f'')
+    return journalChunks
+
+def countMatches(tokenManager, filter):
+    ######
+    # Count-only query - one call with a small projected page returns the exact match count and a sample
+    ######
+    try:
+        users, nextUrl, matchCount = getUserPage(p1Session, tokenManager, usersUrl(tokenManager, filter, previewSampleSize, ["id", "username"]))
+    except (P1ApiError, requests.exceptions.RequestException) as e:
+        print(f'Error counting users: {e}')
+        infoLogger.error(f"Error counting users: {e}")
+        quit()
+    return matchCount if matchCount is not None else len(users), [user.get('username', user['id']) for user in users]
+
+def estimateDeleteRate(defaultRate):
+    ######
+    # Delete rate to base the estimate on - the most recent run report in the working directory
+    # that deleted users, otherwise the call rate limit
+    # Returns users per second and where the figure came from
+    ######
+    for reportFile in sorted(glob.glob("P1UserDeleteReport-*.json"), reverse=True):
+        try:
+            with open(reportFile, "r", encoding="utf-8") as reportHandle:
+                report = json.load(reportHandle)
+        except (OSError, ValueError):
+            continue
+        if report.get('totals', {}).get('dryRun') or not report.get('totals', {}).get('succeeded'):
+            continue
+        if report.get('rowsPerSecond'):
+            return min(float(report['rowsPerSecond']), defaultRate), f"measured in {reportFile}"
+    return float(defaultRate), "the call rate limit"
+
+def formatDuration(seconds):
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes}m {seconds}s"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+def printPreview(matchCount, sampleUsers, deleteRate, rateSource, cacheFile):
+    ######
+    # Print the dry run result - nothing has been deleted
+    ######
+
+    print(f'')
+    print(f'Dry run - no users were deleted.')
+    print(f'Users that would be deleted: {matchCount}')
+    if sampleUsers:
+        print(f'For example: {", ".join(sampleUsers)}')
+    print(f'Estimated time to delete: {formatDuration(matchCount / deleteRate if deleteRate else 0)} at {deleteRate:.0f} users per second ({rateSource})')
+    if cacheFile:
+        print(f'The selected user IDs are saved in {cacheFile}.  To delete exactly these users without scanning again, run:')
+        print(f'  python P1BulkDelete.py --snapshot {cacheFile}')
+    print(f'')
+    infoLogger.info(f"Dry run: {matchCount} users would be deleted, estimated {formatDuration(matchCount / deleteRate if deleteRate else 0)} at {deleteRate:.0f} users per second ({rateSource})")
+
+def printEnding(startTime, endTime, runReport, reportFile, profiler=None):
     #######
-    # Print the ending message
+    # Print the ending message and write the run report
     #######
 
+    profileLines = finishProfiling(profiler, runReport)
+    if profileLines:
+        print(f'Profile - where the time went:')
+        for line in profileLines:
+            print(f'  {line}')
+            infoLogger.info(f"Profile - {line}")
+        print(f'')
+
     print(f'PingOne User Delete Utility - Ending')
     print(f'')
     infoLogger.info(f"Ending delete tool: {endTime}")
@@ -629,6 +1011,62 @@ def printEnding(startTime, endTime):
     print(f'Total time taken: {totalTime} ms')
     infoLogger.info(f"Total time taken: {totalTime} ms")
 
+    try:
+        runReport.write(reportFile)
+        print(f'Run report written to: {reportFile}')
+        infoLogger.info(f"Run report written to: {reportFile}")
+    except OSError as e:
+        print(f'Error writing run report {reportFile}: {e}')
+        infoLogger.error(f"Error writing run report {reportFile}: {e}")
+
+def openCredentialPool(poolFile, p1ClientId, p1ClientSecret, p1ClientType, p1Geography, p1Environment, tokenRefresh, clientRate):
+    ######
+    # Spread calls across the client entered at the prompts and the worker clients in poolFile
+    ######
+
+    try:
+        configFile = configparser.ConfigParser()
+        if not configFile.read(poolFile):
+            raise CredentialPoolError(f"Cannot read {poolFile}")
+        clients = [{"name": "prompted", "clientId": p1ClientId, "clientSecret": p1ClientSecret, "clientType": p1ClientType, "rate": clientRate}]
+        clients += readClientSections(configFile, p1ClientType, clientRate)
+        credentialPool = CredentialPool(p1Session, clients, p1Geography, p1Environment, int(tokenRefresh))
+        credentialPool.validate()
+    except (configparser.Error, CredentialPoolError) as e:
+        print(f'Error in the client pool file {poolFile}: {e}')
+        infoLogger.error(f"Error in the client pool file {poolFile}: {e}")
+        quit()
+
+    print(f'Calls will be spread across {len(clients)} worker clients: {", ".join(client["name"] for client in clients)}.')
+    infoLogger.info(f"Calls will be spread across {len(clients)} worker clients: {', '.join(client['name'] for client in clients)}.")
+    print(f'')
+    return credentialPool
+
+def parseArguments():
+    #######
+    # Parse the command line options
+    #######
+
+    parser = argparse.ArgumentParser(description="PingOne User Delete Utility")
+    parser.add_argument("--report", help="File name for the JSON run report (default: P1UserDeleteReport-<timestamp>.json)")
+    parser.add_argument("--rollback", metavar="JOURNAL", help="Delete the users created by the import run recorded in this journal file")
+    parser.add_argument("--list", metavar="FILE", help="Delete the users listed in FILE (usernames, email addresses or user IDs) - skips the delete type prompt")
+    parser.add_argument("--criteria", metavar="EXPRESSION", help='Delete the users matching EXPRESSION, for example: group = "Contractors" and lastSignOn never - skips the delete type prompt')
+    parser.add_argument("--partition", choices=["population", "none"], default="population", help="Read one cursor per population in parallel (default) or a single cursor")
+    parser.add_argument("--parallel", type=int, default=8, help="Maximum partitions read at the same time (default: 8)")
+    parser.add_argument("--split-size", type=int, default=250000, help="Split populations with more users than this into creation date ranges (default: 250000, 0 to never split)")
+    parser.add_argument("--page-size", type=int, default=1000, help="Users read per page (default and PingOne maximum: 1000)")
+    parser.add_argument("--archive", metavar="FILE", help="Write the full record of every user to FILE (gzipped JSON lines) before deleting it - restore with UserImport.py --restore FILE")
+    parser.add_argument("--dashboard", action="store_true", help="Show a live dashboard of the delete rate, status codes, in-flight calls and ETA")
+    parser.add_argument("--dry-run", action="store_true", help="Show how many users would be deleted, a sample of them and the estimated time, without deleting any")
+    parser.add_argument("--client-pool", metavar="FILE", help="Spread calls across the worker clients in the [Client:NAME] sections of FILE as well as the one entered at the prompts")
+    parser.add_argument("--client-rate", type=float, default=0, help="With --client-pool, maximum calls per second for each client unless its section sets a rate (default: 0, no limit)")
+    parser.add_argument("--snapshot", metavar="FILE", help="Record the IDs of the users to delete in FILE before deleting any - if FILE already exists, resume deleting from it")
+    addLoggingArguments(parser)
+    addGovernorArguments(parser)
+    addProfilingArguments(parser)
+    return parser.parse_args()
+
 def main():
 
     version = "0.1"
@@ -645,25 +1083,37 @@ def main():
     p1At = ""
     startTime = 0
     lastTokenTime = 0
-    nextToken = 0
     totalProcessed = 0
     currentUserCount = 0
     successfulDelete = 0
     failedDelete = 0
-    executor = ThreadPoolExecutor(max_workers=100)
+    skippedDelete = 0
     deleteType = ""
-    currentUserList = []
-    cursor = None
-    readCount = 0
     totalProcessed = 0
     filter = ""
-    specialFilter = False
     lastYear = 0
     lastMonth = 0
     lastDay = 0
-    understandDuration = False
     numDaysSinceCreate = 0
-    
+
+    args = parseArguments()
+    if args.rollback and args.snapshot:
+        print(f'Error: --rollback and --snapshot cannot be used together.')
+        quit()
+    if len([option for option in [args.rollback, args.list, args.criteria] if option]) > 1:
+        print(f'Error: only one of --rollback, --list and --criteria can be used.')
+        quit()
+    if (args.list or args.criteria) and args.snapshot and os.path.isfile(args.snapshot):
+        print(f'Error: the snapshot {args.snapshot} already exists.  Run without --list or --criteria to carry on deleting from it, or name a new snapshot file.')
+        quit()
+    if args.archive and (args.rollback or (args.snapshot and os.path.isfile(args.snapshot))):
+        print(f'Error: --archive needs the user records read by a scan - it cannot be used with --rollback or when resuming a snapshot.')
+        quit()
+    startLogging(args, [(infoLogger, "P1UserDelete.log"), (detailedFailureLogger, "P1UserDeleteFailuresDetail.log")])
+    profiler = startProfiling(args, [infoLogger, detailedFailureLogger])
+    runReport = RunReport("PingOne User Delete", version)
+    attachReport(p1Session, runReport)
+    reportFile = args.report if args.report else defaultReportName("P1UserDeleteReport")
     startTime = printWelcome(version)
     while (p1ClientTest == False) and \
           (p1ClientType == "failed"):
@@ -674,131 +1124,177 @@ def main():
         p1ClientType, p1At = getP1ClientType(p1ClientId, p1ClientSecret, p1Geography, p1Environment)
         if (p1ClientType != "failed"):
             tokenRefresh = getTokenRefreshDuration()
-    deleteType = getDeleteType()
+    # Every call from here on is limited by the environment's shared governor
+    startGovernor(args, p1Session, p1Environment, "P1BulkDelete")
+    if args.rollback:
+        # Rollback deletes by ID straight from the journal - the delete criteria and user scan are not needed
+        deleteType = "rollback"
+        journalChunks = readRollbackJournal(args.rollback, p1Environment)
+    elif args.list:
+        deleteType = '5'
+    elif args.criteria:
+        deleteType = '6'
+    elif args.snapshot and os.path.isfile(args.snapshot):
+        # The users were selected by an earlier run - carry on deleting from the snapshot
+        deleteType = "snapshot"
+    else:
+        deleteType = getDeleteType()
     p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
-    nextToken = lastTokenTime + (int(tokenRefresh) * 60 * 1000)
     currentUserCount = getExistingUsercount(p1At, p1Environment, p1Geography)
 
+    # Every page and delete call takes the current token from here, so the producer and workers share one refresh
+    tokenManager = TokenManager(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, int(tokenRefresh))
+    credentialPool = None
+    if args.client_pool:
+        # The pool takes the token manager's place - each call uses the least loaded client that is not throttled
+        credentialPool = openCredentialPool(args.client_pool, p1ClientId, p1ClientSecret, p1ClientType, p1Geography, p1Environment, tokenRefresh, args.client_rate)
+        tokenManager = credentialPool
+
+    pageSelector = None
+    criteriaText = ""
+    # Each delete type reads only the attributes it needs to select and log the users
+    scanAttributes = ["id", "username"]
     match deleteType:
         # All P1
         case '1':
             filter = ""
-            specialFilter = False
+            userAction = lambda user: deleteUser(user, p1Geography, p1Environment, tokenManager.getToken())
         # P1 Group
         case '2':
             groupId = getGroupSelection(p1At, p1Environment, p1Geography, guidFormat)
             filter = f'memberOfGroups[id eq "{groupId}"]'
-            specialFilter = False
+            userAction = lambda user: deleteUser(user, p1Geography, p1Environment, tokenManager.getToken())
         # P1 Last Login Date or never logged in
         case '3':
-            understandDuration = printDurationWarning()
-            if understandDuration == True:
-                # get date, get users who match, include users who have never logged in
-                lastDay, lastMonth, lastYear, neverLogged = getLastLoginTimeSelection()
-                dateObject = datetime.datetime(lastYear, lastMonth, lastDay, 0, 0, 0)
-                msTime = dateObject.timestamp() * 1000
-                print(f'')
-                specialFilter = True
-                try:
-                    while cursor != "":
-                        currentUserList, cursor, readCount = getUsers(p1At, p1Environment, p1Geography, cursor, "")
-                        print(cursor)
-                        currentTime = int(time.time() * 1000)
-                        if currentTime > nextToken:
-                            p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
-                            nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
-                        threads = []
-                        for user in currentUserList:
-                            thread = executor.submit(deleteUserByLoginDate, user, p1Geography, p1Environment, p1At, msTime, neverLogged)
-                            threads.append(thread)
-                        for thread in as_completed(threads):
-                            try:
-                                threadResult = thread.result()
-                                if threadResult == True:
-                                    successfulDelete += 1
-                                else:
-                                    failedDelete += 1
-                            except Exception as e:
-                                print(f"Thread generated an exception: {e}")
-                                infoLogger.error(f"Error: Thread generated an exception: {e}")
-                        totalProcessed += readCount
-                except Exception as e:
-                    print(f'Error deleting users: {e}')
-                    infoLogger.error(f"Error deleting users: {e}")
-                    quit()
+            if not args.dry_run:
+                printDurationWarning()
+            # get date, get users who match, include users who have never logged in
+            lastDay, lastMonth, lastYear, neverLogged = getLastLoginTimeSelection()
+            criteriaText = f"lastSignOn before {lastYear}-{lastMonth:02d}-{lastDay:02d}"
+            if neverLogged:
+                criteriaText += " or lastSignOn never"
         case '4':
             # Get the number of days since account creation to check for verification
             numDaysSinceCreate = int(getCreateSelection())
-            today = datetime.now()
-            past_date = today - timedelta(days=numDaysSinceCreate)
-            msTime = past_date.timestamp() * 1000
-            print(f'')
-            specialFilter = True
-            try:
-                while cursor != "":
-                    currentUserList, cursor, readCount = getUsers(p1At, p1Environment, p1Geography, cursor, "")
-                    #print(cursor)
-                    currentTime = int(time.time() * 1000)
-                    if currentTime > nextToken:
-                        p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
-                        nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
-                    threads = []
-                    for user in currentUserList:
-                        thread = executor.submit(deleteUserByVerifyDate, user, p1Geography, p1Environment, p1At, msTime)
-                        threads.append(thread)
-                    for thread in as_completed(threads):
-                        try:
-                            threadResult = thread.result()
-                            if threadResult == True:
-                                successfulDelete += 1
-                            else:
-                                failedDelete += 1
-                        except Exception as e:
-                            print(f"Thread generated an exception: {e}")
-                            infoLogger.error(f"Error: Thread generated an exception: {e}")
-                    totalProcessed += readCount
-            except Exception as e:
-                print(f'Error deleting users: {e}')
-                infoLogger.error(f"Error deleting users: {e}")
-                quit()
-        case _:
-            print(f'')
-            print(f'*****************************************************************')
-            print(f"Invalid selection, please retry.")
-            print(f'*****************************************************************')
-            print(f'')
-
-    if specialFilter == False:
+            criteriaText = f"status = VERIFICATION_REQUIRED and created before {numDaysSinceCreate}d"
+        # Users listed in a file
+        case '5':
+            listFile = args.list if args.list else getListFile()
+            filter = ""
+            unresolvedUsers = []
+            userAction = lambda user: deleteUser(user, p1Geography, p1Environment, tokenManager.getToken())
+        # Any combination of criteria
+        case '6':
+            criteriaText = args.criteria if args.criteria else getCriteriaExpression(tokenManager)
+        case 'rollback':
+            userAction = lambda user: deleteUser(user, p1Geography, p1Environment, tokenManager.getToken())
+
+    if criteriaText:
         try:
-            while cursor != "":
-                currentUserList, cursor, readCount = getUsers(p1At, p1Environment, p1Geography, cursor, filter)
-                print(cursor)
-                currentTime = int(time.time() * 1000)
-                if currentTime > nextToken:
-                    p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
-                    nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
-                threads = []
-                for user in currentUserList:
-                    thread = executor.submit(deleteUser, user, p1Geography, p1Environment, p1At)
-                    threads.append(thread)
-                for thread in as_completed(threads):
-                    try:
-                        threadResult = thread.result()
-                        if threadResult == True:
-                            successfulDelete += 1
-                        else:
-                            failedDelete += 1
-                    except Exception as e:
-                        print(f"Thread generated an exception: {e}")
-                        infoLogger.error(f"Error: Thread generated an exception: {e}")
-                totalProcessed += readCount
-        except Exception as e:
-            print(f'Error deleting users: {e}')
-            infoLogger.error(f"Error deleting users: {e}")
+            criteria = compileCriteria(criteriaText, lambda kind, name: resolveCriteriaName(tokenManager, kind, name))
+        except CriteriaError as e:
+            print(f'Error in the delete criteria: {e}')
+            infoLogger.error(f"Error in the delete criteria: {e}")
             quit()
+        print(f'Delete criteria: {criteriaText}')
+        infoLogger.info(f"Delete criteria: {criteriaText}")
+        filter, pageSelector, localAttributeNames = chooseCriteriaPlan(p1At, p1Environment, p1Geography, criteria)
+        scanAttributes = ["id", "username"] + localAttributeNames
+        userAction = lambda user: deleteUser(user, p1Geography, p1Environment, tokenManager.getToken())
+
+    archiveWriter = None
+    if args.archive and not args.dry_run:
+        # The archive holds the whole record, so the scan reads every attribute - no other call is needed
+        scanAttributes = None
+        archiveWriter = openArchive(args.archive)
+
+    if deleteType == '5':
+        selectedPages = listPages(listFile, tokenManager, unresolvedUsers, attributes=scanAttributes)
+    elif args.partition == "population":
+        selectedPages = partitionedUserPages(tokenManager, filter, args.page_size, scanAttributes, args.parallel, args.split_size)
+    else:
+        selectedPages = userPages(tokenManager, p1Environment, p1Geography, filter, args.page_size, scanAttributes)
+    if args.dry_run:
+        # Count exactly and cheaply: a count-only query where the server filter is exact, otherwise
+        # a scan that caches the selected IDs as a snapshot the confirmed run can delete from
+        cacheFile = None
+        if deleteType == 'snapshot':
+            snapshotReader, snapshotStart = openSnapshot(args.snapshot, p1Environment)
+            matchCount, sampleUsers = snapshotReader.count - snapshotStart, []
+            snapshotReader.close()
+        elif deleteType == 'rollback':
+            matchCount, sampleUsers = 0, []
+            for journalChunk in journalChunks:
+                matchCount += len(journalChunk)
+                sampleUsers.extend(username for userId, username in journalChunk[:previewSampleSize - len(sampleUsers)])
+        elif deleteType in ['1', '2', '3', '4', '6'] and pageSelector is None and not args.snapshot:
+            matchCount, sampleUsers = countMatches(tokenManager, filter)
+        else:
+            cacheFile = args.snapshot if args.snapshot else f"P1UserDeletePreview-{datetime.now().strftime('%Y%m%d-%H%M%S')}.p1s"
+            matchCount, sampleUsers = writeSnapshot(cacheFile, p1Environment, selectedPages, pageSelector)
+        if deleteType == '5' and unresolvedUsers:
+            writeNotFound(unresolvedUsers)
+        deleteRate, rateSource = estimateDeleteRate(args.rate)
+        printPreview(matchCount, sampleUsers, deleteRate, rateSource, cacheFile)
+
+        endTime = int(time.time() * 1000)
+        runReport.setTotals(dryRun=True, wouldDelete=matchCount, estimatedSeconds=round(matchCount / deleteRate, 1) if deleteRate else None, existingUsers=currentUserCount, serverFilter=filter, criteria=criteriaText, pageSize=args.page_size, scanAttributes=scanAttributes, partition=args.partition)
+        printEnding(startTime, endTime, runReport, reportFile, profiler)
+        return
+
+    selection = {'skipped': 0}
+    if args.snapshot:
+        if deleteType != 'snapshot':
+            if archiveWriter is not None:
+                selectedPages = archivePages(selectedPages, archiveWriter, pageSelector)
+            writeSnapshot(args.snapshot, p1Environment, selectedPages, pageSelector)
+        snapshotReader, snapshotStart = openSnapshot(args.snapshot, p1Environment)
+        watermark = DeleteWatermark(args.snapshot, snapshotStart, 1000)
+        pages = snapshotPages(snapshotReader, watermark, snapshotStart, 1000)
+        userAction = lambda user: deleteSnapshotUser(user, watermark, p1Geography, p1Environment, tokenManager)
+    elif deleteType == 'rollback':
+        pages = ([{'id': userId} for userId, username in journalChunk] for journalChunk in journalChunks)
+    elif pageSelector is not None:
+        pages = selectUserPages(selectedPages, pageSelector, selection)
+    else:
+        pages = selectedPages
+    if archiveWriter is not None and not args.snapshot:
+        pages = archivePages(pages, archiveWriter)
+    dashboard = None
+    if args.dashboard:
+        dashboard = Dashboard("PingOne User Delete", runReport, p1Session)
+        dashboard.setGauge("tokenAge", tokenManager.tokenAgeSeconds)
+        if args.snapshot:
+            dashboard.setTotal(snapshotReader.count - snapshotStart)
+        elif deleteType == '1':
+            dashboard.setTotal(currentUserCount)
+        elif pageSelector is None and deleteType in ['2', '3', '4', '6']:
+            dashboard.setTotal(countUsers(p1Session, tokenManager, filter))
+        dashboard.start()
+    totalProcessed, successfulDelete, failedDelete, skippedDelete = runDeletePipeline(pages, userAction, runReport, dashboard=dashboard)
+    if dashboard is not None:
+        dashboard.stop()
+    totalProcessed += selection['skipped']
+    skippedDelete += selection['skipped']
+    if deleteType == '5' and unresolvedUsers:
+        writeNotFound(unresolvedUsers)
+    if args.snapshot and watermark.failed > 0:
+        print(f'{watermark.failed} users in the snapshot could not be deleted.  To retry them, run the tool again with --snapshot {args.snapshot}')
+        infoLogger.warning(f"{watermark.failed} snapshot users could not be deleted - the progress of {args.snapshot} stops at position {watermark.position}")
+        print(f'')
+    if archiveWriter is not None:
+        archiveWriter.close()
+        print(f'{archiveWriter.count} user records archived in {archiveWriter.fileName}.  To restore them, run: UserImport.py --restore {archiveWriter.fileName}')
+        infoLogger.info(f"{archiveWriter.count} user records archived in {archiveWriter.fileName}")
+        print(f'')
+        runReport.setTotals(archived=archiveWriter.count)
 
-    endTime = int(time.time() * 1000)
-    printEnding(startTime, endTime)
+    if credentialPool is not None:
+        runReport.setTotals(clients=credentialPool.stats())
 
-main()
+    endTime = int(time.time() * 1000)
+    runReport.setTotals(processed=totalProcessed, succeeded=successfulDelete, failed=failedDelete, skipped=skippedDelete, existingUsers=currentUserCount, serverFilter=filter, criteria=criteriaText, pageSize=args.page_size, scanAttributes=scanAttributes, partition=args.partition)
+    printEnding(startTime, endTime, runReport, reportFile, profiler)
 
+if __name__ == "__main__":
+    main()
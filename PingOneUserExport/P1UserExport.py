@@ -0,0 +1,306 @@
+# PingOne User Export Tool
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+
+import os
+import sys
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import time
+
+# Make the shared pingoneutilities package importable when run from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pingoneutilities.logpipeline import addLoggingArguments, startLogging
+from pingoneutilities.governor import addGovernorArguments, startGovernor
+from pingoneutilities.p1http import createSession, attachReport
+from pingoneutilities.runreport import RunReport, defaultReportName
+from pingoneutilities.prompts import getP1Connection
+from pingoneutilities.scan import PartitionedScanner, balancedPartitions
+from pingoneutilities.schema import listUserAttributes
+from pingoneutilities.payload import flattenUser
+from pingoneutilities.jsoncodec import encodeBody
+
+# Log files are attached to this logger by startLogging() in main()
+infoLogger = logging.getLogger("mainLog")
+infoLogger.setLevel(logging.INFO)
+
+# Read-only attributes that are not part of the schema but are useful in an export
+systemAttributes = ["id", "createdAt", "updatedAt", "lifecycle.status", "lastSignOn.at", "population.id"]
+
+def printWelcome(version):
+    #######
+    # Print the welcome message
+    #######
+
+    startTime = int(time.time() * 1000)
+
+    print(f'')
+    print(f'********************************************')
+    print(f'PingOne User Export Utility - version {version}')
+    print(f'********************************************')
+    print(f'')
+    print(f'Actions will be written to the log file P1UserExport.log')
+    print(f'')
+    print(f'This tool will walk you through the export.  You will need the following:')
+    print(f'1) Your PingOne Environment ID')
+    print(f'2) Your PingOne Geography')
+    print(f'3) A PingOne Worker Client ID and Client Secret')
+    print(f'')
+
+    infoLogger.info(f"PingOne User Export Utility - version {version}")
+    infoLogger.info(f"Starting export tool: {startTime}")
+
+    return startTime
+
+def formatCsvValue(value):
+    #######
+    # Format one attribute value for a CSV cell the way the import tool reads it back
+    #######
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+class CsvExportWriter:
+    #######
+    # Gzipped CSV, one column per dotted attribute name
+    #######
+
+    def __init__(self, fileName, columns):
+        self.columns = columns
+        self.exportFile = io.TextIOWrapper(gzip.open(fileName, "wb", compresslevel=6), encoding="utf-8", newline="")
+        self.csvWriter = csv.writer(self.exportFile)
+        self.csvWriter.writerow(columns)
+
+    def write(self, users):
+        columns = self.columns
+        rows = []
+        for user in users:
+            flatUser = flattenUser(user)
+            rows.append([formatCsvValue(flatUser.get(column)) for column in columns])
+        self.csvWriter.writerows(rows)
+
+    def close(self):
+        self.exportFile.close()
+
+class JsonlExportWriter:
+    #######
+    # Gzipped JSON lines, one user object per line
+    #######
+
+    def __init__(self, fileName, columns, projected):
+        self.topLevel = {column.split(".")[0] for column in columns} if projected else None
+        self.exportFile = gzip.open(fileName, "wb", compresslevel=6)
+
+    def write(self, users):
+        lines = []
+        for user in users:
+            if self.topLevel is None:
+                record = {key: value for key, value in user.items() if not key.startswith("_")}
+            else:
+                record = {key: value for key, value in user.items() if key in self.topLevel}
+            lines.append(encodeBody(record))
+        self.exportFile.write(b"\n".join(lines) + b"\n")
+
+    def close(self):
+        self.exportFile.close()
+
+class ParquetExportWriter:
+    #######
+    # Parquet file written in row groups, so only one row group is held in memory
+    #######
+
+    def __init__(self, fileName, columns, rowGroupSize=50000):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.columns = columns
+        self.rowGroupSize = rowGroupSize
+        self.schema = pyarrow.schema([(column, pyarrow.string()) for column in columns])
+        self.parquetWriter = pyarrow.parquet.ParquetWriter(fileName, self.schema, compression="zstd")
+        self.buffer = {column: [] for column in columns}
+        self.buffered = 0
+
+    def write(self, users):
+        for user in users:
+            flatUser = flattenUser(user)
+            for column in self.columns:
+                value = flatUser.get(column)
+                self.buffer[column].append(None if value is None else formatCsvValue(value))
+        self.buffered += len(users)
+        if self.buffered >= self.rowGroupSize:
+            self.flush()
+
+    def flush(self):
+        if self.buffered == 0:
+            return
+        self.parquetWriter.write_table(self.pyarrow.table(self.buffer, schema=self.schema))
+        self.buffer = {column: [] for column in self.columns}
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.parquetWriter.close()
+
+def getExportColumns(tokenManager, attributeList):
+    #######
+    # Columns to export - the requested attributes, or every schema attribute
+    #######
+
+    if attributeList:
+        columns = [attribute.strip() for attribute in attributeList.split(",") if attribute.strip()]
+        if "id" not in columns:
+            columns.insert(0, "id")
+        return columns, True
+
+    try:
+        schemaAttributes = listUserAttributes(p1Session, tokenManager)
+    except Exception as e:
+        print(f'Error reading user attributes: {e}')
+        infoLogger.error(f"Error reading user attributes: {e}")
+        quit()
+
+    columns = list(systemAttributes)
+    for attribute in schemaAttributes:
+        if attribute not in columns:
+            columns.append(attribute)
+    return columns, False
+
+def openExportWriter(exportFormat, fileName, columns, projected):
+    #######
+    # Open the writer for the chosen output format
+    #######
+
+    if exportFormat == "jsonl":
+        return JsonlExportWriter(fileName, columns, projected)
+    if exportFormat == "parquet":
+        try:
+            return ParquetExportWriter(fileName, columns)
+        except ImportError:
+            print(f'Error: Parquet output requires the pyarrow library (pip install pyarrow).')
+            infoLogger.error(f"Error: Parquet output requires the pyarrow library.")
+            quit()
+    return CsvExportWriter(fileName, columns)
+
+def printProgress(exportedUsers, startSeconds):
+    #######
+    # Print the running export count and rate
+    #######
+    elapsed = time.time() - startSeconds
+    rate = exportedUsers / elapsed if elapsed > 0 else 0
+    print(f"Exported: {exportedUsers} users ({rate:.0f} users/sec)")
+    infoLogger.info(f"Exported: {exportedUsers} users ({rate:.0f} users/sec)")
+
+def printEnding(startTime, endTime, runReport, reportFile):
+    #######
+    # Print the ending message and write the run report
+    #######
+
+    print(f'PingOne User Export Utility - Ending')
+    print(f'')
+    infoLogger.info(f"Ending export tool: {endTime}")
+
+    totalTime = endTime - startTime
+    print(f'Total time taken: {totalTime} ms')
+    infoLogger.info(f"Total time taken: {totalTime} ms")
+
+    try:
+        runReport.write(reportFile)
+        print(f'Run report written to: {reportFile}')
+        infoLogger.info(f"Run report written to: {reportFile}")
+    except OSError as e:
+        print(f'Error writing run report {reportFile}: {e}')
+        infoLogger.error(f"Error writing run report {reportFile}: {e}")
+
+def parseArguments():
+    #######
+    # Parse the command line options
+    #######
+
+    parser = argparse.ArgumentParser(description="PingOne User Export Utility")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv", help="Output format (default: gzipped CSV)")
+    parser.add_argument("--output", help="Output file name (default: P1UserExport-<timestamp>.csv.gz, .jsonl.gz or .parquet)")
+    parser.add_argument("--attributes", help="Comma separated attributes to export, e.g. username,email,name.given (default: every schema attribute)")
+    parser.add_argument("--filter", default="", help="PingOne filter expression limiting the users exported")
+    parser.add_argument("--partition", choices=["population", "none"], default="population", help="Scan one cursor per population in parallel (default) or a single cursor")
+    parser.add_argument("--parallel", type=int, default=8, help="Maximum partitions scanned at the same time (default: 8)")
+    parser.add_argument("--split-size", type=int, default=250000, help="Split populations with more users than this into creation date ranges (default: 250000, 0 to never split)")
+    parser.add_argument("--page-size", type=int, default=1000, help="Users requested per page (default: 1000)")
+    parser.add_argument("--report", help="File name for the JSON run report (default: P1UserExportReport-<timestamp>.json)")
+    addLoggingArguments(parser)
+    addGovernorArguments(parser)
+    return parser.parse_args()
+
+# All PingOne API calls share one pooled session so connections are reused across the scan threads
+p1Session = createSession(poolSize=32)
+
+def main():
+
+    version = "0.1"
+    exportedUsers = 0
+    lastProgress = 0
+    fileExtensions = {"csv": ".csv.gz", "jsonl": ".jsonl.gz", "parquet": ".parquet"}
+
+    args = parseArguments()
+    startLogging(args, [(infoLogger, "P1UserExport.log")])
+    runReport = RunReport("PingOne User Export", version)
+    attachReport(p1Session, runReport)
+    reportFile = args.report if args.report else defaultReportName("P1UserExportReport")
+    exportFile = args.output if args.output else f"P1UserExport-{time.strftime('%Y%m%d-%H%M%S')}{fileExtensions[args.format]}"
+
+    startTime = printWelcome(version)
+    tokenManager = getP1Connection(p1Session)
+    startGovernor(args, p1Session, tokenManager.p1Environment, "P1UserExport")
+    columns, projected = getExportColumns(tokenManager, args.attributes)
+    projection = sorted({column.split(".")[0] for column in columns}) if projected else None
+
+    try:
+        if args.partition == "population":
+            partitions = balancedPartitions(p1Session, tokenManager, args.filter, args.split_size)
+        else:
+            partitions = [("all users", args.filter)]
+    except Exception as e:
+        print(f'Error reading populations: {e}')
+        infoLogger.error(f"Error reading populations: {e}")
+        quit()
+
+    print(f'Exporting {len(columns)} attributes from {len(partitions)} partition(s) to {exportFile}')
+    infoLogger.info(f"Exporting {len(columns)} attributes from {len(partitions)} partition(s) to {exportFile}")
+    print(f'')
+
+    exportWriter = openExportWriter(args.format, exportFile, columns, projected)
+    scanner = PartitionedScanner(p1Session, tokenManager, partitions, args.page_size, projection, args.parallel)
+    startSeconds = time.time()
+    try:
+        for partitionName, users in scanner.pages():
+            exportWriter.write(users)
+            exportedUsers += len(users)
+            runReport.recordRows(len(users))
+            if time.time() - lastProgress >= 5:
+                printProgress(exportedUsers, startSeconds)
+                lastProgress = time.time()
+    except Exception as e:
+        print(f'Error exporting users: {e}')
+        infoLogger.error(f"Error exporting users: {e}")
+        exportWriter.close()
+        quit()
+
+    exportWriter.close()
+    printProgress(exportedUsers, startSeconds)
+    print(f'Export written to: {exportFile}')
+    infoLogger.info(f"Export written to: {exportFile}")
+    print(f'')
+
+    endTime = int(time.time() * 1000)
+    runReport.setTotals(exported=exportedUsers, partitions=len(partitions))
+    printEnding(startTime, endTime, runReport, reportFile)
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,50 @@
 # PingOne Import Tool
-# Last Update: June 26, 2025
+# Last Update: October 19, 2026
 # Authors: Matt Pollicove, Jeremy Carrier
 
 import configparser
 import requests
 import os
-import base64
+import sys
 import csv
-from ratelimit import limits, sleep_and_retry
+import argparse
 import logging
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-#logger = logging.basicConfig(filename='P1ImportUser.log', level=logging.INFO, format='%(asctime)s - %(message)s')
-#failedImports = logging.basicConfig(filename='p1ImportUserFailuresDetail.log', level=logging.ERROR, format='%(asctime)s - %(message)s')
-logFormat = logging.Formatter("%(asctime)s - %(message)s")
-
-# Setup info logging
-handler = logging.FileHandler("P1ImportUser.log")
-handler.setFormatter(logFormat)
+# Make the shared pingoneutilities package importable when run from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pingoneutilities.logpipeline import addLoggingArguments, startLogging
+from pingoneutilities.governor import RateGovernor, addGovernorArguments, startGovernor
+from pingoneutilities.p1http import createSession, attachReport
+from pingoneutilities.runreport import RunReport, defaultReportName
+from pingoneutilities.profiling import addProfilingArguments, finishProfiling, spans, startProfiling
+from pingoneutilities.jsoncodec import decodeResponse, encodeBody
+from pingoneutilities.passwordhash import PasswordHasher, defaultBcryptRounds
+from pingoneutilities.mapping import ColumnMapping, MappingError, findUnknownNames, readMappingSection
+from pingoneutilities.payload import buildUserPayload, copyableAttributes, writeOnlyAttributes
+from pingoneutilities.schema import listUserAttributes
+from pingoneutilities.archive import readArchive
+from pingoneutilities.dashboard import Dashboard, formatSeconds
+from pingoneutilities.csvprofile import estimateSeconds, readCsvSection
+from pingoneutilities.auth import P1ApiError, TokenManager, requestToken
+from pingoneutilities.fanout import FanOut, FanOutTarget
+from pingoneutilities.credpool import CredentialPool, CredentialPoolError, readClientSections
+from pingoneutilities.scan import PartitionedScanner, balancedPartitions
+from pingoneutilities.journal import JournalWriter
+from pingoneutilities.sync import LiveIndex, SyncSummary, comparedNames, projectionAttributes, patchBody
+
+# Log files are attached to these loggers by startLogging() in main()
 infoLogger = logging.getLogger("mainLog")
 infoLogger.setLevel(logging.INFO)
-infoLogger.addHandler(handler)
-
-# Setup error logging
-handler = logging.FileHandler("P1ImportUserFailuresDetail.log")
-handler.setFormatter(logFormat)
 detailedFailureLogger = logging.getLogger("dFLog")
 detailedFailureLogger.setLevel(logging.ERROR)
-detailedFailureLogger.addHandler(handler)
+
+# All PingOne API calls share one pooled session so connections are reused across the import threads
+p1Session = createSession(poolSize=100)
+# Set by --client-pool - user calls then take their token from the least loaded worker client
+credentialPool = None
 
 def printWelcome(version):
     #######
@@ -158,86 +173,28 @@ def checkVersion(configVersion, version):
         infoLogger.info(f"Configuration file version validated - matches configuration version: {version}")
         print(f'')
 
-def convertCreds(p1ClientId, p1ClientSecret):
-    # *********
-    # Converts the client ID and secret to a base64-encoded string for HTTP Basic Auth.
-    # *********
-    credString = p1ClientId + ":" + p1ClientSecret
-    credBytes = credString.encode("ascii")
-    b64CredBytes = base64.b64encode(credBytes)
-    b64CredString = b64CredBytes.decode("ascii") 
-    return b64CredString
-
 def performClientTest(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType):
     # *********
     # Attempts to authenticate with PingOne using the provided credentials and client type.
     # *********
-    requestHeaders = ""
 
     print(f'')
     print(f'Checking client credentials with PingOne.')
     infoLogger.info(f"Checking client credentials with PingOne.")
     print(f'')
 
-    # Call P1 token endpoint to get an access token with basic encoding
-    if p1ClientType == "basic":
-        p1CredsB64 = convertCreds(p1ClientId, p1ClientSecret)
-        requestHeaders = {}
-        requestHeaders['Authorization'] = 'Basic ' + p1CredsB64
-        requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-        requestBody = {'grant_type':'client_credentials'}
-
-
-        try:
-            hostCheckResult = requests.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token",headers=requestHeaders,data=requestBody)
-            if hostCheckResult.status_code == 200:
-                print(f"Client connection validated.")
-                infoLogger.info(f"Client connection validated.")
-                print(f'')
-            else:
-                print(f'')
-                print(f"****************************************************************************************************************************")
-                print(f"Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-                print(f"****************************************************************************************************************************")
-                infoLogger.error(f"Error: Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-                print(f'')
-        except requests.exceptions.RequestException:
-            print(f'')
-            print(f"****************************************************************************************************************************")
-            print(f"Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-            print(f"****************************************************************************************************************************")
-            infoLogger.error(f"Error: Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-            print(f'')
-
-    # Call P1 token endpoint to get an access token with post encoding
-    if p1ClientType == "post":
-        requestHeaders = {}
-        requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-        requestBody = {}
-        requestBody['client_id'] = p1ClientId
-        requestBody['client_secret'] = p1ClientSecret
-        requestBody['grant_type'] = 'client_credentials'
-
-        try:
-            hostCheckResult = requests.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token",headers=requestHeaders,data=requestBody)
-            if hostCheckResult.status_code == 200:
-                print(f"Client connection validated.")
-                infoLogger.info(f"Client connection validated.")
-                print(f'')
-            else:
-                print(f'')
-                print(f'****************************************************************************************************************************')
-                print(f"Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-                print(f'****************************************************************************************************************************')
-                infoLogger.error(f"Error: Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-                print(f'')
-        except requests.exceptions.RequestException:
-            print(f'')
-            print(f'****************************************************************************************************************************')
-            print(f"Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-            print(f'****************************************************************************************************************************')
-            infoLogger.error(f"Error: Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
-            print(f'')  
+    try:
+        requestToken(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+        print(f"Client connection validated.")
+        infoLogger.info(f"Client connection validated.")
+        print(f'')
+    except (P1ApiError, requests.exceptions.RequestException):
+        print(f'')
+        print(f"****************************************************************************************************************************")
+        print(f"Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
+        print(f"****************************************************************************************************************************")
+        infoLogger.error(f"Error: Failed to connect to PingOne client with provided parameters.  Please check your worker or re-run the configuration utility.")
+        print(f'')
 
 def ensureCsvExists(csvPath):
     #######
@@ -257,7 +214,7 @@ def ensureCsvExists(csvPath):
         infoLogger.error(f"Error: CSV file not found at {csvPath}. Please re-run the configuration utility.")
         quit()
 
-def readCsvHeaders(csvPath):
+def readCsvHeaders(csvPath, encoding='utf-8-sig'):
     #######
     # Read the headers of the CSV file
     #######
@@ -269,7 +226,7 @@ def readCsvHeaders(csvPath):
     print(f'')
 
     try:
-        with open(csvPath, 'r', newline='', encoding='utf-8-sig') as csvFile:
+        with open(csvPath, 'r', newline='', encoding=encoding) as csvFile:
             csvFileReader = csv.reader(csvFile)
             headers = next(csvFileReader)
     except Exception as e:
@@ -293,111 +250,30 @@ def getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType
     infoLogger.info(f"Getting access token from PingOne at {tokenTime}.")
     print(f'')
 
-    if p1ClientType == "basic":
-        p1CredsB64 = convertCreds(p1ClientId, p1ClientSecret)
-        requestHeaders = {}
-        requestHeaders['Authorization'] = 'Basic ' + p1CredsB64
-        requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-        requestBody = {}
-        requestBody['grant_type'] = 'client_credentials'
-
-    if p1ClientType == "post":
-        requestHeaders = {}
-        requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
-        requestBody = {}
-        requestBody['client_id'] = p1ClientId
-        requestBody['client_secret'] = p1ClientSecret
-        requestBody['grant_type'] = 'client_credentials'
-
     try:
-        response = requests.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token", headers=requestHeaders, data=requestBody)
-        if response.status_code == 200:
-            responseJson = response.json()
-            return responseJson['access_token'], tokenTime
-        else:
-            print(f'Error getting access token: {response.status_code} - {response.text}')
-            infoLogger.error(f"Error getting access token: {response.status_code} - {response.text}")   
-            quit()
+        return requestToken(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType), tokenTime
+    except P1ApiError as e:
+        print(f'{e}')
+        infoLogger.error(f"{e}")
+        quit()
     except requests.exceptions.RequestException as e:
         print(f'Error connecting to PingOne: {e}')
         infoLogger.error(f"Error connecting to PingOne: {e}")
         quit()
 
-def getSubattributes(p1AttributeNames, p1Attribute):
-    # *********
-    # Appends subattribute names for complex PingOne attributes to the attribute list.
-    # *********
-    print(f"Reading subattributes for attribute {p1Attribute['name']}.")
-    infoLogger.info(f"Reading subattributes for attribute {p1Attribute['name']}.")
-    for subattribute in p1Attribute['subAttributes']:
-        p1AttributeNames.append(p1Attribute['name'] + "." + subattribute['name'])
-
-def getP1UserAttributes(p1At, p1Environment, p1Geography):
+def getP1UserAttributes(tokenManager):
     # *********
-    # Retrieves the list of user attributes from the PingOne environment.
+    # Retrieves the list of user attributes from the PingOne environment, with the import-only attributes added.
     # Returns a list of attribute names.
     # *********
-    requestSchemaHeaders = {}
-    requestSchemaHeaders['Authorization'] = "Bearer " + p1At
-    requestAttributeHeaders = {}
-    requestAttributeHeaders['Authorization'] = "Bearer " + p1At
-    p1AttributeNames = []
-
-    #Get the Schema for the PingOne environment
-    try:
-        print(f"Reading PingOne Schema from environment {p1Environment}.")
-        infoLogger.info(f"Reading PingOne Schema from environment {p1Environment}.")
-        getSchema = requests.get(f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/schemas",headers=requestSchemaHeaders)
-        if getSchema.status_code == 200:
-            schemaId = getSchema.json()['_embedded']['schemas'][0]['id']
-        else:
-            infoLogger.error("Error: Unable to read PingOne schema using worker access token")
-            print(f'')
-            print(f'*******************************************************************************************************************')
-            print(f"Failed to read the schema of your PingOne environment.  Please ensure your worker has appropriate rights.  Exiting.")
-            print(f'*******************************************************************************************************************')
-            print(f'')
-            quit()
-            
-    except:
-        infoLogger.error("Error: Unable to read PingOne schema using worker access token.")
-        print(f'')
-        print(f'*******************************************************************************************************************')
-        print(f"Failed to read the schema of your PingOne environment.  Please ensure your worker has appropriate rights.  Exiting.")
-        print(f'*******************************************************************************************************************')
-        print(f'')
-        quit()
+    print(f"Reading user attributes from environment {tokenManager.p1Environment}.")
+    infoLogger.info(f"Reading user attributes from environment {tokenManager.p1Environment}")
+    print(f'')
 
-    #Get the Attributes for the PingOne environment
     try:
-        infoLogger.info(f"Reading user attributes from environment {p1Environment}")
-        print(f"Reading user attributes from environment {p1Environment}.")
-        print(f'')
-        getAttributes = requests.get(f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/schemas/{schemaId}/attributes",headers=requestAttributeHeaders)
-        if getAttributes.status_code == 200:
-            for p1Attribute in getAttributes.json()['_embedded']['attributes']:
-                if(p1Attribute['type'] == "COMPLEX"):
-                    getSubattributes(p1AttributeNames, p1Attribute)
-                else:
-                    p1AttributeNames.append(p1Attribute['name'])
-
-            p1AttributeNames.append("password")
-            p1AttributeNames.append("mfaEmail1")
-            p1AttributeNames.append("mfaEmail2")
-            p1AttributeNames.append("mfaSmsVoice1")
-            p1AttributeNames.append("mfaSmsVoice2")
-
-            return p1AttributeNames
-        else:
-            infoLogger.error("Error: Unable to read schema attributes using worker access token.")
-            print(f'') 
-            print(f'*********************************************************************************************************************')
-            print(f"Failed to read the attributes of your PingOne environment.  Please ensure your worker has appropriate rights.  Exiting.")
-            print(f'*********************************************************************************************************************')
-            print(f'')
-            quit()
-    except:
-        infoLogger.error("Error: Unable to read schema attributes using worker access token.")
+        p1AttributeNames = listUserAttributes(p1Session, tokenManager)
+    except (P1ApiError, requests.exceptions.RequestException, KeyError, IndexError) as e:
+        infoLogger.error(f"Error: Unable to read the PingOne schema attributes using worker access token: {e}")
         print(f'')
         print(f'**********************************************************************************************************************')
         print("Failed to read the attributes of your PingOne environment.  Please ensure your worker has appropriate rights.  Exiting.")
@@ -405,8 +281,10 @@ def getP1UserAttributes(p1At, p1Environment, p1Geography):
         print(f'')
         quit()
 
+    return p1AttributeNames + ["password"] + sorted(writeOnlyAttributes)
+
 
-def validateCsvHeaders(userFile):
+def validateCsvHeaders(userFile, encoding='utf-8-sig'):
     # *********
     #  Reads and returns the headers from the provided CSV file.
     # Returns a tuple ("true", [headers]) if successful.
@@ -414,7 +292,7 @@ def validateCsvHeaders(userFile):
     readCsvHeaders = []
 
     try:
-        with open(userFile, 'r', newline='', encoding='utf-8-sig') as csvFile:
+        with open(userFile, 'r', newline='', encoding=encoding) as csvFile:
             csvFileReader = csv.reader(csvFile)
             csvFileHeaders = next(csvFileReader)
     except Exception as csvException:
@@ -443,30 +321,69 @@ def printMappingIntro():
 
 def checkHeadersVsAttributes(csvHeaders, p1Attributes):
     # *********
-    # Checks if each CSV header matches a known PingOne attribute.
-    # Returns "true" if all headers match, otherwise "false".
+    # Checks if each CSV header (or mapped attribute) matches a known PingOne attribute.
+    # Exits with the closest matching attribute names if any do not.
     # *********
-    print(csvHeaders)
+    unknownHeaders = findUnknownNames(csvHeaders, p1Attributes)
+    unknownNames = {header for header, suggestions in unknownHeaders}
     for header in csvHeaders:
-        print(header)
-        currentAttributeMappingMatch = "false"
-        for attribute in p1Attributes:
-            if(attribute == header):
-                currentAttributeMappingMatch = "true"
-                infoLogger.info(f"CSV Header ({header}) matched with PingOne attribute ({attribute}).")
-                print(f"CSV Header ({header}) matched with PingOne attribute ({attribute}).")
-        if currentAttributeMappingMatch == "false":
-            infoLogger.error(f"Error: Failed to match CSV header ({header}) with PingOne schema.  Either the CSV file has been changed since the configuration tool was run or the configuration file was edited manually.  Re-run the configuration tool and try again.")
-            print(f'')
-            print(f'******************************************************************************************************************************************************')
-            print(f"Unable to map CSV Header ({header}) with any known PingOne attribute.  Either the CSV file has been changes since the configuration tool was run, ")
-            print(f"or the configuration file was changed manually.  Re-run the configuration tool and try again.")
-            print(f"Exiting.")
-            print(f"******************************************************************************************************************************************************")
-            print(f"")
-            quit()
+        if header not in unknownNames:
+            infoLogger.info(f"CSV Header ({header}) matched with PingOne attribute ({header}).")
+            print(f"CSV Header ({header}) matched with PingOne attribute ({header}).")
+    if unknownHeaders:
+        print(f'')
+        print(f'******************************************************************************************************************************************************')
+        for header, suggestions in unknownHeaders:
+            suggestionText = f"  Closest PingOne attributes: {', '.join(suggestions)}" if suggestions else ""
+            infoLogger.error(f"Error: Failed to match CSV header ({header}) with PingOne schema.{suggestionText}")
+            print(f"Unable to map CSV Header ({header}) with any known PingOne attribute.{suggestionText}")
+        print(f"Either the CSV file has been changed since the configuration tool was run, or the configuration file was changed manually.")
+        print(f"Re-run the configuration tool, or map the columns in the Mapping section of the configuration file, and try again.")
+        print(f"Exiting.")
+        print(f"******************************************************************************************************************************************************")
+        print(f"")
+        quit()
     print(f"")
 
+def readMappingConfig(csvHeaders):
+    #######
+    # Read and compile the optional Mapping section of the configuration file
+    # Returns a ColumnMapping, or None when CSV headers are used as attribute names
+    #######
+
+    mappingEntries = readMappingSection('P1ImportUser.cfg')
+    if mappingEntries is None:
+        return None
+
+    try:
+        columnMapping = ColumnMapping(mappingEntries, csvHeaders)
+    except MappingError as e:
+        print(f'Error in the Mapping section of the configuration file: {e}')
+        infoLogger.error(f"Error in the Mapping section of the configuration file: {e}")
+        quit()
+
+    print(f'Column mapping compiled: {len(columnMapping.attributes)} PingOne attributes from {len(columnMapping.sourceColumns())} CSV columns.')
+    infoLogger.info(f"Column mapping compiled: {len(columnMapping.attributes)} PingOne attributes from {len(columnMapping.sourceColumns())} CSV columns.")
+    print(f'')
+    return columnMapping
+
+def readCsvProfileConfig(csvPath, callsPerSecond):
+    #######
+    # Read the row count and encoding the configuration tool stored when it profiled the CSV file
+    # Returns (expectedRows, csvEncoding) - expectedRows is None when the file was not profiled or has changed since
+    #######
+
+    expectedRows, csvEncoding, csvChanged = readCsvSection('P1ImportUser.cfg', csvPath)
+    if csvChanged:
+        print(f'The CSV file has changed since the configuration tool profiled it - progress will show users processed only.  Run UserImportConfig.py --profile-csv to profile it again.')
+        infoLogger.warning(f"The CSV file {csvPath} has changed since it was profiled - the stored row count is not used.")
+        print(f'')
+    elif expectedRows is not None:
+        print(f'Users to import: {expectedRows} - at least {formatSeconds(estimateSeconds(expectedRows, callsPerSecond))} at {callsPerSecond} calls per second.')
+        infoLogger.info(f"Users to import from {csvPath}: {expectedRows} ({csvEncoding})")
+        print(f'')
+    return expectedRows, csvEncoding
+
 def getExistingUsercount(p1At, p1Environment, p1Geography):
     ######
     # Get existing user count in PingOne Environment
@@ -476,7 +393,8 @@ def getExistingUsercount(p1At, p1Environment, p1Geography):
     requestHeaders['Authorization'] = "Bearer " + p1At
 
     try: 
-        getCurrentUsers = requests.get(f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users",headers=requestHeaders)
+        # Only the count is needed - ask for a one user page
+        getCurrentUsers = p1Session.get(f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users",headers=requestHeaders,params={'limit': 1, 'attributes': "id"})
 
         if getCurrentUsers.status_code == 200:
             currentUserCount = getCurrentUsers.json()['count']
@@ -522,6 +440,56 @@ def readNext100(csvReader):
 
     return readRows, csvRows
 
+def readBatches(csvReader):
+    #######
+    # Yield batches of up to 100 rows until the end of the CSV file
+    #######
+
+    endOfCsv = False
+    while not endOfCsv:
+        with spans.span("read"):
+            numRead, csvRows = readNext100(csvReader)
+        if numRead < 100:
+            endOfCsv = True
+        if numRead > 0:
+            yield csvRows
+
+def readPasswordHashConfig(csvHeaders):
+    #######
+    # Read the optional Passwords section of the configuration file
+    # Returns a PasswordHasher, or None when passwords are sent as they appear in the CSV
+    #######
+
+    configFile = configparser.ConfigParser()
+    configFile.read('P1ImportUser.cfg')
+    if "Passwords" not in configFile.sections():
+        return None
+
+    passwordConfig = configFile["Passwords"]
+    hashAlgorithm = passwordConfig.get("hashalgorithm", "none").strip().lower()
+    if hashAlgorithm == "none":
+        return None
+
+    hashColumns = [column.strip() for column in passwordConfig.get("hashcolumns", "password").split(",") if column.strip()]
+    columnIndexes = [idx for idx, header in enumerate(csvHeaders) if header in hashColumns]
+    if not columnIndexes:
+        print(f'Password hashing is configured but none of the columns ({", ".join(hashColumns)}) are in the CSV file - passwords will not be hashed.')
+        infoLogger.info(f"Password hashing is configured but none of the columns ({', '.join(hashColumns)}) are in the CSV file.")
+        print(f'')
+        return None
+
+    try:
+        passwordHasher = PasswordHasher(hashAlgorithm, columnIndexes, passwordConfig.getint("hashworkers", 0), passwordConfig.getint("bcryptrounds", defaultBcryptRounds))
+    except ValueError as e:
+        print(f'Error: {e} - please correct the Passwords section of the configuration file.')
+        infoLogger.error(f"Error: {e} - please correct the Passwords section of the configuration file.")
+        quit()
+
+    print(f'Passwords will be hashed with {hashAlgorithm} using {passwordHasher.workers} processes before they are sent to PingOne.')
+    infoLogger.info(f"Passwords will be hashed with {hashAlgorithm} using {passwordHasher.workers} processes before they are sent to PingOne.")
+    print(f'')
+    return passwordHasher
+
 def nestedUserPart(currentUserPart, partIndex, parts, attributeValue):
     #######
     # Handle nested user parts
@@ -541,54 +509,35 @@ def nestedUserPart(currentUserPart, partIndex, parts, attributeValue):
         currentUserPart = attributeValue
         return currentUserPart
 
-@sleep_and_retry
-@limits(calls=100, period=1)  # Limit to 100 calls per second
-def importUser(csvRow, csvHeaders, p1Geography, p1Environment, p1AT, p1DefaultPopulation, p1PasswordReset):
+def p1UserCall(method, requestUrl, **kwargs):
     #######
-    # Import one user into PingOne
+    # Make one user API call - the session's governor limits it together with every other tool using the environment
     #######
+    if credentialPool is not None:
+        kwargs["headers"] = dict(kwargs.get("headers", {}), **credentialPool.authHeaders())
+    return p1Session.request(method, requestUrl, **kwargs)
 
-    user = {}
+def importUser(csvRow, csvHeaders, p1Geography, p1Environment, p1AT, p1DefaultPopulation, p1PasswordReset, journal=None):
+    #######
+    # Import one user into PingOne
+    #######
 
     # Precomputing indexes to prevent repeated lookups
-    header_indexes = {header: idx for idx, header in enumerate(csvHeaders)}
-    special_fields = {"password", "population", "enabled"}
+    with spans.span("build"):
+        header_indexes = {header: idx for idx, header in enumerate(csvHeaders)}
+        user = buildUserPayload({header: csvRow[idx] for header, idx in header_indexes.items()}, p1DefaultPopulation, p1PasswordReset)
+        body = encodeBody(user)
+    return createUser(user, p1Geography, p1Environment, p1AT, journal, body)
 
-    # Build user object, handling nested fields
-    for header, idx in header_indexes.items():
-        if header in special_fields:
-            continue
-        value = csvRow[idx].strip()
-        if not value:
-            continue
-        parts = header.split('.')
-        if len(parts) == 1:
-            user[header] = value
-        else:
-            d = user
-            for part in parts[:-1]:
-                if part not in d or not isinstance(d[part], dict):
-                    d[part] = {}
-                d = d[part]
-            d[parts[-1]] = value
-
-
-    # Handle enabled/disabled user
-    enabled_idx = header_indexes.get("enabled")
-    if enabled_idx is not None:
-        user["enabled"] = csvRow[enabled_idx].strip().lower() == "true"
-
-    # Handle population
-    pop_idx = header_indexes.get("population")
-    user["population"] = {"id": csvRow[pop_idx].strip() if pop_idx is not None and csvRow[pop_idx].strip() else p1DefaultPopulation}
-
-    # Handle password and forceChange
-    pwd_idx = header_indexes.get("password")
-    if pwd_idx is not None and csvRow[pwd_idx].strip():
-        user["password"] = {
-            "value": csvRow[pwd_idx].strip(),
-            "forceChange": p1PasswordReset == "true"
-        }
+def createUser(user, p1Geography, p1Environment, p1AT, journal=None, body=None):
+    #######
+    # Create one user from an import body - body is the user already encoded, when the caller has it
+    # Created users are added to the run's journal so the run can be rolled back
+    #######
+
+    if body is None:
+        with spans.span("build"):
+            body = encodeBody(user)
 
     # Prepare request
     requestHeaders = {
@@ -597,17 +546,22 @@ def importUser(csvRow, csvHeaders, p1Geography, p1Environment, p1AT, p1DefaultPo
     }
 
     try:
-        createResponse = requests.post(
+        createResponse = p1UserCall(
+            "POST",
             f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users",
             headers=requestHeaders,
-            json=user
+            data=body
         )
         username = user.get('username', '[unknown]')
         if createResponse.status_code == 201:
-            infoLogger.info(f"User imported: {username}")
+            infoLogger.info(f"User imported: {username}", extra={"p1": {"event": "userImported", "username": username, "success": True}})
+            if journal is not None:
+                with spans.span("parse"):
+                    userId = decodeResponse(createResponse)['id']
+                journal.append(userId, username)
             return True
         else:
-            infoLogger.error(f"Failed to import user {username} - see P1ImportUserFailuresDetail.log for more information.")
+            infoLogger.error(f"Failed to import user {username} - see P1ImportUserFailuresDetail.log for more information.", extra={"p1": {"event": "importFailed", "username": username, "status": createResponse.status_code}})
             detailedFailureLogger.error(f"Failed import for user {username}, details below:")
             detailedFailureLogger.error(f"{createResponse.status_code} - {createResponse.text}")
             return False
@@ -615,13 +569,457 @@ def importUser(csvRow, csvHeaders, p1Geography, p1Environment, p1AT, p1DefaultPo
         username = user.get('username', '[unknown]')
         infoLogger.error(f"Error processing user {username} - unable to continue: {e}")
         quit()
-        
 
-def printEnding(startTime, endTime):
+def updateUser(userId, username, patchJson, p1PopulationId, p1Geography, p1Environment, p1AT):
     #######
-    # Print the ending message
+    # Sync one changed user - PATCH the changed attributes and/or move the user to its new population
     #######
 
+    requestHeaders = {
+        'Authorization': f'Bearer {p1AT}',
+        'Content-Type': 'application/json'
+    }
+    userUrl = f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users/{userId}"
+
+    try:
+        if patchJson is not None:
+            updateResponse = p1UserCall("PATCH", userUrl, headers=requestHeaders, data=encodeBody(patchJson))
+            if updateResponse.status_code != 200:
+                infoLogger.error(f"Failed to update user {username} - see P1ImportUserFailuresDetail.log for more information.", extra={"p1": {"event": "updateFailed", "username": username, "status": updateResponse.status_code}})
+                detailedFailureLogger.error(f"Failed update for user {username}, details below:")
+                detailedFailureLogger.error(f"{updateResponse.status_code} - {updateResponse.text}")
+                return False
+        if p1PopulationId is not None:
+            moveResponse = p1UserCall("PUT", userUrl + "/population", headers=requestHeaders, data=encodeBody({"id": p1PopulationId}))
+            if moveResponse.status_code != 200:
+                infoLogger.error(f"Failed to move user {username} to population {p1PopulationId} - see P1ImportUserFailuresDetail.log for more information.", extra={"p1": {"event": "moveFailed", "username": username, "status": moveResponse.status_code}})
+                detailedFailureLogger.error(f"Failed population move for user {username}, details below:")
+                detailedFailureLogger.error(f"{moveResponse.status_code} - {moveResponse.text}")
+                return False
+        infoLogger.info(f"User updated: {username}", extra={"p1": {"event": "userUpdated", "username": username, "success": True}})
+        return True
+    except Exception as e:
+        infoLogger.error(f"Error processing user {username} - unable to continue: {e}")
+        quit()
+
+def deleteUser(userId, username, p1Geography, p1Environment, p1AT):
+    #######
+    # Delete one user that is no longer in the feed
+    #######
+
+    requestHeaders = {'Authorization': f'Bearer {p1AT}'}
+    try:
+        deleteResponse = p1UserCall("DELETE", f"https://api.pingone{p1Geography}/v1/environments/{p1Environment}/users/{userId}", headers=requestHeaders)
+        if deleteResponse.status_code == 204:
+            infoLogger.info(f"User deleted: {username}", extra={"p1": {"event": "userDeleted", "username": username, "success": True}})
+            return True
+        if deleteResponse.status_code == 404:
+            # Already gone - deleted by an earlier run that stopped part way
+            infoLogger.info(f"User already deleted: {username}", extra={"p1": {"event": "userDeleted", "username": username, "success": True, "status": 404}})
+            return True
+        infoLogger.error(f"Failed to delete user {username} - see P1ImportUserFailuresDetail.log for more information.", extra={"p1": {"event": "deleteFailed", "username": username, "status": deleteResponse.status_code}})
+        detailedFailureLogger.error(f"Failed delete for user {username}, details below:")
+        detailedFailureLogger.error(f"{deleteResponse.status_code} - {deleteResponse.text}")
+        return False
+    except Exception as e:
+        infoLogger.error(f"Error processing user {username} - unable to continue: {e}")
+        quit()
+
+def confirmSyncDelete(syncSummary, maxDeletes):
+    #######
+    # Show the users --sync-delete would delete and check the delete may go ahead
+    # With --max-deletes there is no prompt - the deletes are skipped when there are more than the limit
+    #######
+
+    deleteCount = syncSummary.counts["delete"]
+    print(f'')
+    print(f'{deleteCount} users in PingOne are not in the CSV file and will be deleted (e.g. {", ".join(syncSummary.samples["delete"])}).')
+    infoLogger.info(f"Sync delete - {deleteCount} users in PingOne are not in the CSV file")
+    if maxDeletes is not None:
+        if deleteCount > maxDeletes:
+            print(f'Error: {deleteCount} deletes is more than --max-deletes {maxDeletes} - no users were deleted.  Check the CSV file is complete.')
+            infoLogger.error(f"Sync delete skipped - {deleteCount} deletes is more than --max-deletes {maxDeletes}")
+            return False
+        return True
+    try:
+        understand = input("Delete these users? (yes/no): [no]").strip().lower()
+    except EOFError:
+        # No one to answer - run with --max-deletes to delete without a prompt
+        understand = ""
+    if understand == 'yes':
+        return True
+    print(f'No users were deleted.')
+    infoLogger.info(f"Sync delete cancelled - no users were deleted")
+    return False
+
+def syncDeleteUsers(unmatchedUsers, auditFile, syncSummary, executor, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh):
+    #######
+    # Delete the live users that are not in the CSV file, 100 at a time
+    # Each delete is recorded in the audit CSV file with its user ID, username and result
+    #######
+
+    p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+    nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
+    print(f'Deleted users will be recorded in: {auditFile}')
+    infoLogger.info(f"Deleted users will be recorded in: {auditFile}")
+    with open(auditFile, "w", newline="", encoding="utf-8") as auditHandle:
+        auditWriter = csv.writer(auditHandle)
+        auditWriter.writerow(["id", "username", "result"])
+        for batchStart in range(0, len(unmatchedUsers), 100):
+            currentTime = int(time.time() * 1000)
+            if currentTime > nextToken:
+                p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+                nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
+            threads = {executor.submit(deleteUser, userId, username, p1Geography, p1Environment, p1At): (userId, username) for username, userId in unmatchedUsers[batchStart:batchStart + 100]}
+            for thread in as_completed(threads):
+                userId, username = threads[thread]
+                try:
+                    deleted = thread.result() == True
+                except Exception as e:
+                    infoLogger.error(f"Error: Thread generated an exception: {e}")
+                    deleted = False
+                syncSummary.addDeleteResult(deleted)
+                auditWriter.writerow([userId, username, "deleted" if deleted else "failed"])
+            auditHandle.flush()
+            print(f"Deleted: {syncSummary.deleted} of {len(unmatchedUsers)} - failed: {syncSummary.deleteFailed}")
+
+def loadLiveIndex(importHeaders, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh):
+    #######
+    # Read the username, population and compared attributes of every live user into a compact index
+    #######
+
+    names = comparedNames(importHeaders)
+    liveIndex = LiveIndex(names)
+    tokenManager = TokenManager(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh)
+
+    print(f'Reading existing users for sync ({len(names)} attributes compared).')
+    infoLogger.info(f"Reading existing users for sync ({len(names)} attributes compared).")
+
+    try:
+        partitions = balancedPartitions(p1Session, tokenManager)
+        scanner = PartitionedScanner(p1Session, tokenManager, partitions, 1000, projectionAttributes(names))
+        for partitionName, users in scanner.pages():
+            liveIndex.addPage(users)
+    except Exception as e:
+        print(f'Error reading existing users: {e}')
+        infoLogger.error(f"Error reading existing users: {e}")
+        quit()
+
+    print(f'Existing users read: {len(liveIndex.users)}')
+    infoLogger.info(f"Existing users read: {len(liveIndex.users)}")
+    print(f'')
+    return liveIndex
+
+def submitSyncBatch(executor, csvRows, importHeaders, liveIndex, syncSummary, dryRun, p1Geography, p1Environment, p1At, p1DefaultPopulation, p1PasswordReset, journal):
+    #######
+    # Compare a batch of rows with the live users and submit only the changes
+    # Returns the submitted threads - none on a dry run
+    #######
+
+    threads = []
+    for csvRow in csvRows:
+        user = buildUserPayload(dict(zip(importHeaders, csvRow)), p1DefaultPopulation, p1PasswordReset)
+        username = user.get('username', '[unknown]')
+        userId, attributesChanged, populationChanged, flatUser = liveIndex.classify(user)
+        if userId is None:
+            syncSummary.add("create", username)
+            if not dryRun:
+                threads.append(executor.submit(createUser, user, p1Geography, p1Environment, p1At, journal))
+            continue
+        if not attributesChanged and not populationChanged:
+            syncSummary.add("unchanged", username)
+            continue
+        if attributesChanged:
+            syncSummary.add("update", username)
+        if populationChanged:
+            syncSummary.add("move", username)
+        if not dryRun:
+            patchJson = patchBody(user, flatUser, liveIndex.names) if attributesChanged else None
+            p1PopulationId = user['population']['id'] if populationChanged else None
+            threads.append(executor.submit(updateUser, userId, username, patchJson, p1PopulationId, p1Geography, p1Environment, p1At))
+    return threads
+
+def printSyncSummary(syncSummary, dryRun):
+    #######
+    # Print the change sets found by the sync
+    #######
+
+    print(f'')
+    if dryRun:
+        print(f'Dry run - no changes were sent to PingOne.  The sync would make these changes:')
+        infoLogger.info(f"Dry run - no changes were sent to PingOne.")
+    else:
+        print(f'Sync changes:')
+    for line in syncSummary.lines():
+        print(f'  {line}')
+        infoLogger.info(f"Sync - {line}")
+    print(f'')
+
+def openJournal(journalFile, p1Environment):
+    #######
+    # Open the journal of users created by this run
+    #######
+
+    try:
+        journal = JournalWriter(journalFile, p1Environment)
+    except (OSError, ValueError) as e:
+        print(f'Error creating journal file {journalFile}: {e}')
+        infoLogger.error(f"Error creating journal file {journalFile}: {e}")
+        quit()
+
+    print(f'Created users will be recorded in: {journalFile}')
+    infoLogger.info(f"Created users will be recorded in: {journalFile}")
+    print(f'')
+    return journal
+
+def restoreUser(archivedUser, p1Geography, p1Environment, p1AT, p1DefaultPopulation, journal):
+    #######
+    # Create a user again from its archived record - PingOne gives it a new ID
+    #######
+    user = buildUserPayload(copyableAttributes(archivedUser), p1DefaultPopulation, "false")
+    return createUser(user, p1Geography, p1Environment, p1AT, journal)
+
+def restoreArchive(archiveFile, executor, runReport, journal, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh, p1DefaultPopulation):
+    #######
+    # Restore the users in an archive written by P1BulkDelete.py --archive, 100 at a time in parallel
+    # Returns the processed, succeeded and failed counts
+    #######
+
+    print(f'Restoring the users archived in {archiveFile}.')
+    infoLogger.info(f"Restoring the users archived in {archiveFile}.")
+    print(f'')
+    totalProcessed = 0
+    successfulImport = 0
+    failedImport = 0
+    p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+    nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
+    try:
+        for archivedUsers in readArchive(archiveFile, 100):
+            currentTime = int(time.time() * 1000)
+            if currentTime > nextToken:
+                p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+                nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
+            threads = [executor.submit(restoreUser, archivedUser, p1Geography, p1Environment, p1At, p1DefaultPopulation, journal) for archivedUser in archivedUsers]
+            for thread in as_completed(threads):
+                try:
+                    if thread.result() == True:
+                        successfulImport += 1
+                    else:
+                        failedImport += 1
+                except Exception as e:
+                    failedImport += 1
+                    print(f"Thread generated an exception: {e}")
+                    infoLogger.error(f"Error: Thread generated an exception: {e}")
+            journal.flush()
+            totalProcessed += len(archivedUsers)
+            runReport.recordRows(len(archivedUsers))
+            print(f"Restored: {successfulImport}, failed: {failedImport}")
+    except OSError as e:
+        print(f'Error reading archive file {archiveFile}: {e}')
+        infoLogger.error(f"Error reading archive file {archiveFile}: {e}")
+        quit()
+
+    infoLogger.info(f"Restore complete - {successfulImport} restored, {failedImport} failed")
+    print(f'')
+    return totalProcessed, successfulImport, failedImport
+
+def closeJournal(journal):
+    #######
+    # Close the journal and tell the user how to roll the run back
+    #######
+    journal.close()
+    print(f'{journal.count} created users recorded in {journal.fileName}.  To undo this import, run: P1BulkDelete.py --rollback {journal.fileName}')
+    infoLogger.info(f"{journal.count} created users recorded in {journal.fileName}")
+    print(f'')
+
+def readTargets(targetNames, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, p1DefaultPopulation, defaultRate):
+    #######
+    # Read the environments named in --targets from the [Target:NAME] sections of the configuration file
+    # "default" is the environment in the P1Config section; "all" is every Target section
+    #######
+
+    configFile = configparser.ConfigParser()
+    configFile.read('P1ImportUser.cfg')
+    sections = {section.split(":", 1)[1].strip(): configFile[section] for section in configFile.sections() if section.startswith("Target:")}
+    names = [name.strip() for name in targetNames.split(",") if name.strip()]
+    if names == ["all"]:
+        names = list(sections)
+    if not names:
+        print(f'Error: --targets needs at least one target name, or all.')
+        infoLogger.error(f"Error: --targets needs at least one target name, or all.")
+        quit()
+
+    targets = []
+    for name in names:
+        if name == "default":
+            targets.append({"name": name, "environment": p1Environment, "geography": p1Geography, "clientId": p1ClientId, "clientSecret": p1ClientSecret, "clientType": p1ClientType, "defaultPopulation": p1DefaultPopulation, "rate": defaultRate})
+            continue
+        if name not in sections:
+            print(f'Error: No [Target:{name}] section in the configuration file.')
+            infoLogger.error(f"Error: No [Target:{name}] section in the configuration file.")
+            quit()
+        section = sections[name]
+        missing = [key for key in ("p1environment", "p1clientid", "p1clientsecret") if key not in section]
+        if missing:
+            print(f'Error: Missing {", ".join(missing)} in the [Target:{name}] section of the configuration file.')
+            infoLogger.error(f"Error: Missing {', '.join(missing)} in the [Target:{name}] section of the configuration file.")
+            quit()
+        targets.append({
+            "name": name,
+            "environment": section["p1environment"],
+            "geography": section.get("p1geography", p1Geography),
+            "clientId": section["p1clientid"],
+            "clientSecret": section["p1clientsecret"],
+            "clientType": section.get("p1clienttype", "basic"),
+            # Rows without a population go to this population in this target
+            "defaultPopulation": section.get("defaultpopulation", p1DefaultPopulation),
+            "rate": section.getint("rate", defaultRate)
+        })
+    if len({target["environment"].lower() for target in targets}) < len(targets):
+        print(f'Error: The same environment is named by more than one target.')
+        infoLogger.error(f"Error: The same environment is named by more than one target.")
+        quit()
+    return targets
+
+def createTargetUser(targetName, targetSession, targetTokens, user, body, journal):
+    #######
+    # Create one user in one fan-out target from its encoded body
+    #######
+
+    username = user.get('username', '[unknown]')
+
+    try:
+        requestHeaders = targetTokens.authHeaders()
+        requestHeaders['Content-Type'] = 'application/vnd.pingidentity.user.import+json'
+        createResponse = targetSession.post(targetTokens.apiUrl("/users"), headers=requestHeaders, data=body)
+    except (P1ApiError, requests.exceptions.RequestException) as e:
+        infoLogger.error(f"[{targetName}] Error importing user {username}: {e}", extra={"p1": {"event": "importFailed", "target": targetName, "username": username}})
+        detailedFailureLogger.error(f"[{targetName}] Failed import for user {username}: {e}")
+        return False
+
+    if createResponse.status_code == 201:
+        infoLogger.info(f"[{targetName}] User imported: {username}", extra={"p1": {"event": "userImported", "target": targetName, "username": username, "success": True}})
+        with spans.span("parse"):
+            userId = decodeResponse(createResponse)['id']
+        journal.append(userId, username)
+        return True
+    infoLogger.error(f"[{targetName}] Failed to import user {username} - see P1ImportUserFailuresDetail.log for more information.", extra={"p1": {"event": "importFailed", "target": targetName, "username": username, "status": createResponse.status_code}})
+    detailedFailureLogger.error(f"[{targetName}] Failed import for user {username}, details below:")
+    detailedFailureLogger.error(f"{createResponse.status_code} - {createResponse.text}")
+    return False
+
+def openTarget(target, args, runReport, tokenRefresh, journalBase):
+    #######
+    # Connect to one fan-out target - its own session, token, rate limit and journal
+    #######
+
+    targetSession = createSession(poolSize=100)
+    attachReport(targetSession, runReport)
+    targetSession.rateLimiter = RateGovernor(target["environment"], target["rate"], args.rate_share, "UserImport", args.rate_dir)
+    targetTokens = TokenManager(targetSession, target["clientId"], target["clientSecret"], target["geography"], target["environment"], target["clientType"], tokenRefresh)
+    try:
+        targetTokens.getToken()
+    except (P1ApiError, requests.exceptions.RequestException) as e:
+        print(f'Error connecting to target {target["name"]}: {e}')
+        infoLogger.error(f"Error connecting to target {target['name']}: {e}")
+        quit()
+    journal = openJournal(f"{journalBase}-{target['name']}.p1j", target["environment"])
+
+    def sendUser(encodedUser):
+        # Bodies are encoded once for every target - a row without a population is encoded with this target's default
+        user, body = encodedUser
+        if body is None:
+            user = dict(user, population={"id": target["defaultPopulation"]})
+            with spans.span("build"):
+                body = encodeBody(user)
+        return createTargetUser(target["name"], targetSession, targetTokens, user, body, journal)
+
+    print(f'Target {target["name"]}: environment {target["environment"]}, {target["rate"]} calls per second.')
+    infoLogger.info(f"Target {target['name']}: environment {target['environment']}, {target['rate']} calls per second.")
+    return FanOutTarget(target["name"], sendUser, 100, args.max_lag, journal.flush), journal
+
+def runFanOut(batches, importHeaders, targets, args, runReport, tokenRefresh, p1PasswordReset, dashboard, expectedRows=None):
+    #######
+    # Import the CSV file into every target at once - each row is read and its body built once
+    # Returns the number of rows read and each target's results
+    #######
+
+    journalBase = args.journal[:-4] if args.journal and args.journal.endswith(".p1j") else (args.journal if args.journal else f"P1ImportUserJournal-{time.strftime('%Y%m%d-%H%M%S')}")
+    opened = [openTarget(target, args, runReport, tokenRefresh, journalBase) for target in targets]
+    fanOut = FanOut([fanOutTarget for fanOutTarget, journal in opened])
+    print(f'')
+    print(f'Importing into {len(targets)} targets - no target will fall more than {args.max_lag} batches of 100 users behind.')
+    infoLogger.info(f"Importing into {len(targets)} targets with a maximum lag of {args.max_lag} batches.")
+    print(f'')
+    if dashboard is not None:
+        dashboard.setGauge("queueDepth", lambda: max(fanOut.lags().values()) * 100)
+
+    totalRead = 0
+    try:
+        for csvRows in batches:
+            # A population of None is filled in with each target's default population as the user is sent
+            with spans.span("build"):
+                users = [buildUserPayload(dict(zip(importHeaders, csvRow)), None, p1PasswordReset) for csvRow in csvRows]
+                users = [(user, encodeBody(user) if user["population"]["id"] is not None else None) for user in users]
+            fanOut.send(users)
+            totalRead += len(csvRows)
+            runReport.recordRows(len(csvRows))
+            results = fanOut.results()
+            readProgress = f"{totalRead} of {expectedRows}" if expectedRows else f"{totalRead}"
+            print(f"Read: {readProgress}  " + "  ".join(f"{name}: {counts['succeeded']} ok, {counts['failed']} failed, {fanOut.lags()[name]} behind" for name, counts in results.items()))
+    except Exception as e:
+        print(f'Error reading CSV file: {e}')
+        infoLogger.error(f"Error reading CSV file: {e}")
+        quit()
+    fanOut.close()
+
+    print(f'')
+    results = fanOut.results()
+    for name, counts in results.items():
+        print(f"Target {name}: {counts['succeeded']} imported, {counts['failed']} failed, reader held back {counts['readerWaitSeconds']} s")
+        infoLogger.info(f"Target {name}: {counts['succeeded']} imported, {counts['failed']} failed of {counts['processed']}")
+    print(f'')
+    for fanOutTarget, journal in opened:
+        closeJournal(journal)
+    return totalRead, results
+
+def openCredentialPool(p1ClientId, p1ClientSecret, p1ClientType, p1Geography, p1Environment, tokenRefresh, clientRate):
+    #######
+    # Spread user calls across the P1Config client and the worker clients in the [Client:NAME] sections of the configuration file
+    #######
+
+    try:
+        configFile = configparser.ConfigParser()
+        configFile.read('P1ImportUser.cfg')
+        clients = [{"name": "P1Config", "clientId": p1ClientId, "clientSecret": p1ClientSecret, "clientType": p1ClientType, "rate": clientRate}]
+        clients += readClientSections(configFile, p1ClientType, clientRate)
+        if len(clients) == 1:
+            raise CredentialPoolError("no [Client:NAME] sections were found")
+        pool = CredentialPool(p1Session, clients, p1Geography, p1Environment, tokenRefresh)
+        pool.validate()
+    except (configparser.Error, CredentialPoolError) as e:
+        print(f'Error setting up the client pool: {e}')
+        infoLogger.error(f"Error setting up the client pool: {e}")
+        quit()
+
+    print(f'User calls will be spread across {len(clients)} worker clients: {", ".join(client["name"] for client in clients)}.')
+    infoLogger.info(f"User calls will be spread across {len(clients)} worker clients: {', '.join(client['name'] for client in clients)}.")
+    print(f'')
+    return pool
+
+def printEnding(startTime, endTime, runReport, reportFile, profiler=None):
+    #######
+    # Print the ending message and write the run report
+    #######
+
+    profileLines = finishProfiling(profiler, runReport)
+    if profileLines:
+        print(f'Profile - where the time went:')
+        for line in profileLines:
+            print(f'  {line}')
+            infoLogger.info(f"Profile - {line}")
+        print(f'')
+
     print(f'PingOne User Import Utility - Ending')
     print(f'')
     infoLogger.info(f"Ending import tool: {endTime}")
@@ -629,9 +1027,41 @@ def printEnding(startTime, endTime):
     totalTime = endTime - startTime
     print(f'Total time taken: {totalTime} ms')
     infoLogger.info(f"Total time taken: {totalTime} ms")
+
+    try:
+        runReport.write(reportFile)
+        print(f'Run report written to: {reportFile}')
+        infoLogger.info(f"Run report written to: {reportFile}")
+    except OSError as e:
+        print(f'Error writing run report {reportFile}: {e}')
+        infoLogger.error(f"Error writing run report {reportFile}: {e}")
     
 
+def parseArguments():
+    #######
+    # Parse the command line options
+    #######
+
+    parser = argparse.ArgumentParser(description="PingOne User Import Utility - imports the CSV file configured in P1ImportUser.cfg")
+    parser.add_argument("--report", help="File name for the JSON run report (default: P1ImportUserReport-<timestamp>.json)")
+    parser.add_argument("--journal", help="File name for the journal of created users (default: P1ImportUserJournal-<timestamp>.p1j)")
+    parser.add_argument("--sync", action="store_true", help="Only send the changes between the CSV and the users already in PingOne")
+    parser.add_argument("--sync-delete", action="store_true", help="With --sync, also delete users that are not in the CSV")
+    parser.add_argument("--max-deletes", type=int, help="With --sync-delete, delete without asking when no more than this many users would be deleted, and delete none when there are more")
+    parser.add_argument("--dry-run", action="store_true", help="With --sync, print the changes without sending them")
+    parser.add_argument("--dashboard", action="store_true", help="Show a live dashboard of the import rate, status codes, in-flight calls and ETA")
+    parser.add_argument("--restore", metavar="ARCHIVE", help="Create again the users in an archive written by P1BulkDelete.py --archive, instead of importing the CSV file")
+    parser.add_argument("--client-pool", action="store_true", help="Spread user calls across the P1Config client and the worker clients in the [Client:NAME] sections of the configuration file")
+    parser.add_argument("--client-rate", type=float, default=0, help="With --client-pool, maximum calls per second for each client unless its section sets a rate (default: 0, no limit)")
+    parser.add_argument("--targets", metavar="NAMES", help="Import into several environments at once - comma separated [Target:NAME] sections of the configuration file, default for the P1Config environment, or all")
+    parser.add_argument("--max-lag", type=int, default=10, help="With --targets, batches of 100 users the slowest target may fall behind before reading waits for it (default: 10)")
+    addLoggingArguments(parser)
+    addGovernorArguments(parser)
+    addProfilingArguments(parser)
+    return parser.parse_args()
+
 def main():
+    global credentialPool
 
     version = "0.2"
     workingDirectory = os.getcwd()
@@ -645,7 +1075,6 @@ def main():
     tokenRefresh = ""
     csvPath = ""
     csvHeaders = []
-    endOfCsv = False
     csvRows = []
     oneSecond = 1
     p1At = ""
@@ -660,41 +1089,139 @@ def main():
     successfulImport = 0
     failedImport = 0
     executor = ThreadPoolExecutor(max_workers=100)
-    
+
+    args = parseArguments()
+    if (args.dry_run or args.sync_delete) and not args.sync:
+        print(f'Error: --dry-run and --sync-delete can only be used with --sync.')
+        quit()
+    if args.max_deletes is not None and not args.sync_delete:
+        print(f'Error: --max-deletes can only be used with --sync-delete.')
+        quit()
+    if args.restore and args.sync:
+        print(f'Error: --restore cannot be used with --sync.')
+        quit()
+    if args.targets and (args.sync or args.restore):
+        print(f'Error: --targets cannot be used with --sync or --restore.')
+        quit()
+    if args.targets and args.client_pool:
+        print(f'Error: --client-pool cannot be used with --targets - each target uses its own client.')
+        quit()
+    startLogging(args, [(infoLogger, "P1ImportUser.log"), (detailedFailureLogger, "P1ImportUserFailuresDetail.log")])
+    profiler = startProfiling(args, [infoLogger, detailedFailureLogger])
+    runReport = RunReport("PingOne User Import", version)
+    attachReport(p1Session, runReport)
+    reportFile = args.report if args.report else defaultReportName("P1ImportUserReport")
     startTime = printWelcome(version)
     configVersion, configWorkingDirectory, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, tokenRefresh, p1DefaultPopulation, p1PasswordReset, csvPath = readConfigurationFile(workingDirectory, configVersion, configWorkingDirectory, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, tokenRefresh, p1DefaultPopulation, p1PasswordReset, csvPath)
+    startGovernor(args, p1Session, p1Environment, "UserImport")
     checkWorkingDirectory(workingDirectory, configWorkingDirectory)
     checkVersion(configVersion, version)
     performClientTest(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+    if args.client_pool:
+        credentialPool = openCredentialPool(p1ClientId, p1ClientSecret, p1ClientType, p1Geography, p1Environment, tokenRefresh, args.client_rate)
+    if args.restore:
+        # The archive holds whole user records - the CSV file and column checks are not needed
+        p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+        currentUserCount = getExistingUsercount(p1At, p1Environment, p1Geography)
+        journalFile = args.journal if args.journal else f"P1ImportUserJournal-{time.strftime('%Y%m%d-%H%M%S')}.p1j"
+        journal = openJournal(journalFile, p1Environment)
+        totalProcessed, successfulImport, failedImport = restoreArchive(args.restore, executor, runReport, journal, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh, p1DefaultPopulation)
+        closeJournal(journal)
+        endTime = int(time.time() * 1000)
+        if credentialPool is not None:
+            runReport.setTotals(clients=credentialPool.stats())
+        runReport.setTotals(processed=totalProcessed, succeeded=successfulImport, failed=failedImport, existingUsers=currentUserCount, restoredFrom=args.restore)
+        printEnding(startTime, endTime, runReport, reportFile, profiler)
+        return
     ensureCsvExists(csvPath)
-    csvHeaders, csvReader = readCsvHeaders(csvPath)
+    expectedRows, csvEncoding = readCsvProfileConfig(csvPath, args.rate)
+    csvHeaders, csvReader = readCsvHeaders(csvPath, csvEncoding or 'utf-8-sig')
     p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
     nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
-    p1Attributes = getP1UserAttributes(p1At, p1Environment, p1Geography)
+    p1Attributes = getP1UserAttributes(TokenManager(p1Session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh))
     while (validCsvHeaders == "false"):
-        validCsvHeaders, csvHeaders = validateCsvHeaders(csvPath)
+        validCsvHeaders, csvHeaders = validateCsvHeaders(csvPath, csvEncoding or 'utf-8-sig')
     printMappingIntro()
-    checkHeadersVsAttributes(csvHeaders, p1Attributes)
+    columnMapping = readMappingConfig(csvHeaders)
+    if columnMapping is not None:
+        importHeaders = columnMapping.attributes
+    else:
+        importHeaders = csvHeaders
+    checkHeadersVsAttributes(importHeaders, p1Attributes)
     currentUserCount = getExistingUsercount(p1At, p1Environment, p1Geography)
+    passwordHasher = None if args.dry_run else readPasswordHashConfig(importHeaders)
+    if args.targets:
+        targets = readTargets(args.targets, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, p1DefaultPopulation, args.rate)
+        dashboard = None
+        if args.dashboard:
+            dashboard = Dashboard("PingOne User Import", runReport)
+            dashboard.setTotal(expectedRows)
+            dashboard.start()
+        try:
+            with open(csvPath, 'r', newline='', encoding=csvEncoding) as csvFile:
+                csvFileReader = csv.reader(csvFile)
+                headers = next(csvFileReader)
+                batches = readBatches(csvFileReader)
+                if columnMapping is not None:
+                    batches = columnMapping.mapBatches(batches)
+                if passwordHasher is not None:
+                    batches = passwordHasher.hashBatches(batches)
+                totalProcessed, targetResults = runFanOut(batches, importHeaders, targets, args, runReport, tokenRefresh, p1PasswordReset, dashboard, expectedRows)
+        except OSError as e:
+            print(f'Error reading CSV file: {e}')
+            infoLogger.error(f"Error reading CSV file: {e}")
+            quit()
+        if dashboard is not None:
+            dashboard.stop()
+        if passwordHasher is not None:
+            passwordHasher.close()
+        endTime = int(time.time() * 1000)
+        runReport.setTotals(processed=totalProcessed, succeeded=sum(counts["succeeded"] for counts in targetResults.values()), failed=sum(counts["failed"] for counts in targetResults.values()), existingUsers=currentUserCount, expectedRows=expectedRows, targets=targetResults, maxLagBatches=args.max_lag)
+        printEnding(startTime, endTime, runReport, reportFile, profiler)
+        return
+    liveIndex = None
+    syncSummary = SyncSummary()
+    if args.sync:
+        liveIndex = loadLiveIndex(importHeaders, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh)
+    journal = None
+    if not args.dry_run:
+        journalFile = args.journal if args.journal else f"P1ImportUserJournal-{time.strftime('%Y%m%d-%H%M%S')}.p1j"
+        journal = openJournal(journalFile, p1Environment)
+
+    # Users submitted in the current batch - the dashboard's queue depth is those not yet finished
+    batchThreads = []
+    dashboard = None
+    if args.dashboard:
+        dashboard = Dashboard("PingOne User Import", runReport, p1Session)
+        dashboard.setGauge("tokenAge", lambda: time.time() - lastTokenTime / 1000)
+        dashboard.setGauge("queueDepth", lambda: sum(1 for thread in list(batchThreads) if not thread.done()))
+        dashboard.setTotal(expectedRows)
+        dashboard.start()
 
     try:
-        with open(csvPath, 'r', newline='') as csvFile:
+        with open(csvPath, 'r', newline='', encoding=csvEncoding) as csvFile:
             csvFileReader = csv.reader(csvFile)
             headers = next(csvFileReader)
-            while not endOfCsv:
+            batches = readBatches(csvFileReader)
+            if columnMapping is not None:
+                batches = columnMapping.mapBatches(batches)
+            if passwordHasher is not None:
+                # Hash upcoming batches in the process pool while the current batch is being sent
+                batches = passwordHasher.hashBatches(batches)
+            for csvRows in batches:
                 currentTime = int(time.time() * 1000)
                 if currentTime > nextToken:
                     p1At, lastTokenTime = getP1At(p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
                     nextToken = lastTokenTime + (tokenRefresh * 60 * 1000)
-                csvRows = []
                 threads = []
-                numRead = 0
-                numRead, csvRows = readNext100(csvFileReader)
-                if numRead < 100:
-                    endOfCsv = True
-                for csvRow in csvRows:
-                    thread = executor.submit(importUser, csvRow, csvHeaders, p1Geography, p1Environment, p1At, p1DefaultPopulation, p1PasswordReset)
-                    threads.append(thread)
+                numRead = len(csvRows)
+                if liveIndex is not None:
+                    threads = submitSyncBatch(executor, csvRows, importHeaders, liveIndex, syncSummary, args.dry_run, p1Geography, p1Environment, p1At, p1DefaultPopulation, p1PasswordReset, journal)
+                else:
+                    for csvRow in csvRows:
+                        thread = executor.submit(importUser, csvRow, importHeaders, p1Geography, p1Environment, p1At, p1DefaultPopulation, p1PasswordReset, journal)
+                        threads.append(thread)
+                batchThreads = threads
                 for thread in as_completed(threads):
                     try:
                         threadResult = thread.result()
@@ -711,8 +1238,14 @@ def main():
 #                    t.start()
 #                for t in threads:
 #                    t.join()
+                if journal is not None:
+                    journal.flush()
                 totalProcessed += numRead
-                print(f"Processed: {totalProcessed}")
+                runReport.recordRows(numRead)
+                if expectedRows:
+                    print(f"Processed: {totalProcessed} of {expectedRows} ({min(totalProcessed / expectedRows, 1):.1%})")
+                else:
+                    print(f"Processed: {totalProcessed}")
                 infoLogger.info(f'Total Processed {p1Environment} is: {totalProcessed}')
                 print(f"Total succeeded: {successfulImport}")
                 infoLogger.info(f'Total succeeded {p1Environment} is: {successfulImport}')
@@ -722,7 +1255,31 @@ def main():
         print(f'Error reading CSV file: {e}')
         infoLogger.error(f"Error reading CSV file: {e}")
         quit()
+    if dashboard is not None:
+        dashboard.stop()
+    if passwordHasher is not None:
+        passwordHasher.close()
+    deleteAudit = None
+    if liveIndex is not None and args.sync_delete:
+        unmatchedUsers = liveIndex.unmatched()
+        for username, userId in unmatchedUsers:
+            syncSummary.add("delete", username)
+        if unmatchedUsers and not args.dry_run and confirmSyncDelete(syncSummary, args.max_deletes):
+            deleteAudit = f"P1ImportSyncDeleted-{time.strftime('%Y%m%d-%H%M%S')}.csv"
+            syncDeleteUsers(unmatchedUsers, deleteAudit, syncSummary, executor, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh)
+    if journal is not None:
+        closeJournal(journal)
+    if liveIndex is not None:
+        printSyncSummary(syncSummary, args.dry_run)
+        runReport.setTotals(syncChanges=syncSummary.counts)
+    if deleteAudit is not None:
+        runReport.setTotals(deleted=syncSummary.deleted, deleteFailed=syncSummary.deleteFailed, deleteAudit=deleteAudit)
+    if credentialPool is not None:
+        runReport.setTotals(clients=credentialPool.stats())
     endTime = int(time.time() * 1000)
-    printEnding(startTime, endTime)
+    runReport.setTotals(processed=totalProcessed, succeeded=successfulImport, failed=failedImport, existingUsers=currentUserCount, expectedRows=expectedRows)
+    printEnding(startTime, endTime, runReport, reportFile, profiler)
 
-main()
+# Guarded so the password hashing worker processes can import this module without starting an import
+if __name__ == "__main__":
+    main()
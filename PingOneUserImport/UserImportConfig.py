@@ -1,15 +1,23 @@
 # PingOne Import Tool - Configurator
-# Last Update: June 26, 2025
+# Last Update: October 19, 2026
 # Authors: Matt Pollicove, Jeremy Carrier
 
 import os
+import sys
 import re
 import requests
-import base64
 import csv
 import pwinput
+import argparse
 import configparser
 
+# Make the shared pingoneutilities package importable when run from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pingoneutilities.mapping import ColumnMapping, MappingError, findUnknownNames, readMappingSection
+from pingoneutilities.auth import convertCreds
+from pingoneutilities.csvprofile import estimateSeconds, profileCsv, profileSection
+from pingoneutilities.dashboard import formatSeconds
+
 def printWelcome(version):
     # *********
     # Prints a welcome message and instructions for the configuration tool.
@@ -98,16 +106,6 @@ def getP1ClientSecret():
     print(f'')
     return getClientSecret
 
-def convertCreds(p1ClientId, p1ClientSecret):
-    # *********
-    # Converts the client ID and secret to a base64-encoded string for HTTP Basic Auth.
-    # *********
-    credString = p1ClientId + ":" + p1ClientSecret
-    credBytes = credString.encode("ascii")
-    b64CredBytes = base64.b64encode(credBytes)
-    b64CredString = b64CredBytes.decode("ascii") 
-    return b64CredString
-
 def performClientTestBasic(p1ClientId, p1ClientSecret, p1Geography, p1Environment):
     # *********
     # Attempts to authenticate with PingOne using the provided credentials using BASIC auth.
@@ -286,6 +284,40 @@ def getCsvFileName():
             print(f'')
             getFileName = getCsvFileName()
 
+def profileCsvFile(userFile, defaultRate):
+    # *********
+    # Profiles the CSV file - encoding, rows to import, blank rows, column fill rates and an estimated import time.
+    # *********
+    print(f'Profiling the CSV file.')
+    try:
+        csvProfile = profileCsv(userFile)
+    except (OSError, ValueError) as csvException:
+        print(f'')
+        print(f"*********************************************************************************************************")
+        print(f"There was an issue profiling your CSV file: ", csvException)
+        print(f"Please correct this issue and retry.  Exiting.")
+        print(f"*********************************************************************************************************")
+        print(f'')
+        quit()
+
+    bomText = " with a byte order mark" if csvProfile['bom'] else ""
+    print(f"File size: {csvProfile['fileSize'] / 1048576:.1f} MB, encoding: {csvProfile['encoding']}{bomText}")
+    print(f"Users to import: {csvProfile['rows']:,}")
+    if csvProfile['blankRows'] > 0:
+        print(f"Blank rows (skipped by the import): {csvProfile['blankRows']:,}")
+    if csvProfile['rowsSampled'] > 0:
+        print(f"Column fill rates (first {csvProfile['rowsSampled']:,} users):")
+        for header, fillRate in csvProfile['fillRates'].items():
+            print(f"  {header:<40} {fillRate:>7.1%}")
+        emptyColumns = [header for header, fillRate in csvProfile['fillRates'].items() if fillRate == 0]
+        if emptyColumns:
+            print(f"These columns have no values in the rows read and will not set anything: {', '.join(emptyColumns)}")
+    estimate = estimateSeconds(csvProfile['rows'], defaultRate)
+    print(f"Estimated import time at {defaultRate} calls per second (the importer's default --rate): at least {formatSeconds(estimate)}")
+    print(f"Profiled in {csvProfile['seconds']} seconds")
+    print(f'')
+    return csvProfile
+
 def getSubattributes(p1AttributeNames, p1Attribute):
     # *********
     # Appends subattribute names for complex PingOne attributes to the attribute list.
@@ -364,7 +396,7 @@ def getP1UserAttributes(p1At, p1Environment, p1Geography):
         quit()
 
 
-def validateCsvHeaders(userFile):
+def validateCsvHeaders(userFile, encoding='utf-8-sig'):
     # *********
     #  Reads and returns the headers from the provided CSV file.
     # Returns a tuple ("true", [headers]) if successful.
@@ -372,7 +404,7 @@ def validateCsvHeaders(userFile):
     readCsvHeaders = []
 
     try:
-        with open(userFile, 'r', newline='', encoding='utf-8-sig') as csvFile:
+        with open(userFile, 'r', newline='', encoding=encoding) as csvFile:
             csvFileReader = csv.reader(csvFile)
             csvFileHeaders = next(csvFileReader)
     except Exception as csvException:
@@ -397,29 +429,93 @@ def printMappingIntro():
     print(f"The configuration tool will now validate the CSV headers against the available attributes in the provided PingOne environment.")
     print(f'')
 
+def checkExistingMapping(workingDirectory, csvHeaders, p1Attributes):
+    # *********
+    # If the current configuration file has a Mapping section that still fits the CSV and environment, offers to keep it.
+    # Returns the Mapping section entries, or None.
+    # *********
+    existingMapping = readMappingSection(workingDirectory + "/P1ImportUser.cfg")
+    if existingMapping is None:
+        return None
+
+    try:
+        ColumnMapping(existingMapping, csvHeaders)
+    except MappingError as e:
+        print(f'The existing column mapping no longer matches the CSV file ({e}) and will be replaced.')
+        print(f'')
+        return None
+    if findUnknownNames(list(existingMapping.keys()), p1Attributes):
+        print(f'The existing column mapping refers to attributes that are not in this environment and will be replaced.')
+        print(f'')
+        return None
+
+    print(f'The existing configuration file maps {len(existingMapping)} PingOne attributes from your CSV columns.')
+    keepMapping = input(f'Keep the existing column mapping? (yes/no): [yes] ').strip().lower()
+    print(f'')
+    if not keepMapping or keepMapping == 'yes':
+        return existingMapping
+    return None
+
+def getColumnMapping(header, suggestions, p1Attributes, mappedAttributes):
+    # *********
+    # Prompts for the PingOne attribute an unmatched CSV column should map to, or "skip" to leave it out of the import.
+    # *********
+    defaultAttribute = "skip"
+    for suggestion in suggestions:
+        if suggestion not in mappedAttributes:
+            defaultAttribute = suggestion
+            break
+
+    getAttribute = input(f'Which PingOne attribute should CSV column ({header}) map to? (attribute name or skip): [{defaultAttribute}] ').strip()
+    if not getAttribute:
+        getAttribute = defaultAttribute
+    if getAttribute == "skip" or (getAttribute in p1Attributes and getAttribute not in mappedAttributes):
+        print(f'')
+        return getAttribute
+    else:
+        # Unknown or already mapped attribute, retry
+        print(f'')
+        print(f'******************************************************************************************************')
+        print(f'Error: ({getAttribute}) is not a PingOne attribute in this environment, or is already mapped.  Please retry.')
+        print(f'******************************************************************************************************')
+        print(f'')
+        return getColumnMapping(header, suggestions, p1Attributes, mappedAttributes)
+
 def checkHeadersVsAttributes(csvHeaders, p1Attributes):
     # *********
     # Checks if each CSV header matches a known PingOne attribute.
-    # Returns "true" if all headers match, otherwise "false".
+    # Unmatched headers are mapped to an attribute (closest matches are suggested) or skipped.
+    # Returns the Mapping section entries, or None if every header matches an attribute.
     # *********
-    print(csvHeaders)
+    unknownHeaders = dict(findUnknownNames(csvHeaders, p1Attributes))
+    if not unknownHeaders:
+        for header in csvHeaders:
+            print(f"CSV Header ({header}) matched with PingOne attribute ({header}).")
+        print(f'')
+        return None
+
+    print(f'Some CSV headers do not match a PingOne attribute.  Choose the attribute each of these columns should map to.')
+    print(f'If you are using a complex attribute, use the format <attribute>.<subattribute> (e.g., "name.given").')
+    print(f'')
+    mappingEntries = {}
     for header in csvHeaders:
-        print(header)
-        currentAttributeMappingMatch = "false"
-        for attribute in p1Attributes:
-            if(attribute == header):
-                currentAttributeMappingMatch = "true"
-                print(f"CSV Header ({header}) matched with PingOne attribute ({attribute}).")
-        if currentAttributeMappingMatch == "false":
-            print(f'')
-            print(f'******************************************************************************************************************************************************')
-            print(f"Unable to map CSV Header ({header}) with any known PingOne attribute.  Please check your CSV file and ensure the headers match the PingOne attributes.")
-            print(f'If you are using a complex attribute, please ensure the header is in the format of <attribute>.<subattribute> (e.g., "name.given").')
-            print(f'Exiting.')
-            print(f'******************************************************************************************************************************************************')
+        if header not in unknownHeaders:
+            print(f"CSV Header ({header}) matched with PingOne attribute ({header}).")
+            mappingEntries[header] = "{" + header + "}"
+    print(f'')
+    for header in csvHeaders:
+        if header in unknownHeaders:
+            attribute = getColumnMapping(header, unknownHeaders[header], set(p1Attributes), mappingEntries)
+            if attribute == "skip":
+                print(f"CSV Header ({header}) will not be imported.")
+            else:
+                mappingEntries[attribute] = "{" + header + "}"
+                print(f"CSV Header ({header}) mapped to PingOne attribute ({attribute}).")
             print(f'')
-            quit()
+
+    print(f'The column mapping will be written to the Mapping section of the configuration file, where transforms can be added (see the readme).')
     print(f'')
+    return mappingEntries
 
 def getForcedPasswordChange():
     # *********
@@ -442,6 +538,32 @@ def getForcedPasswordChange():
             print(f'')
             getPasswordChange = getForcedPasswordChange()
 
+def getPasswordHashing(importAttributes):
+    # *********
+    # If the CSV has a password column, asks whether passwords should be hashed before they are sent to PingOne.
+    # *********
+    if "password" not in importAttributes:
+        return "none"
+
+    print(f'Cleartext passwords can be hashed locally before they are sent to PingOne.  Supported encodings: bcrypt, ssha512.')
+    print(f'Passwords in the CSV that are already encoded (e.g. {{SSHA512}}... or $2b$...) are sent unchanged.')
+    getHashAlgorithm = input(f'How should passwords be hashed before import? (none/bcrypt/ssha512): [none] ')
+    if not getHashAlgorithm:
+        print(f'')
+        return "none"
+    else:
+        if re.match(r"^(none|bcrypt|ssha512)$", getHashAlgorithm.lower()):
+            print(f'')
+            return getHashAlgorithm.lower()
+        else:
+            # Invalid input, retry
+            print(f'')
+            print(f'****************************************************************')
+            print(f'Error: Please respond with none, bcrypt, or ssha512.')
+            print(f'****************************************************************')
+            print(f'')
+            return getPasswordHashing(importAttributes)
+
 def getP1Populations(p1At, p1Environment, p1Geography):
     # *********
     # Retrieves the list of populations from the PingOne environment.
@@ -501,17 +623,90 @@ def getDefaultPopulation(p1At, p1Environment, p1Geography, defaultPopulation, gu
             print(f'')
             getDefaultPopulation = getDefaultPopulation()
 
-def writeConfigFile(version, workingDirectory, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, tokenRefresh, userFile, forcedPasswordChange, defaultPopulation):
+def readExistingConfig(workingDirectory):
     # *********
-    # Writes the configuration details to a config file in the working directory.
+    # Reads the current configuration file, if there is one, keeping option name case and literal % characters.
     # *********
-    configFile = configparser.ConfigParser()
+    configFile = configparser.ConfigParser(interpolation=None)
+    configFile.optionxform = str
+    configFile.read(workingDirectory + "/P1ImportUser.cfg")
+    return configFile
 
-    configFile['General']  = {'version': version, 'workingDirectory':workingDirectory}
-    configFile['P1Config'] = {'p1Environment':p1Environment, 'p1Geography':p1Geography, 'p1ClientId':p1ClientId, 'p1ClientSecret':p1ClientSecret, 'p1ClientType':p1ClientType, 'tokenRefresh':tokenRefresh, 'forcedPasswordChange':forcedPasswordChange, 'defaultPopulation':defaultPopulation}
-    configFile['CSV'] = {'CSV Path':userFile}
-    with open(workingDirectory + "/P1ImportUser.cfg", "w") as csvFile:
-        configFile.write(csvFile)
+def setOptions(configFile, sectionName, options, keepExisting=False):
+    # *********
+    # Sets options in a section, replacing any existing spelling of each name (the importer reads names in any case).
+    # With keepExisting, options that already have a value are left as they are.
+    # *********
+    if sectionName not in configFile:
+        configFile[sectionName] = {}
+    section = configFile[sectionName]
+    for name, value in options.items():
+        existingNames = [existingName for existingName in section if existingName.lower() == name.lower()]
+        if keepExisting and existingNames:
+            continue
+        for existingName in existingNames:
+            del section[existingName]
+        section[name] = str(value)
+
+def removeOptions(configFile, sectionName, names):
+    if sectionName not in configFile:
+        return
+    lowerNames = {name.lower() for name in names}
+    for existingName in [existingName for existingName in configFile[sectionName] if existingName.lower() in lowerNames]:
+        del configFile[sectionName][existingName]
+
+def saveConfig(workingDirectory, configFile):
+    with open(workingDirectory + "/P1ImportUser.cfg", "w") as cfgFile:
+        configFile.write(cfgFile)
+
+def setCsvProfile(configFile, csvProfile):
+    # *********
+    # Stores the CSV profile in the CSV section, or removes an old one when the file was not profiled.
+    # The importer uses the row count for its progress only while the file's size and modification time still match.
+    # *********
+    if csvProfile is not None:
+        setOptions(configFile, 'CSV', profileSection(csvProfile))
+    else:
+        removeOptions(configFile, 'CSV', ['rows', 'encoding', 'fileSize', 'modified'])
+
+def writeConfigFile(version, workingDirectory, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, tokenRefresh, userFile, forcedPasswordChange, defaultPopulation, hashAlgorithm, mappingEntries, csvProfile=None):
+    # *********
+    # Writes the configuration details to the config file in the working directory.
+    # Only the options this tool asks about are replaced - [Target:NAME] and [Client:NAME] sections, tuned
+    # Passwords options and anything else already in the file are kept.
+    # *********
+    configFile = readExistingConfig(workingDirectory)
+
+    setOptions(configFile, 'General', {'version': version, 'workingDirectory':workingDirectory})
+    setOptions(configFile, 'P1Config', {'p1Environment':p1Environment, 'p1Geography':p1Geography, 'p1ClientId':p1ClientId, 'p1ClientSecret':p1ClientSecret, 'p1ClientType':p1ClientType, 'tokenRefresh':tokenRefresh, 'forcedPasswordChange':forcedPasswordChange, 'defaultPopulation':defaultPopulation})
+    setOptions(configFile, 'CSV', {'CSV Path':userFile})
+    setCsvProfile(configFile, csvProfile)
+    setOptions(configFile, 'Passwords', {'hashAlgorithm':hashAlgorithm})
+    setOptions(configFile, 'Passwords', {'hashColumns':'password', 'hashWorkers':'0', 'bcryptRounds':'10'}, keepExisting=True)
+    # The mapping always matches the CSV just checked - mapping entries keep their attribute name case and may contain % (date formats)
+    if 'Mapping' in configFile:
+        configFile.remove_section('Mapping')
+    if mappingEntries is not None:
+        configFile['Mapping'] = mappingEntries
+    saveConfig(workingDirectory, configFile)
+
+def profileOnly(workingDirectory, defaultRate):
+    # *********
+    # Profiles the CSV file named in the existing configuration file again and rewrites only its profile in the CSV section.
+    # *********
+    configFile = readExistingConfig(workingDirectory)
+    csvPaths = [value for name, value in configFile['CSV'].items() if name.lower() == 'csv path'] if 'CSV' in configFile else []
+    if not csvPaths:
+        print(f'Error: {workingDirectory}/P1ImportUser.cfg has no CSV Path.  Run the configuration tool without --profile-csv first.')
+        quit()
+    userFile = csvPaths[0]
+    if not os.path.exists(userFile):
+        print(f'Error: CSV file not found at {userFile}.')
+        quit()
+    csvProfile = profileCsvFile(userFile, defaultRate)
+    setCsvProfile(configFile, csvProfile)
+    saveConfig(workingDirectory, configFile)
+    print(f'The CSV profile has been written to {workingDirectory}/P1ImportUser.cfg')
 
 def closeConfigurator(workingDirectory):
     # *********
@@ -541,6 +736,17 @@ def main():
     csvHeaders = []
     forcedPasswordChange = "false"
     defaultPopulation = "aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"
+    hashAlgorithm = "none"
+    mappingEntries = None
+    csvProfile = None
+    defaultRate = 100
+
+    parser = argparse.ArgumentParser(description="Configure the PingOne User Import Tool")
+    parser.add_argument("--profile-csv", action="store_true", help="Only profile the CSV file named in the existing configuration file again and update its row count")
+    args = parser.parse_args()
+    if args.profile_csv:
+        profileOnly(workingDirectory, defaultRate)
+        return
 
     printWelcome(version)
     getConfigFileName(workingDirectory)
@@ -554,14 +760,19 @@ def main():
         if (p1ClientType != "failed"):
             tokenRefresh = getTokenRefreshDuration()
     userFile = getCsvFileName()
+    csvProfile = profileCsvFile(userFile, defaultRate)
     p1Attributes = getP1UserAttributes(p1AccessToken, p1Environment, p1Geography)
     while (validCsvHeaders == "false"):
-        validCsvHeaders, csvHeaders = validateCsvHeaders(userFile)
+        validCsvHeaders, csvHeaders = validateCsvHeaders(userFile, csvProfile['encoding'])
     printMappingIntro()
-    checkHeadersVsAttributes(csvHeaders, p1Attributes)
+    mappingEntries = checkExistingMapping(workingDirectory, csvHeaders, p1Attributes)
+    if mappingEntries is None:
+        mappingEntries = checkHeadersVsAttributes(csvHeaders, p1Attributes)
     forcedPasswordChange = getForcedPasswordChange()
+    hashAlgorithm = getPasswordHashing(list(mappingEntries.keys()) if mappingEntries is not None else csvHeaders)
     defaultPopulation = getDefaultPopulation(p1AccessToken, p1Environment, p1Geography, defaultPopulation, guidFormat)
-    writeConfigFile(version, workingDirectory, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, tokenRefresh, userFile, forcedPasswordChange, defaultPopulation)
+    writeConfigFile(version, workingDirectory, p1Environment, p1Geography, p1ClientId, p1ClientSecret, p1ClientType, tokenRefresh, userFile, forcedPasswordChange, defaultPopulation, hashAlgorithm, mappingEntries, csvProfile)
     closeConfigurator(workingDirectory)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# PingOne User Migration Tool
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+
+import os
+import sys
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Make the shared pingoneutilities package importable when run from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pingoneutilities.logpipeline import addLoggingArguments, startLogging
+from pingoneutilities.governor import RateGovernor, addGovernorArguments
+from pingoneutilities.p1http import createSession, attachReport
+from pingoneutilities.runreport import RunReport, defaultReportName
+from pingoneutilities.prompts import getP1Connection
+from pingoneutilities.scan import PartitionedScanner, listPopulations
+from pingoneutilities.payload import buildUserPayload, copyableAttributes
+from pingoneutilities.jsoncodec import encodeBody
+
+# Log files are attached to these loggers by startLogging() in main()
+infoLogger = logging.getLogger("mainLog")
+infoLogger.setLevel(logging.INFO)
+detailedFailureLogger = logging.getLogger("dFLog")
+detailedFailureLogger.setLevel(logging.ERROR)
+
+def printWelcome(version):
+    #######
+    # Print the welcome message
+    #######
+
+    startTime = int(time.time() * 1000)
+
+    print(f'')
+    print(f'********************************************')
+    print(f'PingOne User Migration Utility - version {version}')
+    print(f'********************************************')
+    print(f'')
+    print(f'Actions will be written to the log file P1UserMigrate.log')
+    print(f'Detailed failures will be written to the log file P1UserMigrateFailuresDetail.log')
+    print(f'')
+    print(f'This tool copies users from a source environment into a target environment.')
+    print(f'For each of the two environments you will need the following:')
+    print(f'1) Your PingOne Environment ID')
+    print(f'2) Your PingOne Geography')
+    print(f'3) A PingOne Worker Client ID and Client Secret')
+    print(f'')
+
+    infoLogger.info(f"PingOne User Migration Utility - version {version}")
+    infoLogger.info(f"Starting migration tool: {startTime}")
+
+    return startTime
+
+def buildPopulationMap(sourceSession, sourceTokens, targetSession, targetTokens):
+    #######
+    # Map source population IDs to the target population with the same name
+    # Returns the map and the target default population used for unmatched populations
+    #######
+
+    try:
+        sourcePopulations = listPopulations(sourceSession, sourceTokens)
+        targetPopulations = listPopulations(targetSession, targetTokens)
+    except Exception as e:
+        print(f'Error reading populations: {e}')
+        infoLogger.error(f"Error reading populations: {e}")
+        quit()
+
+    targetByName = {population['name']: population['id'] for population in targetPopulations}
+    targetDefault = next((population['id'] for population in targetPopulations if population.get('default')), None)
+    if targetDefault is None and targetPopulations:
+        targetDefault = targetPopulations[0]['id']
+
+    populationMap = {}
+    for population in sourcePopulations:
+        if population['name'] in targetByName:
+            populationMap[population['id']] = targetByName[population['name']]
+            print(f"Population '{population['name']}' will be migrated to the target population of the same name")
+            infoLogger.info(f"Population {population['name']} mapped to {targetByName[population['name']]}")
+        else:
+            populationMap[population['id']] = targetDefault
+            print(f"Population '{population['name']}' has no match in the target - users will go to the target default population")
+            infoLogger.info(f"Population {population['name']} not found in target - mapped to default population {targetDefault}")
+    print(f'')
+    return sourcePopulations, populationMap, targetDefault
+
+def migrationPayload(sourceUser, populationMap, targetDefault):
+    #######
+    # Rebuild the import body for a source user, with its population mapped to the target
+    #######
+    userAttributes = copyableAttributes(sourceUser)
+    userAttributes["population.id"] = populationMap.get(userAttributes.get("population.id"), targetDefault)
+    return buildUserPayload(userAttributes, targetDefault, "false")
+
+def migrateUser(targetSession, targetTokens, user):
+    #######
+    # Create one user in the target environment
+    # Returns "created", "exists" (already migrated by an earlier run) or "failed"
+    #######
+
+    requestHeaders = targetTokens.authHeaders()
+    requestHeaders['Content-Type'] = 'application/vnd.pingidentity.user.import+json'
+    username = user.get('username', '[unknown]')
+
+    try:
+        createResponse = targetSession.post(targetTokens.apiUrl("/users"), headers=requestHeaders, data=encodeBody(user))
+    except Exception as e:
+        infoLogger.error(f"Error migrating user {username}: {e}", extra={"p1": {"event": "migrateFailed", "username": username}})
+        detailedFailureLogger.error(f"Failed migration for user {username}: {e}")
+        return "failed"
+
+    if createResponse.status_code == 201:
+        infoLogger.info(f"User migrated: {username}", extra={"p1": {"event": "userMigrated", "username": username, "success": True}})
+        return "created"
+    if createResponse.status_code == 409 or (createResponse.status_code == 400 and "UNIQUENESS_VIOLATION" in createResponse.text):
+        infoLogger.info(f"User already exists in target: {username}", extra={"p1": {"event": "userExists", "username": username, "success": True}})
+        return "exists"
+    infoLogger.error(f"Failed to migrate user {username} - see P1UserMigrateFailuresDetail.log for more information.", extra={"p1": {"event": "migrateFailed", "username": username, "status": createResponse.status_code}})
+    detailedFailureLogger.error(f"Failed migration for user {username}, details below:")
+    detailedFailureLogger.error(f"{createResponse.status_code} - {createResponse.text}")
+    return "failed"
+
+def readCheckpoint(checkpointFile, sourceEnvironment, targetEnvironment):
+    #######
+    # Read the partition cursors saved by an earlier run of the same migration
+    #######
+
+    try:
+        with open(checkpointFile, "r") as checkpoint:
+            checkpointJson = json.load(checkpoint)
+    except (OSError, ValueError) as e:
+        print(f'Error reading checkpoint file {checkpointFile}: {e}')
+        infoLogger.error(f"Error reading checkpoint file {checkpointFile}: {e}")
+        quit()
+
+    if checkpointJson.get('source') != sourceEnvironment or checkpointJson.get('target') != targetEnvironment:
+        print(f'Error: Checkpoint file {checkpointFile} is for a different source or target environment.')
+        infoLogger.error(f"Error: Checkpoint file {checkpointFile} is for a different source or target environment.")
+        quit()
+
+    print(f"Resuming migration - {sum(1 for url in checkpointJson['cursors'].values() if url == '')} partition(s) already complete")
+    infoLogger.info(f"Resuming migration from checkpoint {checkpointFile}")
+    print(f'')
+    return checkpointJson['cursors']
+
+def writeCheckpoint(checkpointFile, sourceEnvironment, targetEnvironment, cursors):
+    #######
+    # Save each partition's next page URL - written to a temporary file and renamed so it is never left half written
+    #######
+    checkpointJson = {"source": sourceEnvironment, "target": targetEnvironment, "cursors": cursors}
+    with open(checkpointFile + ".tmp", "w") as checkpoint:
+        json.dump(checkpointJson, checkpoint)
+    os.replace(checkpointFile + ".tmp", checkpointFile)
+
+def printEnding(startTime, endTime, runReport, reportFile):
+    #######
+    # Print the ending message and write the run report
+    #######
+
+    print(f'PingOne User Migration Utility - Ending')
+    print(f'')
+    infoLogger.info(f"Ending migration tool: {endTime}")
+
+    totalTime = endTime - startTime
+    print(f'Total time taken: {totalTime} ms')
+    infoLogger.info(f"Total time taken: {totalTime} ms")
+
+    try:
+        runReport.write(reportFile)
+        print(f'Run report written to: {reportFile}')
+        infoLogger.info(f"Run report written to: {reportFile}")
+    except OSError as e:
+        print(f'Error writing run report {reportFile}: {e}')
+        infoLogger.error(f"Error writing run report {reportFile}: {e}")
+
+def parseArguments():
+    #######
+    # Parse the command line options
+    #######
+
+    parser = argparse.ArgumentParser(description="PingOne User Migration Utility - copies users from one environment to another")
+    parser.add_argument("--filter", default="", help="PingOne filter expression limiting the source users migrated")
+    parser.add_argument("--source-rate", type=int, default=100, help="Maximum API calls per second for the source environment, across all tools (default: 100)")
+    parser.add_argument("--target-rate", type=int, default=100, help="Maximum API calls per second for the target environment, across all tools (default: 100)")
+    parser.add_argument("--page-size", type=int, default=500, help="Users read from the source per page (default: 500)")
+    parser.add_argument("--parallel", type=int, default=4, help="Source populations paged at the same time (default: 4)")
+    parser.add_argument("--buffer-pages", type=int, default=8, help="Pages read ahead of the target writers (default: 8)")
+    parser.add_argument("--writers", type=int, default=50, help="Concurrent create calls against the target (default: 50)")
+    parser.add_argument("--checkpoint", default="P1UserMigrate.checkpoint", help="File recording migration progress (default: P1UserMigrate.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted migration from the checkpoint file")
+    parser.add_argument("--report", help="File name for the JSON run report (default: P1UserMigrateReport-<timestamp>.json)")
+    addLoggingArguments(parser)
+    addGovernorArguments(parser, includeRate=False)
+    return parser.parse_args()
+
+def main():
+
+    version = "0.1"
+    totalProcessed = 0
+    successfulMigrate = 0
+    existingUsers = 0
+    failedMigrate = 0
+
+    args = parseArguments()
+    startLogging(args, [(infoLogger, "P1UserMigrate.log"), (detailedFailureLogger, "P1UserMigrateFailuresDetail.log")])
+    runReport = RunReport("PingOne User Migration", version)
+    reportFile = args.report if args.report else defaultReportName("P1UserMigrateReport")
+
+    # Each side has its own connection pool, token and rate budget so a slow side never holds up the other's calls
+    sourceSession = createSession(poolSize=max(4, args.parallel * 2))
+    targetSession = createSession(poolSize=args.writers)
+    attachReport(sourceSession, runReport)
+    attachReport(targetSession, runReport)
+
+    startTime = printWelcome(version)
+    print(f'Source environment')
+    print(f'')
+    sourceTokens = getP1Connection(sourceSession, "source ")
+    print(f'Target environment')
+    print(f'')
+    targetTokens = getP1Connection(targetSession, "target ")
+    sourceSession.rateLimiter = RateGovernor(sourceTokens.p1Environment, args.source_rate, args.rate_share, "P1UserMigrate", args.rate_dir)
+    targetSession.rateLimiter = RateGovernor(targetTokens.p1Environment, args.target_rate, args.rate_share, "P1UserMigrate", args.rate_dir)
+
+    sourcePopulations, populationMap, targetDefault = buildPopulationMap(sourceSession, sourceTokens, targetSession, targetTokens)
+    partitions = []
+    for population in sourcePopulations:
+        populationFilter = f'population.id eq "{population["id"]}"'
+        if args.filter:
+            populationFilter = f'({args.filter}) and {populationFilter}'
+        partitions.append((population['id'], populationFilter))
+
+    cursors = {}
+    if args.resume:
+        cursors = readCheckpoint(args.checkpoint, sourceTokens.p1Environment, targetTokens.p1Environment)
+
+    # The scanner threads keep reading source pages into a bounded queue while the writers create the previous page in the target
+    scanner = PartitionedScanner(sourceSession, sourceTokens, partitions, args.page_size, None, args.parallel, args.buffer_pages, dict(cursors))
+    executor = ThreadPoolExecutor(max_workers=args.writers)
+    try:
+        for partitionName, users, nextUrl in scanner.pagesWithCursors():
+            threads = [executor.submit(migrateUser, targetSession, targetTokens, migrationPayload(user, populationMap, targetDefault)) for user in users]
+            for thread in as_completed(threads):
+                threadResult = thread.result()
+                if threadResult == "created":
+                    successfulMigrate += 1
+                elif threadResult == "exists":
+                    existingUsers += 1
+                else:
+                    failedMigrate += 1
+            totalProcessed += len(users)
+            runReport.recordRows(len(users))
+            # Only recorded once every user on the page has been sent, so a resumed run never skips a user
+            cursors[partitionName] = nextUrl
+            writeCheckpoint(args.checkpoint, sourceTokens.p1Environment, targetTokens.p1Environment, cursors)
+            print(f"Processed: {totalProcessed}")
+            infoLogger.info(f'Total processed is: {totalProcessed}')
+            print(f"Total migrated: {successfulMigrate}")
+            infoLogger.info(f'Total migrated is: {successfulMigrate}')
+            print(f"Total already in target: {existingUsers}")
+            infoLogger.info(f'Total already in target is: {existingUsers}')
+            print(f"Total failed: {failedMigrate}")
+            infoLogger.info(f'Total failed is: {failedMigrate}')
+    except Exception as e:
+        print(f'Error during migration: {e}')
+        print(f'Run again with --resume to continue from the last completed page.')
+        infoLogger.error(f"Error during migration: {e}")
+        executor.shutdown(wait=True)
+        quit()
+    executor.shutdown(wait=True)
+
+    print(f'')
+    print(f'Migration complete.  Remove {args.checkpoint} before starting a new migration.')
+    infoLogger.info(f"Migration complete")
+    endTime = int(time.time() * 1000)
+    runReport.setTotals(processed=totalProcessed, succeeded=successfulMigrate, alreadyInTarget=existingUsers, failed=failedMigrate)
+    printEnding(startTime, endTime, runReport, reportFile)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# PingOne Utilities - shared components
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Components shared by the PingOne utilities in this repository, and a small
+# library API for programs that embed them:
+#
+#   from pingoneutilities import PingOneClient, DeleteJob
+#
+# Importing the package loads nothing else.  Each public name is imported from
+# its module the first time it is used, so a caller that only needs the
+# criteria parser does not pay for requests, curses or the worker pools.
+
+import importlib
+
+# Public name -> module that defines it
+_exports = {
+    "PingOneClient": "client",
+    "UserResult": "client",
+    "Job": "jobs",
+    "ImportJob": "jobs",
+    "DeleteJob": "jobs",
+    "P1ApiError": "auth",
+    "TokenManager": "auth",
+    "Criteria": "criteria",
+    "CriteriaError": "criteria",
+    "compileCriteria": "criteria",
+    "ArchiveWriter": "archive",
+    "readArchive": "archive",
+    "JournalWriter": "journal",
+    "readJournal": "journal",
+    "RunReport": "runreport",
+    "buildUserPayload": "payload",
+    "copyableAttributes": "payload",
+}
+
+__all__ = sorted(_exports)
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    # Later lookups find the name directly and skip this function
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
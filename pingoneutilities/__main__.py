@@ -0,0 +1,75 @@
+# PingOne Utilities - Non-interactive Entry Point
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A thin command line over the job API for schedulers and scripts:
+#
+#   python -m pingoneutilities import --csv users.csv --population ID
+#   python -m pingoneutilities delete --criteria 'lastSignOn never and created before 365d'
+#
+# Credentials come from the environment (P1_ENVIRONMENT_ID, P1_CLIENT_ID,
+# P1_CLIENT_SECRET and optionally P1_GEOGRAPHY and P1_CLIENT_TYPE), so nothing
+# is prompted for.  Each user's result is written to stdout as a JSON line and
+# the summary follows as the last line.  The interactive tools in each
+# utility's folder are unchanged.
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from pingoneutilities.client import PingOneClient
+from pingoneutilities.jobs import DeleteJob, ImportJob
+
+def parseArguments():
+    parser = argparse.ArgumentParser(prog="python -m pingoneutilities", description="Run a PingOne import or delete job without prompts")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent user calls (default: 32)")
+    parser.add_argument("--rate", type=float, default=100, help="Maximum API calls per second for the environment, shared with the other tools on this host (default: 100)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importParser = commands.add_parser("import", help="Create users from a CSV file with the import tool's dotted headers")
+    importParser.add_argument("--csv", required=True, help="CSV file of users")
+    importParser.add_argument("--population", required=True, help="Population ID for rows without one")
+    importParser.add_argument("--password-reset", action="store_true", help="Make imported users change their password at first sign on")
+    importParser.add_argument("--journal", help="Journal file of created users, for P1BulkDelete.py --rollback")
+
+    deleteParser = commands.add_parser("delete", help="Delete users chosen by a filter, criteria or list of IDs")
+    selection = deleteParser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--filter", help="PingOne users filter")
+    selection.add_argument("--criteria", help="Delete criteria, as for P1BulkDelete --criteria")
+    selection.add_argument("--ids", help="File of user IDs, one per line")
+    deleteParser.add_argument("--archive", help="Keep a copy of every deleted user in this file")
+    deleteParser.add_argument("--partition", action="store_true", help="Read users by population, concurrently")
+    return parser.parse_args()
+
+def readIds(fileName):
+    with open(fileName, "r", encoding="utf-8") as idFile:
+        for line in idFile:
+            if line.strip():
+                yield line.strip()
+
+def main():
+    args = parseArguments()
+    missing = [name for name in ("P1_ENVIRONMENT_ID", "P1_CLIENT_ID", "P1_CLIENT_SECRET") if not os.environ.get(name)]
+    if missing:
+        sys.exit(f"Set {', '.join(missing)} in the environment")
+
+    with PingOneClient(os.environ["P1_ENVIRONMENT_ID"], os.environ["P1_CLIENT_ID"], os.environ["P1_CLIENT_SECRET"], os.environ.get("P1_GEOGRAPHY", ".com"), os.environ.get("P1_CLIENT_TYPE"), callsPerSecond=args.rate, poolSize=max(args.workers, 10)) as client:
+        if args.command == "import":
+            csvFile = open(args.csv, "r", encoding="utf-8-sig", newline="")
+            job = ImportJob(client, csv.DictReader(csvFile), args.population, args.password_reset, args.journal, workers=args.workers)
+        else:
+            csvFile = None
+            job = DeleteJob(client, filter=args.filter, criteria=args.criteria, userIds=readIds(args.ids) if args.ids else None, archiveFile=args.archive, partitioned=args.partition, workers=args.workers)
+        try:
+            for result in job.results():
+                print(json.dumps(result._asdict()), flush=True)
+        finally:
+            if csvFile is not None:
+                csvFile.close()
+        print(json.dumps({"summary": job.summary()}))
+    return 0 if not job.counts["failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# PingOne Utilities - Deleted User Archive
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A copy of every user record a delete run removes, written from the pages the
+# delete tool has already read, so archiving costs no extra API calls.
+#
+# The archive is one file of gzip members, one member per page of users, each
+# holding one JSON user object per line.  A member is complete on disk before
+# any user in it is deleted, and gzip tools (and gzip.open) read the members
+# back as a single JSON lines stream.  If a run is killed while a member is
+# being written, only the part of that member not yet on disk is lost.
+
+import gzip
+import threading
+import zlib
+
+from pingoneutilities.jsoncodec import decodeJson, encodeBody
+
+class ArchiveWriter:
+    #######
+    # Appends pages of users to the archive - thread-safe, each page is flushed as its own gzip member
+    #######
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.count = 0
+        self.lock = threading.Lock()
+        self.archiveFile = open(fileName, "ab")
+
+    def addPage(self, users):
+        if not users:
+            return
+        lines = b"".join(encodeBody({key: value for key, value in user.items() if not key.startswith("_")}) + b"\n" for user in users)
+        member = gzip.compress(lines, compresslevel=6)
+        with self.lock:
+            self.archiveFile.write(member)
+            self.archiveFile.flush()
+            self.count += len(users)
+
+    def close(self):
+        with self.lock:
+            if not self.archiveFile.closed:
+                self.archiveFile.close()
+
+def readArchive(fileName, chunkSize=1000):
+    #######
+    # Generator - yield lists of archived users, chunkSize at a time
+    # A last member cut short by an interrupted run ends the archive early instead of failing
+    #######
+    chunk = []
+    with gzip.open(fileName, "rt", encoding="utf-8") as archiveFile:
+        try:
+            for line in archiveFile:
+                if not line.strip():
+                    continue
+                try:
+                    chunk.append(decodeJson(line))
+                except ValueError:
+                    # Half a line at the end of a cut short member
+                    break
+                if len(chunk) >= chunkSize:
+                    yield chunk
+                    chunk = []
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            pass
+    if chunk:
+        yield chunk
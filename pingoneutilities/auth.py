@@ -0,0 +1,93 @@
+# PingOne Utilities - Worker Authentication
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Client credentials token requests and a thread-safe token manager that
+# refreshes the worker access token on a schedule while a job runs.
+
+import base64
+import threading
+import time
+
+class P1ApiError(Exception):
+    #######
+    # A PingOne API call that did not return the expected status
+    #######
+
+    def __init__(self, message, statusCode=None):
+        Exception.__init__(self, message)
+        self.statusCode = statusCode
+
+def convertCreds(p1ClientId, p1ClientSecret):
+    #######
+    # Converts the client ID and secret to a base64-encoded string for HTTP Basic Auth.
+    #######
+    credString = p1ClientId + ":" + p1ClientSecret
+    return base64.b64encode(credString.encode("ascii")).decode("ascii")
+
+def requestToken(session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType):
+    #######
+    # Request a worker access token using BASIC or POST client authentication
+    #######
+
+    requestHeaders = {}
+    requestHeaders['Content-Type'] = 'application/x-www-form-urlencoded'
+    requestBody = {}
+    requestBody['grant_type'] = 'client_credentials'
+    if p1ClientType == "basic":
+        requestHeaders['Authorization'] = 'Basic ' + convertCreds(p1ClientId, p1ClientSecret)
+    else:
+        requestBody['client_id'] = p1ClientId
+        requestBody['client_secret'] = p1ClientSecret
+
+    response = session.post(f"https://auth.pingone{p1Geography}/{p1Environment}/as/token", headers=requestHeaders, data=requestBody)
+    if response.status_code != 200:
+        raise P1ApiError(f"Error getting access token: {response.status_code} - {response.text}", response.status_code)
+    return response.json()['access_token']
+
+def detectClientType(session, p1ClientId, p1ClientSecret, p1Geography, p1Environment):
+    #######
+    # Try BASIC then POST client authentication - returns the type that worked, or "failed"
+    #######
+    for p1ClientType in ("basic", "post"):
+        try:
+            requestToken(session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType)
+            return p1ClientType
+        except Exception:
+            pass
+    return "failed"
+
+class TokenManager:
+    #######
+    # Shares one worker access token between threads and refreshes it every refreshMinutes
+    #######
+
+    def __init__(self, session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, refreshMinutes=30):
+        self.session = session
+        self.p1ClientId = p1ClientId
+        self.p1ClientSecret = p1ClientSecret
+        self.p1Geography = p1Geography
+        self.p1Environment = p1Environment
+        self.p1ClientType = p1ClientType
+        self.refreshSeconds = int(refreshMinutes) * 60
+        self.lock = threading.Lock()
+        self.accessToken = ""
+        self.tokenTime = 0
+
+    def getToken(self):
+        with self.lock:
+            if time.time() - self.tokenTime >= self.refreshSeconds:
+                self.accessToken = requestToken(self.session, self.p1ClientId, self.p1ClientSecret, self.p1Geography, self.p1Environment, self.p1ClientType)
+                self.tokenTime = time.time()
+            return self.accessToken
+
+    def authHeaders(self):
+        return {'Authorization': 'Bearer ' + self.getToken()}
+
+    def tokenAgeSeconds(self):
+        if self.tokenTime == 0:
+            return None
+        return time.time() - self.tokenTime
+
+    def apiUrl(self, path):
+        return f"https://api.pingone{self.p1Geography}/v1/environments/{self.p1Environment}{path}"
@@ -0,0 +1,150 @@
+# PingOne Utilities - API Client
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A PingOne client for programs that use these utilities as a library rather
+# than through the interactive tools.  It owns a pooled session and a token
+# manager, and covers the calls the tools make: paging users (optionally in
+# balanced partitions), counting, creating and deleting them.
+#
+# Nothing here prints, prompts, logs to files or quits - failures are raised
+# as P1ApiError, and per-user results are returned as UserResult.  A user call
+# that cannot reach PingOne is a failed UserResult rather than an exception,
+# so one dropped connection does not end a job.
+
+import requests
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from pingoneutilities.auth import P1ApiError, TokenManager, detectClientType
+from pingoneutilities.governor import RateGovernor
+from pingoneutilities.jsoncodec import decodeResponse, encodeBody
+from pingoneutilities.p1http import attachReport, createSession
+from pingoneutilities.scan import PartitionedScanner, balancedPartitions, countUsers, listPopulations, scanUsers, usersUrl
+
+class UserResult(NamedTuple):
+    #######
+    # The outcome of one user call - action is "created", "deleted" or "failed"
+    #######
+    action: str
+    userId: Optional[str]
+    username: Optional[str]
+    statusCode: Optional[int]
+    detail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.action != "failed"
+
+class PingOneClient:
+    #######
+    # Authenticated PingOne client for one environment - safe to share between threads
+    # clientType is "basic" or "post"; when left out both are tried
+    #######
+
+    def __init__(self, environmentId: str, clientId: str, clientSecret: str, geography: str = ".com", clientType: Optional[str] = None, refreshMinutes: int = 30, poolSize: int = 100, callsPerSecond: Optional[float] = None, rateShare: float = 1, runReport=None) -> None:
+        self.session = createSession(poolSize)
+        if runReport is not None:
+            attachReport(self.session, runReport)
+        if clientType is None:
+            clientType = detectClientType(self.session, clientId, clientSecret, geography, environmentId)
+            if clientType == "failed":
+                raise P1ApiError("Unable to authenticate with PingOne using BASIC or POST client authentication")
+        self.tokens = TokenManager(self.session, clientId, clientSecret, geography, environmentId, clientType, refreshMinutes)
+        if callsPerSecond:
+            # Shares the environment's rate with the command line tools running on this host
+            self.session.rateLimiter = RateGovernor(environmentId, callsPerSecond, rateShare, "library")
+
+    @property
+    def environmentId(self) -> str:
+        return self.tokens.p1Environment
+
+    def close(self) -> None:
+        self.session.close()
+        if self.session.rateLimiter is not None:
+            self.session.rateLimiter.close()
+
+    def __enter__(self) -> "PingOneClient":
+        return self
+
+    def __exit__(self, *exceptionInfo) -> None:
+        self.close()
+
+    def countUsers(self, filter: str = "") -> Optional[int]:
+        return countUsers(self.session, self.tokens, filter)
+
+    def populations(self) -> List[dict]:
+        return listPopulations(self.session, self.tokens)
+
+    def resolveName(self, kind: str, name: str) -> Optional[str]:
+        #######
+        # ID of the group or population with this name, or None - the resolver compileCriteria expects
+        #######
+        if kind == "population":
+            for population in self.populations():
+                if population.get('name', "").lower() == name.lower():
+                    return population['id']
+            return None
+        escapedName = name.replace('\\', '\\\\').replace('"', '\\"')
+        response = self.session.get(self.tokens.apiUrl("/groups"), headers=self.tokens.authHeaders(), params={'filter': f'name eq "{escapedName}"', 'limit': 1})
+        if response.status_code != 200:
+            raise P1ApiError(f"Error getting groups: {response.status_code} - {response.text}", response.status_code)
+        groups = response.json().get('_embedded', {}).get('groups', [])
+        return groups[0]['id'] if groups else None
+
+    def acceptsFilter(self, filter: str) -> bool:
+        #######
+        # True if PingOne accepts the users filter
+        #######
+        if not filter:
+            return True
+        try:
+            self.countUsers(filter)
+        except P1ApiError as e:
+            if e.statusCode == 400:
+                return False
+            raise
+        return True
+
+    def userPages(self, filter: str = "", attributes: Optional[Sequence[str]] = None, pageSize: int = 1000, partitioned: bool = False, parallel: int = 8, splitSize: int = 250000) -> Iterator[List[dict]]:
+        #######
+        # Generator - yield pages of users matching the filter
+        # partitioned pages populations (and creation date ranges of large ones) concurrently; pages then arrive in no fixed order
+        #######
+        if not partitioned:
+            yield from scanUsers(self.session, self.tokens, usersUrl(self.tokens, filter, pageSize, attributes))
+            return
+        partitions = balancedPartitions(self.session, self.tokens, filter, splitSize)
+        if not partitions:
+            return
+        scanner = PartitionedScanner(self.session, self.tokens, partitions, pageSize, attributes, parallel)
+        for partitionName, users in scanner.pages():
+            yield users
+
+    def iterUsers(self, filter: str = "", attributes: Optional[Sequence[str]] = None, **pageOptions) -> Iterator[dict]:
+        for users in self.userPages(filter, attributes, **pageOptions):
+            yield from users
+
+    def createUser(self, user: Dict) -> UserResult:
+        #######
+        # Create one user from an import body (see payload.buildUserPayload)
+        #######
+        username = user.get('username')
+        try:
+            response = self.session.post(self.tokens.apiUrl("/users"), headers={**self.tokens.authHeaders(), 'Content-Type': 'application/vnd.pingidentity.user.import+json'}, data=encodeBody(user))
+        except (P1ApiError, requests.exceptions.RequestException) as e:
+            return UserResult("failed", None, username, getattr(e, "statusCode", None), str(e))
+        if response.status_code == 201:
+            return UserResult("created", decodeResponse(response).get('id'), username, response.status_code)
+        return UserResult("failed", None, username, response.status_code, response.text)
+
+    def deleteUser(self, userId: str, username: Optional[str] = None) -> UserResult:
+        #######
+        # Delete one user - a user that is already gone counts as deleted
+        #######
+        try:
+            response = self.session.delete(self.tokens.apiUrl(f"/users/{userId}"), headers=self.tokens.authHeaders())
+        except (P1ApiError, requests.exceptions.RequestException) as e:
+            return UserResult("failed", userId, username, getattr(e, "statusCode", None), str(e))
+        if response.status_code in (204, 404):
+            return UserResult("deleted", userId, username, response.status_code)
+        return UserResult("failed", userId, username, response.status_code, response.text)
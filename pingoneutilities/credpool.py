@@ -0,0 +1,185 @@
+# PingOne Utilities - Worker Credential Pool
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Spreads the calls of one job across several worker applications in the same
+# environment, so a limit PingOne applies to each application does not cap
+# the whole job.  The pool stands in for a TokenManager: every getToken() or
+# authHeaders() call picks the least loaded client that is not benched and
+# returns that client's token.
+#
+# Each client has its own token refresh and, optionally, its own calls per
+# second limit.  A client whose call is throttled (429) is benched for the
+# Retry-After time, doubling while it keeps being throttled, and returns to
+# the rotation when the bench time is up.  The environment-wide rate governor
+# still applies to the session as a whole.
+
+import math
+import threading
+import time
+
+from pingoneutilities.auth import TokenManager
+
+class CredentialPoolError(Exception):
+    #######
+    # Worker client definitions that cannot be used
+    #######
+    pass
+
+class PooledClient:
+    #######
+    # One worker client in the pool, with its load, limiter and bench state
+    #######
+
+    def __init__(self, name, tokenManager, callsPerSecond=0):
+        self.name = name
+        self.tokenManager = tokenManager
+        self.callsPerSecond = float(callsPerSecond)
+        self.bucket = max(1.0, self.callsPerSecond / 10)
+        self.lastRefill = time.time()
+        # Calls made recently, decaying by half every second - the load clients are balanced on
+        self.load = 0.0
+        self.lastLoad = time.time()
+        self.benchedUntil = 0.0
+        self.throttleStreak = 0
+        self.calls = 0
+        self.throttled = 0
+        self.benchedSeconds = 0.0
+
+    def refill(self, now):
+        if self.callsPerSecond > 0:
+            self.bucket = min(max(1.0, self.callsPerSecond / 10), self.bucket + (now - self.lastRefill) * self.callsPerSecond)
+        self.lastRefill = now
+        self.load *= math.pow(0.5, now - self.lastLoad)
+        self.lastLoad = now
+
+    def available(self, now):
+        return now >= self.benchedUntil and (self.callsPerSecond <= 0 or self.bucket >= 1)
+
+    def weightedLoad(self):
+        # A client allowed more calls per second takes a larger share of them
+        return self.load / self.callsPerSecond if self.callsPerSecond > 0 else self.load
+
+class CredentialPool:
+    #######
+    # TokenManager replacement that rotates between worker clients - thread-safe
+    # clients is a list of {"name", "clientId", "clientSecret", "clientType", "rate"} (rate 0 for no per-client limit)
+    #######
+
+    def __init__(self, session, clients, p1Geography, p1Environment, refreshMinutes=30, minBenchSeconds=5, maxBenchSeconds=60):
+        if not clients:
+            raise CredentialPoolError("The credential pool needs at least one client")
+        self.session = session
+        self.p1Geography = p1Geography
+        self.p1Environment = p1Environment
+        self.minBenchSeconds = minBenchSeconds
+        self.maxBenchSeconds = maxBenchSeconds
+        self.clients = [PooledClient(client["name"], TokenManager(session, client["clientId"], client["clientSecret"], p1Geography, p1Environment, client.get("clientType", "basic"), refreshMinutes), client.get("rate", 0)) for client in clients]
+        self.lock = threading.Lock()
+        # Access token -> client, so a throttled response can be traced back to the client that made it
+        self.tokenClients = {}
+        session.hooks["response"].append(self.recordResponse)
+
+    def chooseClient(self):
+        #######
+        # Take the least loaded client that may call now - waits while every client is benched or at its limit
+        #######
+        while True:
+            with self.lock:
+                now = time.time()
+                for client in self.clients:
+                    client.refill(now)
+                candidates = [client for client in self.clients if client.available(now)]
+                if candidates:
+                    client = min(candidates, key=PooledClient.weightedLoad)
+                    if client.callsPerSecond > 0:
+                        client.bucket -= 1
+                    client.load += 1
+                    client.calls += 1
+                    return client
+                waitSeconds = min(max(client.benchedUntil - now, (1 - client.bucket) / client.callsPerSecond if client.callsPerSecond > 0 else 0) for client in self.clients)
+            time.sleep(min(max(waitSeconds, 0.01), 1.0))
+
+    def getToken(self):
+        client = self.chooseClient()
+        token = client.tokenManager.getToken()
+        if token not in self.tokenClients:
+            with self.lock:
+                self.tokenClients[token] = client
+        return token
+
+    def authHeaders(self):
+        return {'Authorization': 'Bearer ' + self.getToken()}
+
+    def apiUrl(self, path):
+        return f"https://api.pingone{self.p1Geography}/v1/environments/{self.p1Environment}{path}"
+
+    def tokenAgeSeconds(self):
+        ages = [client.tokenManager.tokenAgeSeconds() for client in self.clients]
+        ages = [age for age in ages if age is not None]
+        return max(ages) if ages else None
+
+    def validate(self):
+        #######
+        # Get a token for every client - raises CredentialPoolError naming the first client that cannot authenticate
+        #######
+        for client in self.clients:
+            try:
+                self.tokenClients[client.tokenManager.getToken()] = client
+            except Exception as e:
+                raise CredentialPoolError(f"Client {client.name} cannot authenticate: {e}")
+
+    def recordResponse(self, response, *args, **kwargs):
+        #######
+        # Session response hook - bench the client whose call was throttled, including throttles retried by the session
+        #######
+        authorization = response.request.headers.get('Authorization', "")
+        if not authorization.startswith("Bearer "):
+            return
+        client = self.tokenClients.get(authorization[7:])
+        if client is None:
+            return
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        throttled = response.status_code == 429 or any(entry.status == 429 for entry in getattr(retries, "history", ()) or ())
+        with self.lock:
+            if not throttled:
+                client.throttleStreak = 0
+                return
+            try:
+                benchSeconds = float(response.headers.get('Retry-After', 0))
+            except ValueError:
+                benchSeconds = 0
+            benchSeconds = min(self.maxBenchSeconds, max(benchSeconds, self.minBenchSeconds * 2 ** client.throttleStreak))
+            now = time.time()
+            if client.benchedUntil < now + benchSeconds:
+                client.benchedSeconds += now + benchSeconds - max(client.benchedUntil, now)
+                client.benchedUntil = now + benchSeconds
+            client.throttleStreak += 1
+            client.throttled += 1
+
+    def stats(self):
+        #######
+        # Calls, throttles and time benched for each client - for the run report
+        #######
+        with self.lock:
+            return {client.name: {"calls": client.calls, "throttled": client.throttled, "benchedSeconds": round(client.benchedSeconds, 1)} for client in self.clients}
+
+def readClientSections(configFile, defaultClientType="basic", defaultRate=0):
+    #######
+    # Worker clients from the [Client:NAME] sections of a parsed configuration file
+    #######
+    clients = []
+    for section in configFile.sections():
+        if not section.startswith("Client:"):
+            continue
+        name = section.split(":", 1)[1].strip()
+        values = configFile[section]
+        missing = [key for key in ("p1clientid", "p1clientsecret") if key not in values]
+        if missing:
+            raise CredentialPoolError(f"Missing {', '.join(missing)} in the [{section}] section")
+        try:
+            rate = float(values.get("rate", defaultRate))
+        except ValueError:
+            raise CredentialPoolError(f"Invalid rate in the [{section}] section")
+        clients.append({"name": name, "clientId": values["p1clientid"], "clientSecret": values["p1clientsecret"], "clientType": values.get("p1clienttype", defaultClientType).strip().lower(), "rate": rate})
+    return clients
@@ -0,0 +1,268 @@
+# PingOne Utilities - User Selection Criteria
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A small language for choosing users, for example:
+#
+#   group = "Contractors" and lastSignOn never and created before 90d
+#
+# Conditions:
+#   group = NAME | ID          group != NAME | ID
+#   population = NAME | ID     population != NAME | ID
+#   status = STATUS            status != STATUS
+#   created before DATE        created after DATE
+#   lastSignOn before DATE     lastSignOn after DATE     lastSignOn never
+#
+# combined with and, or, not and parentheses.  DATE is YYYY-MM-DD (midnight
+# UTC) or Nd for N days ago.
+#
+# Every cutoff is worked out once, as an ISO 8601 UTC string in the format
+# PingOne returns, so a user is checked with plain string comparisons.  The
+# conditions joined by "and" at the top level are split into those PingOne can
+# apply with a filter and those checked locally, one page at a time.
+
+import re
+from datetime import datetime, timedelta, timezone
+
+guidPattern = r"^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+tokenPattern = re.compile(r'\s*(\(|\)|!=|=|"[^"]*"|[^\s()=!"]+)')
+
+# Attribute each field reads locally and its PingOne filter path
+fieldAttributes = {"population": "population", "status": "lifecycle", "created": "createdAt", "lastSignOn": "lastSignOn"}
+fieldNames = {name.lower(): name for name in ["group", "population", "status", "created", "lastSignOn"]}
+
+class CriteriaError(Exception):
+    #######
+    # Criteria that cannot be parsed or resolved
+    #######
+    pass
+
+def quoteValue(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def cutoffDate(value, now):
+    #######
+    # ISO 8601 UTC cutoff for YYYY-MM-DD or Nd
+    #######
+    if re.match(r"^[0-9]+d$", value):
+        cutoff = now - timedelta(days=int(value[:-1]))
+    else:
+        try:
+            cutoff = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise CriteriaError(f"Invalid date '{value}' - use YYYY-MM-DD or a number of days such as 90d")
+    return cutoff.strftime("%Y-%m-%dT%H:%M:%S.") + f"{cutoff.microsecond // 1000:03d}Z"
+
+class Condition:
+    #######
+    # One condition, or an and / or / not of conditions
+    # serverFilter is None when PingOne cannot apply it; serverOnly when it cannot be checked locally
+    #######
+
+    def __init__(self, test, serverFilter, attributes, serverOnly=False):
+        self.test = test
+        self.serverFilter = serverFilter
+        self.attributes = attributes
+        self.serverOnly = serverOnly
+
+def compareCondition(field, operator, value, resolveName, now):
+    #######
+    # Build one condition - names of groups and populations are turned into IDs with resolveName(kind, name)
+    #######
+    if field in ("group", "population"):
+        if operator not in ("=", "!="):
+            raise CriteriaError(f"{field} is compared with = or !=")
+        targetId = value.lower() if re.match(guidPattern, value) else resolveName(field, value)
+        if targetId is None:
+            raise CriteriaError(f"No {field} named '{value}'")
+        if field == "group":
+            # Group membership is not returned with the user, so only PingOne can check it
+            serverFilter = f'memberOfGroups[id eq "{targetId}"]'
+            if operator == "!=":
+                serverFilter = f"not ({serverFilter})"
+            return Condition(None, serverFilter, set(), serverOnly=True)
+        serverFilter = f'population.id {"eq" if operator == "=" else "ne"} "{targetId}"'
+        if operator == "=":
+            return Condition(lambda user: user.get('population', {}).get('id') == targetId, serverFilter, {"population"})
+        return Condition(lambda user: user.get('population', {}).get('id') != targetId, serverFilter, {"population"})
+
+    if field == "status":
+        if operator not in ("=", "!="):
+            raise CriteriaError("status is compared with = or !=")
+        status = value.upper()
+        serverFilter = f'lifecycle.status {"eq" if operator == "=" else "ne"} {quoteValue(status)}'
+        if operator == "=":
+            return Condition(lambda user: user.get('lifecycle', {}).get('status') == status, serverFilter, {"lifecycle"})
+        return Condition(lambda user: user.get('lifecycle', {}).get('status') != status, serverFilter, {"lifecycle"})
+
+    if field == "lastSignOn" and operator == "never":
+        return Condition(lambda user: not user.get('lastSignOn', {}).get('at'), "not (lastSignOn.at pr)", {"lastSignOn"})
+
+    if operator not in ("before", "after"):
+        raise CriteriaError(f"{field} is compared with before or after")
+    cutoff = cutoffDate(value, now)
+    filterPath = "createdAt" if field == "created" else "lastSignOn.at"
+    serverFilter = f'{filterPath} {"lt" if operator == "before" else "gt"} "{cutoff}"'
+    if field == "created":
+        if operator == "before":
+            return Condition(lambda user: user.get('createdAt', "") < cutoff, serverFilter, {"createdAt"})
+        return Condition(lambda user: user.get('createdAt', "") > cutoff, serverFilter, {"createdAt"})
+    # Users who never signed on have no lastSignOn and are neither before nor after a date
+    if operator == "before":
+        return Condition(lambda user: "" < user.get('lastSignOn', {}).get('at', "") < cutoff, serverFilter, {"lastSignOn"})
+    return Condition(lambda user: user.get('lastSignOn', {}).get('at', "") > cutoff, serverFilter, {"lastSignOn"})
+
+def combineAnd(conditions):
+    tests = [condition.test for condition in conditions]
+    serverFilters = [condition.serverFilter for condition in conditions]
+    serverOnly = any(condition.serverOnly for condition in conditions)
+    if serverOnly and None in serverFilters:
+        raise CriteriaError("A group condition can only be combined with conditions PingOne can filter on, or joined with 'and' at the top level")
+    test = None if serverOnly else lambda user: all(conditionTest(user) for conditionTest in tests)
+    serverFilter = None if None in serverFilters else " and ".join(f"({serverFilter})" for serverFilter in serverFilters)
+    return Condition(test, serverFilter, set().union(*(condition.attributes for condition in conditions)), serverOnly)
+
+def combineOr(conditions):
+    tests = [condition.test for condition in conditions]
+    serverFilters = [condition.serverFilter for condition in conditions]
+    serverOnly = any(condition.serverOnly for condition in conditions)
+    if serverOnly and None in serverFilters:
+        raise CriteriaError("A group condition can only be combined with conditions PingOne can filter on, or joined with 'and' at the top level")
+    test = None if serverOnly else lambda user: any(conditionTest(user) for conditionTest in tests)
+    serverFilter = None if None in serverFilters else " or ".join(f"({serverFilter})" for serverFilter in serverFilters)
+    return Condition(test, serverFilter, set().union(*(condition.attributes for condition in conditions)), serverOnly)
+
+def combineNot(condition):
+    test = condition.test
+    return Condition(None if test is None else lambda user: not test(user), None if condition.serverFilter is None else f"not ({condition.serverFilter})", condition.attributes, condition.serverOnly)
+
+class CriteriaParser:
+    #######
+    # Recursive descent parser - or binds loosest, then and, then not
+    #######
+
+    def __init__(self, text, resolveName, now):
+        self.tokens = tokenPattern.findall(text)
+        if "".join(self.tokens).replace(" ", "") != re.sub(r"\s", "", text):
+            raise CriteriaError(f"Cannot read the criteria: {text}")
+        self.position = 0
+        self.resolveName = resolveName
+        self.now = now
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def keyword(self, word):
+        token = self.peek()
+        if token is not None and token.lower() == word:
+            self.position += 1
+            return True
+        return False
+
+    def next(self, expected):
+        token = self.peek()
+        if token is None:
+            raise CriteriaError(f"Criteria ended early - expected {expected}")
+        self.position += 1
+        return token
+
+    def parseTopLevel(self):
+        #######
+        # Returns the top level conditions that are joined by "and"
+        #######
+        conditions = self.parseAnd()
+        while self.keyword("or"):
+            conditions = [combineOr([combineAnd(conditions) if len(conditions) > 1 else conditions[0], self.parseTerm()])]
+        if self.peek() is not None:
+            raise CriteriaError(f"Unexpected '{self.peek()}' in the criteria")
+        return conditions
+
+    def parseTerm(self):
+        conditions = self.parseAnd()
+        return combineAnd(conditions) if len(conditions) > 1 else conditions[0]
+
+    def parseAnd(self):
+        conditions = [self.parseFactor()]
+        while self.keyword("and"):
+            conditions.append(self.parseFactor())
+        return conditions
+
+    def parseFactor(self):
+        if self.keyword("not"):
+            return combineNot(self.parseFactor())
+        if self.keyword("("):
+            condition = self.parseTerm()
+            while self.keyword("or"):
+                condition = combineOr([condition, self.parseTerm()])
+            if not self.keyword(")"):
+                raise CriteriaError("Missing ')' in the criteria")
+            return condition
+        fieldToken = self.next("a field name")
+        field = fieldNames.get(fieldToken.lower())
+        if field is None:
+            raise CriteriaError(f"Unknown field '{fieldToken}' - use one of: {', '.join(fieldNames.values())}")
+        operator = self.next(f"a comparison after {field}").lower()
+        if operator == "never":
+            if field != "lastSignOn":
+                raise CriteriaError("Only lastSignOn can be compared with never")
+            return compareCondition(field, operator, None, self.resolveName, self.now)
+        value = self.next(f"a value after {field} {operator}")
+        if value.startswith('"'):
+            value = value[1:-1]
+        return compareCondition(field, operator, value, self.resolveName, self.now)
+
+class Criteria:
+    #######
+    # Compiled criteria - the top level "and" conditions, split between the server filter and the local check
+    #######
+
+    def __init__(self, text, conditions):
+        self.text = text
+        self.conditions = conditions
+
+    def plans(self):
+        #######
+        # Candidate (server filter, local conditions) pairs, most selective filter first
+        # The last plan filters only what PingOne must - every other condition is checked locally
+        #######
+        required = [condition for condition in self.conditions if condition.serverOnly]
+        pushable = [condition for condition in self.conditions if condition.serverFilter is not None and not condition.serverOnly]
+        localOnly = [condition for condition in self.conditions if condition.serverFilter is None]
+        candidates = [(required + pushable, localOnly)]
+        if len(pushable) > 1:
+            # PingOne may accept some of the conditions but not all of them together
+            for condition in pushable:
+                candidates.append((required + [condition], [other for other in pushable if other is not condition] + localOnly))
+        if pushable:
+            candidates.append((required, pushable + localOnly))
+        return [(" and ".join(f"({condition.serverFilter})" for condition in serverConditions) if len(serverConditions) > 1 else (serverConditions[0].serverFilter if serverConditions else ""), localConditions) for serverConditions, localConditions in candidates]
+
+    def serverRequired(self):
+        return any(condition.serverOnly for condition in self.conditions)
+
+def pageEvaluator(localConditions):
+    #######
+    # One function that selects the matching users of a whole page - None when every user matches
+    #######
+    tests = [condition.test for condition in localConditions]
+    if not tests:
+        return None
+    if len(tests) == 1:
+        test = tests[0]
+        return lambda users: [user for user in users if test(user)]
+    return lambda users: [user for user in users if all(conditionTest(user) for conditionTest in tests)]
+
+def localAttributes(localConditions):
+    #######
+    # User attributes the local check reads
+    #######
+    return sorted(set().union(*(condition.attributes for condition in localConditions))) if localConditions else []
+
+def compileCriteria(text, resolveName, now=None):
+    #######
+    # Parse and compile criteria - resolveName(kind, name) returns the ID of a group or population, or None
+    #######
+    if not text or not text.strip():
+        raise CriteriaError("No criteria given")
+    now = now if now is not None else datetime.now(timezone.utc)
+    return Criteria(text, CriteriaParser(text, resolveName, now).parseTopLevel())
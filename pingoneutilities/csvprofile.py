@@ -0,0 +1,201 @@
+# PingOne Utilities - CSV File Profile
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A quick look at an import file before the run: its encoding, the exact
+# number of rows (a quoted field may hold line breaks, so lines are not rows),
+# the blank rows the importer will skip and how full each column is.
+#
+# The file is memory-mapped and scanned in large chunks for line breaks and
+# quote characters, so nothing but the current chunk is held in memory and a
+# chunk without quotes is counted without looking at its lines one by one.
+# Column fill rates need the fields themselves, so they are taken from the
+# first rows of the file only (sampleRows).
+#
+# The configuration tool stores the row count in P1ImportUser.cfg together
+# with the file's size and modification time, and the importer trusts the
+# count only while the file is unchanged.
+
+import codecs
+import configparser
+import csv
+import itertools
+import mmap
+import os
+import re
+import time
+
+chunkBytes = 8 * 1024 * 1024
+
+# Bytes Windows-1252 leaves undefined - a file with any of them is read as Latin-1
+cp1252Undefined = [b"\x81", b"\x8d", b"\x8f", b"\x90", b"\x9d"]
+
+# Encodings whose byte order mark is checked, longest mark first
+byteOrderMarks = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+]
+
+def detectBom(head):
+    for bom, encoding in byteOrderMarks:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+# A line of empty fields after the first line of a chunk
+blankLinePattern = re.compile(rb'\n[ \t\r,]*(?=\n)')
+
+def isBlankLine(line):
+    # The importer skips rows whose fields are all empty or whitespace
+    return not line.strip(b' \t\r,"')
+
+def scanRecords(fileMap, start):
+    #######
+    # Count the CSV records and blank records from byte offset start, and check the bytes are UTF-8
+    # Returns (records, blankRecords, isUtf8)
+    #######
+    records = 0
+    blankRecords = 0
+    inQuotes = False
+    # True while the current record has only blank lines so far
+    recordBlank = True
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    isUtf8 = True
+    carry = b""
+    position = start
+    size = len(fileMap)
+    while position < size:
+        chunk = fileMap[position:position + chunkBytes]
+        position += len(chunk)
+        if isUtf8:
+            try:
+                decoder.decode(chunk, final=position >= size)
+            except UnicodeDecodeError:
+                isUtf8 = False
+        data = carry + chunk
+        lastBreak = data.rfind(b"\n")
+        if lastBreak < 0:
+            carry = data
+            continue
+        carry = data[lastBreak + 1:]
+        if not inQuotes and b'"' not in data:
+            # No quoted fields in this chunk - every line is a record
+            records += data.count(b"\n")
+            blankRecords += isBlankLine(data[:data.find(b"\n")]) + len(blankLinePattern.findall(data, 0, lastBreak + 1))
+            continue
+        lines = data[:lastBreak].split(b"\n")
+        for line in lines:
+            if line.count(b'"') % 2:
+                inQuotes = not inQuotes
+            recordBlank = recordBlank and isBlankLine(line)
+            if not inQuotes:
+                records += 1
+                if recordBlank:
+                    blankRecords += 1
+                recordBlank = True
+    if carry:
+        # The last record has no line break after it
+        records += 1
+        if recordBlank and isBlankLine(carry):
+            blankRecords += 1
+    return records, blankRecords, isUtf8
+
+def sampleFillRates(fileName, encoding, sampleRows):
+    #######
+    # Headers and the share of the first sampleRows non-blank rows that have a value in each column
+    # Returns (headers, {header: fraction}, rowsSampled)
+    #######
+    with open(fileName, "r", newline="", encoding=encoding, errors="replace") as csvFile:
+        csvReader = csv.reader(csvFile)
+        headers = [header.strip() for header in next(csvReader, [])]
+        filled = [0] * len(headers)
+        rowsSampled = 0
+        for row in itertools.islice((row for row in csvReader if any(field.strip() for field in row)), sampleRows):
+            rowsSampled += 1
+            for index, field in enumerate(row[:len(headers)]):
+                if field.strip():
+                    filled[index] += 1
+    fillRates = {header: (filled[index] / rowsSampled if rowsSampled else 0.0) for index, header in enumerate(headers)}
+    return headers, fillRates, rowsSampled
+
+def profileCsv(fileName, sampleRows=10000):
+    #######
+    # Profile a CSV file - returns a dict of encoding, bom, fileSize, modified, rows (users to import, without
+    # the header and blank rows), blankRows, headers, fillRates, rowsSampled and seconds
+    #######
+    startTime = time.perf_counter()
+    stat = os.stat(fileName)
+    records = 0
+    blankRecords = 0
+    with open(fileName, "rb") as csvFile:
+        head = csvFile.read(4)
+        encoding = detectBom(head)
+        if stat.st_size == 0:
+            encoding = encoding or "utf-8"
+        elif encoding in ("utf-16", "utf-32"):
+            # Line breaks and quotes are not single bytes - count the rows with the csv module instead
+            with open(fileName, "r", newline="", encoding=encoding) as textFile:
+                for row in csv.reader(textFile):
+                    records += 1
+                    if not any(field.strip() for field in row):
+                        blankRecords += 1
+        else:
+            with mmap.mmap(csvFile.fileno(), 0, access=mmap.ACCESS_READ) as fileMap:
+                start = len(codecs.BOM_UTF8) if encoding == "utf-8-sig" else 0
+                records, blankRecords, isUtf8 = scanRecords(fileMap, start)
+                if not isUtf8:
+                    encoding = "latin-1" if any(fileMap.find(byte) >= 0 for byte in cp1252Undefined) else "cp1252"
+                elif encoding is None:
+                    encoding = "utf-8"
+    headers, fillRates, rowsSampled = sampleFillRates(fileName, encoding, sampleRows)
+    # The header is the first non-blank record
+    rows = max(records - blankRecords - (1 if headers else 0), 0)
+    return {
+        "encoding": encoding,
+        "bom": detectBom(head) is not None,
+        "fileSize": stat.st_size,
+        "modified": int(stat.st_mtime),
+        "rows": rows,
+        "blankRows": blankRecords,
+        "headers": headers,
+        "fillRates": fillRates,
+        "rowsSampled": rowsSampled,
+        "seconds": round(time.perf_counter() - startTime, 3)
+    }
+
+def estimateSeconds(rows, callsPerSecond):
+    #######
+    # Shortest time to create rows users at callsPerSecond (one call per user)
+    #######
+    return rows / callsPerSecond if callsPerSecond > 0 else None
+
+def profileSection(profile):
+    #######
+    # The [CSV] entries the configuration tool stores for a profiled file
+    #######
+    return {"rows": str(profile["rows"]), "encoding": profile["encoding"], "fileSize": str(profile["fileSize"]), "modified": str(profile["modified"])}
+
+def readCsvSection(configFileName, csvPath):
+    #######
+    # The row count and encoding stored by the configuration tool - returns (rows, encoding, changed)
+    # rows is None when the file was not profiled or has changed since (changed is then True)
+    #######
+    configFile = configparser.ConfigParser(interpolation=None)
+    configFile.read(configFileName)
+    if "CSV" not in configFile.sections():
+        return None, None, False
+    section = configFile["CSV"]
+    encoding = section.get("encoding")
+    if "rows" not in section:
+        return None, encoding, False
+    try:
+        rows = int(section["rows"])
+        stat = os.stat(csvPath)
+        if stat.st_size != int(section.get("filesize", -1)) or int(stat.st_mtime) != int(section.get("modified", -1)):
+            return None, encoding, True
+    except (OSError, ValueError):
+        return None, encoding, False
+    return rows, encoding, False
@@ -0,0 +1,196 @@
+# PingOne Utilities - Live Dashboard
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A live view of a long run: rolling request and row rates, status codes,
+# in-flight requests, queue depth, token age and ETA.  The dashboard samples
+# the run report and session counters on its own thread once a second, so
+# nothing is added to the request path.
+#
+# On a terminal that supports curses the view is redrawn in place and the
+# tool's own output is shown in a scrolling pane underneath.  Anywhere else
+# (Windows without curses, output redirected to a file) a one line summary is
+# printed every few seconds instead.
+
+import atexit
+import collections
+import sys
+import threading
+import time
+
+try:
+    import curses
+except ImportError:
+    # Not available on Windows - the plain text summary is used
+    curses = None
+
+class OutputCapture:
+    #######
+    # Stands in for sys.stdout while curses owns the screen and keeps the most recent lines
+    #######
+
+    def __init__(self, keepLines=200):
+        self.lines = collections.deque(maxlen=keepLines)
+        self.partial = ""
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            text = self.partial + text
+            parts = text.split("\n")
+            self.partial = parts.pop()
+            self.lines.extend(part for part in parts if part.strip())
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def recent(self, count):
+        with self.lock:
+            return list(self.lines)[-count:] if count > 0 else []
+
+def formatSeconds(seconds):
+    if seconds is None:
+        return "-"
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+class Dashboard:
+    #######
+    # Samples the run's counters on a background thread and shows them with curses or as plain text
+    # Gauges are functions the dashboard calls when it samples - queueDepth, tokenAge (seconds) and total
+    #######
+
+    def __init__(self, title, runReport, session=None, windowSeconds=10, plainSeconds=10):
+        self.title = title
+        self.runReport = runReport
+        self.session = session
+        self.windowSeconds = windowSeconds
+        self.plainSeconds = plainSeconds
+        self.gauges = {}
+        self.total = None
+        self.samples = collections.deque()
+        self.stopEvent = threading.Event()
+        self.thread = None
+        self.screen = None
+        self.capture = None
+        self.savedStdout = None
+
+    def setGauge(self, name, gauge):
+        self.gauges[name] = gauge
+
+    def setTotal(self, total):
+        self.total = total
+
+    def readGauge(self, name):
+        gauge = self.gauges.get(name)
+        if gauge is None:
+            return None
+        try:
+            return gauge()
+        except Exception:
+            return None
+
+    def start(self):
+        if curses is not None and sys.stdout.isatty():
+            try:
+                self.screen = curses.initscr()
+                curses.noecho()
+                try:
+                    curses.curs_set(0)
+                except curses.error:
+                    pass
+            except curses.error:
+                self.screen = None
+        if self.screen is not None:
+            self.capture = OutputCapture()
+            self.savedStdout = sys.stdout
+            sys.stdout = self.capture
+        self.thread = threading.Thread(target=self.run, name="P1Dashboard", daemon=True)
+        self.thread.start()
+        # A tool that quits on an error must still give the terminal back
+        atexit.register(self.stop)
+
+    def stop(self):
+        self.stopEvent.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        if self.screen is not None:
+            curses.endwin()
+            sys.stdout = self.savedStdout
+            self.screen = None
+            # Show the end of the captured output in the normal terminal
+            for line in self.capture.recent(20):
+                print(line)
+
+    def run(self):
+        lastPlain = time.time()
+        while not self.stopEvent.wait(1.0):
+            stats = self.sample()
+            if self.screen is not None:
+                self.draw(stats)
+            elif time.time() - lastPlain >= self.plainSeconds:
+                lastPlain = time.time()
+                print(self.summaryLine(stats))
+
+    def sample(self):
+        #######
+        # Take one sample of the counters and work out the rolling rates over the window
+        #######
+        now = time.time()
+        counters = self.runReport.counters()
+        self.samples.append((now, counters))
+        while len(self.samples) > 1 and now - self.samples[0][0] > self.windowSeconds:
+            self.samples.popleft()
+        firstTime, first = self.samples[0]
+        span = now - firstTime
+        stats = dict(counters)
+        stats["elapsed"] = now - self.runReport.startTime
+        stats["requestRate"] = (counters["apiCalls"] - first["apiCalls"]) / span if span > 0 else 0.0
+        stats["rowRate"] = (counters["rows"] - first["rows"]) / span if span > 0 else 0.0
+        stats["statusRates"] = {status: (count - first["statusCounts"].get(status, 0)) / span if span > 0 else 0.0 for status, count in counters["statusCounts"].items()}
+        stats["inFlight"] = self.session.inFlight if self.session is not None and hasattr(self.session, "inFlight") else None
+        stats["queueDepth"] = self.readGauge("queueDepth")
+        stats["tokenAge"] = self.readGauge("tokenAge")
+        total = self.total if self.total is not None else self.readGauge("total")
+        stats["total"] = total
+        stats["eta"] = (total - counters["rows"]) / stats["rowRate"] if total and stats["rowRate"] > 0 and total > counters["rows"] else None
+        return stats
+
+    def lines(self, stats):
+        calls = stats["apiCalls"]
+        progress = f"{stats['rows']}"
+        if stats["total"]:
+            progress += f" of {stats['total']} ({min(stats['rows'] / stats['total'], 1):.1%})"
+        lines = [
+            f"{self.title} - running {formatSeconds(stats['elapsed'])}",
+            "",
+            f"Requests/sec: {stats['requestRate']:8.1f}     Users/sec: {stats['rowRate']:8.1f}     (last {self.windowSeconds}s)",
+            f"Users: {progress}     ETA: {formatSeconds(stats['eta'])}",
+            f"In flight: {'-' if stats['inFlight'] is None else stats['inFlight']}     Queue depth: {'-' if stats['queueDepth'] is None else stats['queueDepth']}     Token age: {formatSeconds(stats['tokenAge'])}",
+            f"API calls: {calls}     Retries: {stats['retries']}     Throttled: {stats['throttleEvents']}",
+            "",
+            f"{'Status':<6} {'Calls':>9} {'Share':>9} {'Per sec':>9}"
+        ]
+        for status, count in sorted(stats["statusCounts"].items()):
+            lines.append(f"{status:<6} {count:>9} {count / calls if calls else 0:>9.1%} {stats['statusRates'].get(status, 0):>9.1f}")
+        return lines
+
+    def summaryLine(self, stats):
+        failures = sum(count for status, count in stats["statusCounts"].items() if status >= 400)
+        return f"[{formatSeconds(stats['elapsed'])}] {stats['rows']} users, {stats['rowRate']:.1f} users/sec, {stats['requestRate']:.1f} requests/sec, {failures} failed calls, ETA {formatSeconds(stats['eta'])}"
+
+    def draw(self, stats):
+        try:
+            height, width = self.screen.getmaxyx()
+            lines = self.lines(stats)
+            lines += ["", "Recent output:"]
+            lines += self.capture.recent(height - len(lines) - 1)
+            self.screen.erase()
+            for row, line in enumerate(lines[:height - 1]):
+                self.screen.addstr(row, 0, line[:width - 1])
+            self.screen.refresh()
+        except curses.error:
+            # Terminal too small or resized while drawing - the next sample redraws it
+            pass
@@ -0,0 +1,107 @@
+# PingOne Utilities - Fan-out to Several Environments
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Sends the same batches of users to several PingOne environments at once.
+# The file is read and each user body built once; every target then has its
+# own sender thread, worker pool, token and rate limit, so a slow or
+# throttled environment never holds up another environment's calls.
+#
+# Each target takes batches from its own bounded queue.  When the slowest
+# target has maxLag batches waiting, the reader waits for it, so no target
+# falls more than maxLag batches behind the file and memory stays bounded.
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+fanOutDone = object()
+
+class FanOutTarget:
+    #######
+    # One environment's sender - sendUser(user) makes the call and returns True when the user was created
+    # afterBatch() is called once every user in a batch has been sent (for example to flush a journal)
+    #######
+
+    def __init__(self, name, sendUser, workers=100, maxLag=10, afterBatch=None):
+        self.name = name
+        self.sendUser = sendUser
+        self.afterBatch = afterBatch
+        self.batchQueue = queue.Queue(maxsize=max(1, maxLag))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"P1Target-{name}")
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.waitSeconds = 0.0
+        self.countLock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name=f"P1Target-{name}", daemon=True)
+
+    def run(self):
+        while True:
+            users = self.batchQueue.get()
+            if users is fanOutDone:
+                break
+            threads = [self.executor.submit(self.sendUser, user) for user in users]
+            succeeded = 0
+            for thread in as_completed(threads):
+                try:
+                    if thread.result() == True:
+                        succeeded += 1
+                except Exception:
+                    # sendUser logs its own failures - anything it raises counts as a failed user
+                    pass
+            if self.afterBatch is not None:
+                self.afterBatch()
+            with self.countLock:
+                self.processed += len(users)
+                self.succeeded += succeeded
+                self.failed += len(users) - succeeded
+
+    def lag(self):
+        #######
+        # Batches read from the file and not yet taken by this target
+        #######
+        return self.batchQueue.qsize()
+
+    def counts(self):
+        with self.countLock:
+            return {"processed": self.processed, "succeeded": self.succeeded, "failed": self.failed, "readerWaitSeconds": round(self.waitSeconds, 3)}
+
+class FanOut:
+    #######
+    # Hands every batch to every target - send() blocks while any target is maxLag batches behind
+    #######
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.batches = 0
+        for target in self.targets:
+            target.thread.start()
+
+    def send(self, users):
+        for target in self.targets:
+            if target.batchQueue.full():
+                # Time the reader spends held back by this target, reported so the slowest target stands out
+                waitStart = time.time()
+                target.batchQueue.put(users)
+                target.waitSeconds += time.time() - waitStart
+            else:
+                target.batchQueue.put(users)
+        self.batches += 1
+
+    def lags(self):
+        return {target.name: target.lag() for target in self.targets}
+
+    def results(self):
+        return {target.name: target.counts() for target in self.targets}
+
+    def close(self):
+        #######
+        # Wait for every target to send the batches it has queued
+        #######
+        for target in self.targets:
+            target.batchQueue.put(fanOutDone)
+        for target in self.targets:
+            target.thread.join()
+            target.executor.shutdown(wait=True)
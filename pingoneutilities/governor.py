@@ -0,0 +1,151 @@
+# PingOne Utilities - Shared Rate Governor
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A call rate limit shared by every tool running on this host against the
+# same PingOne environment.  The state lives in a small file, keyed by the
+# environment ID, that is only read and written under an exclusive file lock.
+# Each running tool registers with a weight and gets that share of the
+# environment's rate; a tool that stops calling drops out after a few seconds
+# and the others take up its share.
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# A tool that has not called for this long is treated as stopped
+staleSeconds = 2
+
+def lockFile(lockHandle):
+    if fcntl is not None:
+        fcntl.flock(lockHandle.fileno(), fcntl.LOCK_EX)
+    else:
+        lockHandle.seek(0)
+        msvcrt.locking(lockHandle.fileno(), msvcrt.LK_LOCK, 1)
+
+def unlockFile(lockHandle):
+    if fcntl is not None:
+        fcntl.flock(lockHandle.fileno(), fcntl.LOCK_UN)
+    else:
+        lockHandle.seek(0)
+        msvcrt.locking(lockHandle.fileno(), msvcrt.LK_UNLCK, 1)
+
+class RateGovernor:
+    #######
+    # Cross-process token bucket for one environment - acquire() blocks until this process may make a call
+    # Tokens are taken from the shared file a few at a time so the lock is not taken on every call
+    #######
+
+    def __init__(self, p1Environment, callsPerSecond=100, weight=1, toolName="", stateDirectory=None):
+        self.callsPerSecond = float(callsPerSecond)
+        self.weight = float(weight)
+        self.toolName = toolName
+        self.participantId = f"{os.getpid()}-{id(self)}"
+        stateDirectory = stateDirectory if stateDirectory else tempfile.gettempdir()
+        self.stateName = os.path.join(stateDirectory, f"pingoneutilities-rate-{p1Environment.lower()}.json")
+        self.lockName = self.stateName + ".lock"
+        self.reserve = 0
+        self.reserveLock = threading.Lock()
+        self.fileLock = threading.Lock()
+        self.shareRate = self.callsPerSecond
+        atexit.register(self.close)
+
+    def readState(self):
+        try:
+            with open(self.stateName, "r") as stateFile:
+                return json.load(stateFile)
+        except (OSError, ValueError):
+            # Missing or half written by a process that was killed - start again
+            return {}
+
+    def writeState(self, state):
+        with open(self.stateName + ".tmp", "w") as stateFile:
+            json.dump(state, stateFile)
+        os.replace(self.stateName + ".tmp", self.stateName)
+
+    def takeTokens(self):
+        #######
+        # Refill this process's share under the file lock and take what is available
+        # Returns the number of tokens taken and, when none were, how long to wait
+        #######
+        with self.fileLock, open(self.lockName, "a+") as lockHandle:
+            lockFile(lockHandle)
+            try:
+                now = time.time()
+                state = self.readState()
+                participants = {participantId: participant for participantId, participant in state.get("participants", {}).items() if now - participant["seen"] < staleSeconds}
+                me = participants.get(self.participantId, {"tokens": 0.0, "last": now})
+                me.update({"tool": self.toolName, "weight": self.weight, "rate": self.callsPerSecond, "seen": now})
+                participants[self.participantId] = me
+
+                # Every tool uses the lowest configured rate for the environment, split by weight
+                environmentRate = min(participant["rate"] for participant in participants.values())
+                totalWeight = sum(participant["weight"] for participant in participants.values())
+                self.shareRate = environmentRate * self.weight / totalWeight
+                burst = max(1.0, self.shareRate / 10)
+
+                me["tokens"] = min(burst, me["tokens"] + (now - me["last"]) * self.shareRate)
+                me["last"] = now
+                taken = int(me["tokens"])
+                me["tokens"] -= taken
+                self.writeState({"participants": participants})
+            finally:
+                unlockFile(lockHandle)
+        waitSeconds = 0 if taken else (1 - me["tokens"]) / self.shareRate
+        return taken, waitSeconds
+
+    def close(self):
+        #######
+        # Leave the environment's participants so the other tools take up this share straight away
+        #######
+        with self.fileLock, open(self.lockName, "a+") as lockHandle:
+            lockFile(lockHandle)
+            try:
+                state = self.readState()
+                if self.participantId in state.get("participants", {}):
+                    del state["participants"][self.participantId]
+                    self.writeState(state)
+            finally:
+                unlockFile(lockHandle)
+
+    def acquire(self):
+        while True:
+            with self.reserveLock:
+                if self.reserve > 0:
+                    self.reserve -= 1
+                    return
+            taken, waitSeconds = self.takeTokens()
+            if taken:
+                with self.reserveLock:
+                    self.reserve += taken
+            else:
+                time.sleep(waitSeconds)
+
+def addGovernorArguments(parser, defaultWeight=1, includeRate=True):
+    #######
+    # Add the shared rate limit options to a tool's argument parser
+    # includeRate=False for tools that set the rate of each environment with their own options
+    #######
+    group = parser.add_argument_group("rate limit", "Call rate limit shared by every tool on this host using the same PingOne environment")
+    if includeRate:
+        group.add_argument("--rate", type=int, default=100, help="Maximum API calls per second for the environment, across all tools (default: 100)")
+    group.add_argument("--rate-share", type=float, default=defaultWeight, help=f"This tool's weight when several tools share the environment's rate (default: {defaultWeight})")
+    group.add_argument("--rate-dir", help="Directory for the shared rate state file (default: the system temporary directory)")
+
+def startGovernor(args, session, p1Environment, toolName):
+    #######
+    # Limit every call made through the session by the environment's shared governor
+    #######
+    governor = RateGovernor(p1Environment, args.rate, args.rate_share, toolName, args.rate_dir)
+    session.rateLimiter = governor
+    return governor
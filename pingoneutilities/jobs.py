@@ -0,0 +1,209 @@
+# PingOne Utilities - Import and Delete Jobs
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# In-process import and delete jobs for programs that embed these utilities.
+# A job runs its user calls on a worker pool and streams a UserResult for
+# each user as the calls finish:
+#
+#   with PingOneClient(environmentId, clientId, clientSecret) as client:
+#       job = DeleteJob(client, criteria='status = "DISABLED" and created before 365d')
+#       for result in job.results():
+#           ...
+#       print(job.summary())
+#
+# Only a bounded number of calls is queued ahead of the consumer, so a slow
+# consumer slows the job down rather than filling memory.  Stopping the
+# iteration early, or calling cancel(), stops the job once the calls already
+# sent have finished.
+
+import abc
+import collections
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+from pingoneutilities.archive import ArchiveWriter
+from pingoneutilities.client import PingOneClient, UserResult
+from pingoneutilities.criteria import CriteriaError, compileCriteria, localAttributes, pageEvaluator
+from pingoneutilities.journal import JournalWriter
+from pingoneutilities.payload import buildUserPayload
+
+class Job(abc.ABC):
+    #######
+    # Runs process(item) for every item on a worker pool and yields the results as they finish
+    # Subclasses provide items() and process(), and may open and close files in start() and finish()
+    # A process() call that raises is counted as a failed result (see failedResult) and the job carries on
+    #######
+
+    def __init__(self, client: PingOneClient, workers: int = 32, maxPending: Optional[int] = None) -> None:
+        self.client = client
+        self.workers = workers
+        self.maxPending = maxPending if maxPending else workers * 4
+        self.counts = collections.Counter()
+        self.stopEvent = threading.Event()
+
+    @abc.abstractmethod
+    def items(self) -> Iterable:
+        pass
+
+    @abc.abstractmethod
+    def process(self, item) -> UserResult:
+        pass
+
+    def failedResult(self, item, error: Exception) -> UserResult:
+        #######
+        # The result for an item whose process() call raised
+        #######
+        return UserResult("failed", None, None, None, f"{type(error).__name__}: {error}")
+
+    def start(self) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+    def cancel(self) -> None:
+        self.stopEvent.set()
+
+    def collect(self, futures) -> Iterator[UserResult]:
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = self.failedResult(futures[future], e)
+            self.counts[result.action] += 1
+            yield result
+
+    def results(self) -> Iterator[UserResult]:
+        #######
+        # Generator - run the job, yielding each user's result as its call finishes
+        #######
+        self.start()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=type(self).__name__)
+        # Future -> item, so a call that raised can still be reported against its user
+        pending = {}
+        try:
+            for item in self.items():
+                if self.stopEvent.is_set():
+                    break
+                pending[executor.submit(self.process, item)] = item
+                if len(pending) >= self.maxPending:
+                    yield from self.collectDone(pending)
+            while pending:
+                yield from self.collectDone(pending)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.finish()
+
+    def collectDone(self, pending) -> Iterator[UserResult]:
+        done, notDone = wait(list(pending), return_when=FIRST_COMPLETED)
+        yield from self.collect({future: pending.pop(future) for future in done})
+
+    def run(self) -> Dict[str, int]:
+        #######
+        # Run the job to the end without looking at each result - returns the summary
+        #######
+        for result in self.results():
+            pass
+        return self.summary()
+
+    def summary(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+class ImportJob(Job):
+    #######
+    # Create users from rows of dotted attribute names (for example csv.DictReader rows with the import tool's headers)
+    # Created users are written to journalFile when one is given, so the run can be rolled back with P1BulkDelete.py --rollback
+    #######
+
+    def __init__(self, client: PingOneClient, rows: Iterable[Mapping], defaultPopulation: str, passwordReset: bool = False, journalFile: Optional[str] = None, **jobOptions) -> None:
+        Job.__init__(self, client, **jobOptions)
+        self.rows = rows
+        self.defaultPopulation = defaultPopulation
+        self.passwordReset = "true" if passwordReset else "false"
+        self.journalFile = journalFile
+        self.journal = None
+
+    def start(self) -> None:
+        if self.journalFile:
+            self.journal = JournalWriter(self.journalFile, self.client.environmentId)
+
+    def finish(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+
+    def items(self) -> Iterable[Mapping]:
+        return self.rows
+
+    def failedResult(self, row: Mapping, error: Exception) -> UserResult:
+        return UserResult("failed", None, row.get("username"), None, f"{type(error).__name__}: {error}")
+
+    def process(self, row: Mapping) -> UserResult:
+        result = self.client.createUser(buildUserPayload(row, self.defaultPopulation, self.passwordReset))
+        if result.ok and self.journal is not None:
+            self.journal.append(result.userId, result.username or "")
+        return result
+
+class DeleteJob(Job):
+    #######
+    # Delete the users chosen by exactly one of a filter, criteria (see criteria.py) or a list of user IDs
+    # archiveFile keeps a copy of every user record before it is deleted, for UserImport --restore
+    # Users read but not chosen by the criteria are counted as "skipped" in the summary
+    #######
+
+    def __init__(self, client: PingOneClient, filter: Optional[str] = None, criteria: Optional[str] = None, userIds: Optional[Iterable[str]] = None, archiveFile: Optional[str] = None, partitioned: bool = False, pageSize: int = 1000, **jobOptions) -> None:
+        Job.__init__(self, client, **jobOptions)
+        if [filter, criteria, userIds].count(None) != 2:
+            raise ValueError("Give exactly one of filter, criteria or userIds")
+        if userIds is not None and archiveFile:
+            raise ValueError("Users deleted by ID are not read first, so they cannot be archived")
+        self.filter = filter
+        self.criteria = criteria
+        self.userIds = userIds
+        self.archiveFile = archiveFile
+        self.partitioned = partitioned
+        self.pageSize = pageSize
+        self.pageSelector = None
+        self.attributes: Optional[Sequence[str]] = None
+        self.archive = None
+
+    def start(self) -> None:
+        localConditions = []
+        if self.criteria is not None:
+            compiled = compileCriteria(self.criteria, self.client.resolveName)
+            for planFilter, localConditions in compiled.plans():
+                if self.client.acceptsFilter(planFilter):
+                    break
+            else:
+                raise CriteriaError("PingOne did not accept the group conditions in the criteria as a filter")
+            self.filter = planFilter
+            self.pageSelector = pageEvaluator(localConditions)
+        if self.archiveFile:
+            # The archive needs the full user records
+            self.archive = ArchiveWriter(self.archiveFile)
+            self.attributes = None
+        else:
+            self.attributes = sorted({"id", "username"} | set(localAttributes(localConditions)))
+
+    def finish(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+
+    def items(self) -> Iterator[dict]:
+        if self.userIds is not None:
+            for userId in self.userIds:
+                yield {"id": userId}
+            return
+        for page in self.client.userPages(self.filter, self.attributes, self.pageSize, self.partitioned):
+            users = self.pageSelector(page) if self.pageSelector is not None else page
+            self.counts["skipped"] += len(page) - len(users)
+            if self.archive is not None:
+                self.archive.addPage(users)
+            yield from users
+
+    def failedResult(self, user: dict, error: Exception) -> UserResult:
+        return UserResult("failed", user.get('id'), user.get('username'), None, f"{type(error).__name__}: {error}")
+
+    def process(self, user: dict) -> UserResult:
+        return self.client.deleteUser(user['id'], user.get('username'))
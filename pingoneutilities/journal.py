@@ -0,0 +1,84 @@
+# PingOne Utilities - Created User Journal
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A compact binary record of the users created by one import run, so the run
+# can be rolled back by ID without scanning the environment.
+#
+# File layout: "P1J1", the 16 byte environment ID, then one record per user -
+# the 16 byte user ID, a 1 byte username length and the UTF-8 username.
+
+import atexit
+import threading
+import uuid
+
+journalMagic = b"P1J1"
+
+class JournalError(Exception):
+    #######
+    # A journal file that cannot be read
+    #######
+    pass
+
+class JournalWriter:
+    #######
+    # Thread-safe append-only journal - records are buffered and flushed after each batch
+    #######
+
+    def __init__(self, fileName, p1Environment):
+        self.fileName = fileName
+        self.lock = threading.Lock()
+        self.count = 0
+        self.journalFile = open(fileName, "wb")
+        self.journalFile.write(journalMagic + uuid.UUID(p1Environment).bytes)
+        atexit.register(self.close)
+
+    def append(self, userId, username):
+        usernameBytes = username.encode("utf-8")[:255]
+        record = uuid.UUID(userId).bytes + bytes([len(usernameBytes)]) + usernameBytes
+        with self.lock:
+            self.journalFile.write(record)
+            self.count += 1
+
+    def flush(self):
+        with self.lock:
+            if not self.journalFile.closed:
+                self.journalFile.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.journalFile.closed:
+                self.journalFile.close()
+
+def readJournal(fileName, chunkSize=1000):
+    #######
+    # Read a journal - returns the environment ID and a generator of [(user ID, username)] chunks
+    # A record cut short by an interrupted run is ignored
+    #######
+
+    journalFile = open(fileName, "rb")
+    header = journalFile.read(20)
+    if len(header) != 20 or header[:4] != journalMagic:
+        journalFile.close()
+        raise JournalError(f"{fileName} is not a PingOne import journal")
+    p1Environment = str(uuid.UUID(bytes=header[4:]))
+
+    def chunks():
+        with journalFile:
+            data = journalFile.read()
+        chunk = []
+        position = 0
+        while position + 17 <= len(data):
+            usernameLength = data[position + 16]
+            end = position + 17 + usernameLength
+            if end > len(data):
+                break
+            chunk.append((str(uuid.UUID(bytes=data[position:position + 16])), data[position + 17:end].decode("utf-8", "replace")))
+            position = end
+            if len(chunk) >= chunkSize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    return p1Environment, chunks()
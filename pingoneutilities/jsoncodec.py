@@ -0,0 +1,43 @@
+# PingOne Utilities - JSON Codec
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# JSON encoding and decoding for the hot paths: user bodies sent to PingOne,
+# user pages read back, archive and export lines.  orjson is used when it is
+# installed (pip install orjson) and the standard json module otherwise, so
+# nothing has to be installed for the tools to work.
+#
+# Bodies are encoded straight to UTF-8 bytes and sent with data=, so requests
+# does not encode them again.  Both backends write compact JSON with non-ASCII
+# characters as UTF-8, so the bytes sent are the same whichever is used.
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    jsonBackend = "orjson"
+
+    def encodeBody(value):
+        return orjson.dumps(value)
+
+    def decodeJson(data):
+        return orjson.loads(data)
+else:
+    jsonBackend = "json"
+    compactEncoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def encodeBody(value):
+        return compactEncoder.encode(value).encode("utf-8")
+
+    def decodeJson(data):
+        return json.loads(data)
+
+def decodeResponse(response):
+    #######
+    # The JSON body of a PingOne response - replaces response.json() on the hot paths
+    #######
+    return decodeJson(response.content)
@@ -0,0 +1,279 @@
+# PingOne Utilities - Log Pipeline
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Queue-based logging for the import and delete tools.  Worker threads hand
+# records to a queue without blocking and a single background writer formats
+# them and writes them to disk in batches.
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+textFormat = logging.Formatter("%(asctime)s - %(message)s")
+stopRecord = None
+
+class QueueLogHandler(logging.Handler):
+    #######
+    # Hands records to the writer queue
+    # SimpleQueue is thread safe, so the per-handler lock taken by logging.Handler.handle is skipped
+    #######
+
+    def __init__(self, logQueue, target):
+        logging.Handler.__init__(self)
+        self.logQueue = logQueue
+        self.target = target
+
+    def handle(self, record):
+        if self.filter(record):
+            self.logQueue.put((self.target, record))
+        return True
+
+    def emit(self, record):
+        self.logQueue.put((self.target, record))
+
+class LogTarget:
+    #######
+    # One log file, with size and time based rotation and optional compression of rotated files
+    #######
+
+    def __init__(self, fileName, logFormat, successMode, successSample, maxBytes, rotateSeconds, compress):
+        self.fileName = fileName
+        self.logFormat = logFormat
+        self.successMode = successMode
+        self.successSample = successSample
+        self.maxBytes = maxBytes
+        self.rotateSeconds = rotateSeconds
+        self.compress = compress
+        self.successSeen = 0
+        self.successCounts = {}
+        self.compressThreads = []
+        self.openFile()
+
+    def openFile(self):
+        self.logFile = open(self.fileName, "a", encoding="utf-8")
+        self.bytesWritten = self.logFile.tell()
+        self.openedAt = time.time()
+
+    def formatRecord(self, record):
+        fields = getattr(record, "p1", None)
+
+        if fields is not None and fields.get("success"):
+            if self.successMode == "aggregate":
+                event = fields.get("event", "success")
+                self.successCounts[event] = self.successCounts.get(event, 0) + 1
+                return None
+            if self.successMode == "sample":
+                self.successSeen += 1
+                if (self.successSeen - 1) % self.successSample != 0:
+                    return None
+
+        if self.logFormat == "jsonl":
+            line = {}
+            line["time"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+            line["level"] = record.levelname
+            line["message"] = record.getMessage()
+            if fields is not None:
+                for key, value in fields.items():
+                    if key != "success":
+                        line[key] = value
+            return json.dumps(line, default=str)
+        else:
+            return textFormat.format(record)
+
+    def summaryLine(self, interval):
+        #######
+        # Build the aggregated success line for the last flush interval
+        #######
+        if not self.successCounts:
+            return None
+        counts = self.successCounts
+        self.successCounts = {}
+        if self.logFormat == "jsonl":
+            line = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "level": "INFO", "message": "Aggregated successful operations", "intervalSeconds": interval}
+            line.update(counts)
+            return json.dumps(line)
+        summary = ", ".join(f"{event}={count}" for event, count in counts.items())
+        return f"{time.strftime('%Y-%m-%d %H:%M:%S')},000 - Successful operations in the last {interval} seconds: {summary}"
+
+    def write(self, lines):
+        if not lines:
+            return
+        block = "\n".join(lines) + "\n"
+        self.logFile.write(block)
+        self.logFile.flush()
+        self.bytesWritten += len(block)
+        self.checkRotation()
+
+    def checkRotation(self):
+        if (self.maxBytes > 0 and self.bytesWritten >= self.maxBytes) or \
+           (self.rotateSeconds > 0 and time.time() - self.openedAt >= self.rotateSeconds):
+            self.rotate()
+
+    def rotate(self):
+        self.logFile.close()
+        baseName, extension = os.path.splitext(self.fileName)
+        rotatedName = f"{baseName}-{time.strftime('%Y%m%d-%H%M%S')}{extension}"
+        suffix = 1
+        while os.path.exists(rotatedName) or os.path.exists(rotatedName + ".gz"):
+            rotatedName = f"{baseName}-{time.strftime('%Y%m%d-%H%M%S')}-{suffix}{extension}"
+            suffix += 1
+        os.replace(self.fileName, rotatedName)
+        self.openFile()
+        if self.compress:
+            # Compress off the writer thread so a large file never stalls the log queue
+            compressThread = threading.Thread(target=compressFile, args=(rotatedName,), daemon=True)
+            compressThread.start()
+            self.compressThreads.append(compressThread)
+
+    def close(self):
+        self.logFile.close()
+        for compressThread in self.compressThreads:
+            compressThread.join()
+
+def compressFile(fileName):
+    #######
+    # Gzip a rotated log file and remove the original
+    #######
+    with open(fileName, "rb") as source, gzip.open(fileName + ".gz", "wb") as destination:
+        shutil.copyfileobj(source, destination)
+    os.remove(fileName)
+
+class LogWriter(threading.Thread):
+    #######
+    # Background writer - drains the queue and writes each target's records in one batch
+    #######
+
+    def __init__(self, logQueue, flushSeconds, maxBatch):
+        threading.Thread.__init__(self, name="P1LogWriter", daemon=True)
+        self.logQueue = logQueue
+        self.flushSeconds = flushSeconds
+        self.maxBatch = maxBatch
+        self.targets = []
+        self.lastSummary = time.time()
+
+    def run(self):
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.logQueue.get(timeout=self.flushSeconds))
+                while len(batch) < self.maxBatch:
+                    batch.append(self.logQueue.get_nowait())
+            except queue.Empty:
+                pass
+
+            linesByTarget = {}
+            for item in batch:
+                if item is stopRecord:
+                    running = False
+                    continue
+                target, record = item
+                try:
+                    line = target.formatRecord(record)
+                except Exception as e:
+                    line = f"Unable to format log record: {e}"
+                if line is not None:
+                    linesByTarget.setdefault(target, []).append(line)
+
+            now = time.time()
+            if now - self.lastSummary >= self.flushSeconds * 10 or not running:
+                for target in self.targets:
+                    summary = target.summaryLine(int(now - self.lastSummary))
+                    if summary is not None:
+                        linesByTarget.setdefault(target, []).append(summary)
+                self.lastSummary = now
+
+            for target, lines in linesByTarget.items():
+                target.write(lines)
+            for target in self.targets:
+                if target not in linesByTarget:
+                    target.checkRotation()
+
+        for target in self.targets:
+            target.close()
+
+class LogPipeline:
+    #######
+    # Owns the queue, writer thread and handlers for one tool run
+    #######
+
+    def __init__(self, logFormat="text", successMode="all", successSample=1, maxBytes=0, rotateSeconds=0, compress=False, flushSeconds=1.0, maxBatch=5000):
+        self.logFormat = logFormat
+        self.successMode = successMode
+        self.successSample = successSample
+        self.maxBytes = maxBytes
+        self.rotateSeconds = rotateSeconds
+        self.compress = compress
+        self.logQueue = queue.SimpleQueue()
+        self.writer = LogWriter(self.logQueue, flushSeconds, maxBatch)
+        self.handlers = []
+        self.stopped = False
+
+    def attach(self, logger, fileName):
+        target = LogTarget(fileName, self.logFormat, self.successMode, self.successSample, self.maxBytes, self.rotateSeconds, self.compress)
+        self.writer.targets.append(target)
+        handler = QueueLogHandler(self.logQueue, target)
+        logger.addHandler(handler)
+        self.handlers.append((logger, handler))
+
+    def start(self):
+        self.writer.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        #######
+        # Flush everything still queued and close the files
+        #######
+        if self.stopped:
+            return
+        self.stopped = True
+        for logger, handler in self.handlers:
+            logger.removeHandler(handler)
+        self.logQueue.put(stopRecord)
+        self.writer.join()
+
+def addLoggingArguments(parser):
+    #######
+    # Add the logging options to a tool's argument parser
+    #######
+    group = parser.add_argument_group("logging")
+    group.add_argument("--log-format", choices=["text", "jsonl"], default="text", help="Write log lines as plain text (default) or JSON lines")
+    group.add_argument("--log-success", default="all", help="How to log successful per-user operations: all (default), sample:N (one in every N), or aggregate (periodic counts)")
+    group.add_argument("--log-max-mb", type=int, default=0, help="Rotate a log file once it reaches this many megabytes (0 = never)")
+    group.add_argument("--log-rotate-minutes", type=int, default=0, help="Rotate log files after this many minutes (0 = never)")
+    group.add_argument("--log-compress", action="store_true", help="Gzip rotated log files")
+
+def startLogging(args, loggerFiles):
+    #######
+    # Build and start the log pipeline from parsed arguments
+    # loggerFiles is a list of (logger, file name) pairs
+    #######
+
+    successMode = "all"
+    successSample = 1
+    if args.log_success == "aggregate":
+        successMode = "aggregate"
+    elif args.log_success.startswith("sample:") and args.log_success[7:].isdigit() and int(args.log_success[7:]) > 0:
+        successMode = "sample"
+        successSample = int(args.log_success[7:])
+    elif args.log_success != "all":
+        print(f'Invalid --log-success value ({args.log_success}), logging all successful operations.')
+
+    # Caller file/line and process details are not part of our log format, so skip collecting them per record
+    logging._srcfile = None
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    pipeline = LogPipeline(args.log_format, successMode, successSample, args.log_max_mb * 1024 * 1024, args.log_rotate_minutes * 60, args.log_compress)
+    for logger, fileName in loggerFiles:
+        logger.propagate = False
+        pipeline.attach(logger, fileName)
+    pipeline.start()
+    return pipeline
@@ -0,0 +1,208 @@
+# PingOne Utilities - Column Mapping
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Declarative mapping from CSV columns to PingOne attributes, read from the
+# [Mapping] section of P1ImportUser.cfg.  Each entry is a template of column
+# references and literal text followed by optional transforms:
+#
+#   username = {Login} | trim | lower
+#   name.formatted = {First Name} {Last Name}
+#   mobilePhone = {Mobile} | phone(+1)
+#   hireDate = {Start} | date(%m/%d/%Y, %Y-%m-%d)
+#   population.id = 6a4e5b2c-0000-0000-0000-000000000000
+#
+# The whole mapping is compiled once into a single row function before the
+# run starts and applied to each batch as it streams from the CSV file.
+
+import configparser
+import csv
+import difflib
+import re
+from datetime import datetime
+
+columnReference = re.compile(r"\{([^{}]+)\}")
+transformSeparator = re.compile(r"\s+\|\s+")
+transformCall = re.compile(r"^(\w+)(?:\((.*)\))?$")
+
+def transformPhone(value, defaultCountryCode=""):
+    #######
+    # Normalize a phone number to +<digits>, adding the default country code when none is present
+    #######
+    digits = "".join(character for character in value if character.isdigit())
+    if not digits:
+        return ""
+    if value.lstrip().startswith("+"):
+        return "+" + digits
+    if value.lstrip().startswith("00"):
+        return "+" + digits[2:]
+    countryDigits = defaultCountryCode.lstrip("+")
+    if countryDigits and not digits.startswith(countryDigits):
+        return "+" + countryDigits + digits
+    return "+" + digits if countryDigits else digits
+
+def transformDate(value, inputFormat, outputFormat):
+    #######
+    # Reformat a date - values that do not match the input format are passed through for PingOne to report
+    #######
+    if not value:
+        return value
+    try:
+        return datetime.strptime(value, inputFormat).strftime(outputFormat)
+    except ValueError:
+        return value
+
+def transformDefault(value, defaultValue):
+    return value if value else defaultValue
+
+# name: (function, minimum arguments, maximum arguments)
+transforms = {
+    "trim": (str.strip, 0, 0),
+    "lower": (str.lower, 0, 0),
+    "upper": (str.upper, 0, 0),
+    "phone": (transformPhone, 0, 1),
+    "date": (transformDate, 2, 2),
+    "default": (transformDefault, 1, 1)
+}
+
+class MappingError(Exception):
+    pass
+
+def suggestMatches(name, knownNames):
+    #######
+    # Close matches for an unknown column or attribute name
+    #######
+    suggestions = [known for known in knownNames if known.lower() == name.lower() and known != name]
+    for match in difflib.get_close_matches(name, knownNames, n=3, cutoff=0.6):
+        if match not in suggestions:
+            suggestions.append(match)
+    return suggestions
+
+def findUnknownNames(names, knownNames):
+    #######
+    # Set-based resolution - returns [(name, [suggestions])] for every name not in knownNames
+    #######
+    knownSet = set(knownNames)
+    return [(name, suggestMatches(name, knownNames)) for name in names if name not in knownSet]
+
+def splitTemplate(template):
+    #######
+    # Split an entry into (template, [transforms], isQuotedConstant)
+    # A quoted constant is taken literally, so it may contain braces or " | "
+    #######
+    template = template.strip()
+    if template.startswith('"') and template.find('"', 1) > 0:
+        closingQuote = template.find('"', 1)
+        rest = " " + template[closingQuote + 1:].strip()
+        return template[1:closingQuote], transformSeparator.split(rest)[1:], True
+    pieces = transformSeparator.split(template)
+    return pieces[0], pieces[1:], False
+
+def parseTransform(text):
+    #######
+    # Parse "name" or "name(arg, arg)" - arguments may be quoted to include commas
+    #######
+    match = transformCall.match(text.strip())
+    if match is None or match.group(1) not in transforms:
+        raise MappingError(f"Unknown transform ({text.strip()}) - available transforms: {', '.join(transforms)}")
+    name = match.group(1)
+    arguments = []
+    if match.group(2) is not None and match.group(2).strip():
+        arguments = next(csv.reader([match.group(2)], skipinitialspace=True))
+    function, minimumArguments, maximumArguments = transforms[name]
+    if not (minimumArguments <= len(arguments) <= maximumArguments):
+        raise MappingError(f"Transform {name} takes between {minimumArguments} and {maximumArguments} arguments")
+    return name, arguments
+
+class ColumnMapping:
+    #######
+    # A mapping compiled against one CSV header row
+    #######
+
+    def __init__(self, entries, csvHeaders):
+        self.entries = entries
+        self.csvHeaders = csvHeaders
+        self.attributes = list(entries.keys())
+        self.mapRow = self.compile()
+
+    def sourceColumns(self):
+        columns = []
+        for template in self.entries.values():
+            source, transformTexts, isConstant = splitTemplate(template)
+            if isConstant:
+                continue
+            for column in columnReference.findall(source):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def compile(self):
+        #######
+        # Generate one function that builds the mapped row, so each row costs a single call
+        #######
+
+        headerIndexes = {header: idx for idx, header in enumerate(self.csvHeaders)}
+        unknownColumns = findUnknownNames(self.sourceColumns(), self.csvHeaders)
+        if unknownColumns:
+            problems = []
+            for column, suggestions in unknownColumns:
+                hint = f" (did you mean: {', '.join(suggestions)}?)" if suggestions else ""
+                problems.append(f"{column}{hint}")
+            raise MappingError(f"Mapping refers to columns that are not in the CSV file: {'; '.join(problems)}")
+
+        namespace = {}
+        expressions = []
+        for attribute, template in self.entries.items():
+            source, transformTexts, isConstant = splitTemplate(template)
+
+            # Template - column references and literal text joined together
+            parts = []
+            position = 0
+            if not isConstant:
+                for reference in columnReference.finditer(source):
+                    if reference.start() > position:
+                        parts.append(repr(source[position:reference.start()]))
+                    parts.append(f"row[{headerIndexes[reference.group(1)]}]")
+                    position = reference.end()
+            if position < len(source):
+                parts.append(repr(source[position:]))
+            expression = " + ".join(parts) if parts else "''"
+
+            # Transforms applied left to right
+            for transformText in transformTexts:
+                name, arguments = parseTransform(transformText)
+                function = transforms[name][0]
+                functionName = f"transform_{name}"
+                namespace[functionName] = function
+                argumentText = "".join(", " + repr(argument) for argument in arguments)
+                expression = f"{functionName}({expression}{argumentText})"
+
+            expressions.append(expression)
+
+        width = len(self.csvHeaders)
+        source = "def mapRow(row):\n"
+        source += f"    if len(row) < {width}:\n"
+        source += f"        row = row + [''] * ({width} - len(row))\n"
+        source += f"    return [{', '.join(expressions)}]\n"
+        exec(compile(source, "<P1ImportUser.cfg Mapping>", "exec"), namespace)
+        return namespace["mapRow"]
+
+    def mapBatches(self, batches):
+        #######
+        # Generator - apply the mapping to each batch as it streams from the CSV file
+        #######
+        mapRow = self.mapRow
+        for csvRows in batches:
+            yield [mapRow(csvRow) for csvRow in csvRows]
+
+def readMappingSection(configFileName):
+    #######
+    # Read the [Mapping] section, keeping attribute name case and literal % characters
+    # Returns an ordered dict of attribute -> template, or None when there is no mapping
+    #######
+    configFile = configparser.ConfigParser(interpolation=None)
+    configFile.optionxform = str
+    configFile.read(configFileName)
+    if "Mapping" not in configFile.sections() or len(configFile["Mapping"]) == 0:
+        return None
+    return dict(configFile["Mapping"].items())
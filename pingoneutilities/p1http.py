@@ -0,0 +1,69 @@
+# PingOne Utilities - HTTP Session
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Shared requests session for PingOne API calls.  Connections are pooled and
+# reused across worker threads, and throttled (429) calls are retried after
+# the server's Retry-After delay.  Once the environment is known, calls are
+# also limited by the environment's shared rate governor.
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pingoneutilities.profiling import spans
+
+class LimitedSession(requests.Session):
+    #######
+    # Session that takes a token from its rate limiter (if one is set) before every call
+    # The limiter can be set after the session is created, once the environment is known
+    #######
+
+    def __init__(self, rateLimiter=None):
+        requests.Session.__init__(self)
+        self.rateLimiter = rateLimiter
+        # Calls sent and not yet answered - read by the dashboard
+        self.inFlight = 0
+        self.inFlightLock = threading.Lock()
+
+    def request(self, *args, **kwargs):
+        if self.rateLimiter is not None:
+            with spans.span("rate-wait"):
+                self.rateLimiter.acquire()
+        with self.inFlightLock:
+            self.inFlight += 1
+        try:
+            with spans.span("send"):
+                return requests.Session.request(self, *args, **kwargs)
+        finally:
+            with self.inFlightLock:
+                self.inFlight -= 1
+
+def createSession(poolSize=100, throttleRetries=3):
+    #######
+    # Build a session sized for the tool's worker pool
+    #######
+
+    retryPolicy = Retry(
+        total=throttleRetries,
+        connect=0,
+        read=0,
+        status_forcelist=[429],
+        allowed_methods=None,  # A 429 means the call was not processed, so it is safe to retry any method
+        backoff_factor=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=poolSize, max_retries=retryPolicy)
+
+    session = LimitedSession()
+    session.mount("https://", adapter)
+    return session
+
+def attachReport(session, runReport):
+    #######
+    # Record every call made through the session in the run report
+    #######
+    session.hooks["response"].append(runReport.recordResponse)
@@ -0,0 +1,115 @@
+# PingOne Utilities - Password Pre-Hashing
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Hashes cleartext password columns into an encoding the PingOne user import
+# content type accepts, so cleartext passwords never leave the local network.
+# Hashing runs in a process pool and is pipelined ahead of the HTTP senders.
+
+import base64
+import hashlib
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+hashAlgorithms = ["bcrypt", "ssha512"]
+defaultBcryptRounds = 10
+
+# Encoded values that are sent as-is - a known scheme prefix followed by a complete hash, so a
+# cleartext password that happens to start with "{" or "$2" is still hashed
+encodedPatterns = [
+    re.compile(r"^\{(SSHA512|SSHA384|SSHA256|SSHA|SHA512|SHA384|SHA256|SHA|SMD5|MD5)\}[A-Za-z0-9+/]+={0,2}$", re.IGNORECASE),
+    re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+]
+
+def isEncoded(value):
+    #######
+    # Values that already carry a hash in one of the encodings above are sent as-is
+    #######
+    return any(pattern.match(value) for pattern in encodedPatterns)
+
+def hashPassword(password, algorithm, bcryptRounds):
+    #######
+    # Hash one cleartext password
+    #######
+
+    passwordBytes = password.encode("utf-8")
+
+    if algorithm == "ssha512":
+        salt = os.urandom(16)
+        digest = hashlib.sha512(passwordBytes + salt).digest()
+        return "{SSHA512}" + base64.b64encode(digest + salt).decode("ascii")
+
+    if algorithm == "bcrypt":
+        return bcrypt.hashpw(passwordBytes, bcrypt.gensalt(rounds=bcryptRounds)).decode("ascii")
+
+    raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+
+def hashRows(csvRows, columnIndexes, algorithm, bcryptRounds):
+    #######
+    # Process pool task - hash the password columns of a chunk of CSV rows
+    #######
+
+    for csvRow in csvRows:
+        for idx in columnIndexes:
+            if idx < len(csvRow):
+                value = csvRow[idx].strip()
+                if value and not isEncoded(value):
+                    csvRow[idx] = hashPassword(value, algorithm, bcryptRounds)
+    return csvRows
+
+class PasswordHasher:
+    #######
+    # Process pool that hashes batches of rows ahead of the senders
+    #######
+
+    def __init__(self, algorithm, columnIndexes, workers=0, bcryptRounds=defaultBcryptRounds, chunkSize=10, lookahead=4):
+        if algorithm not in hashAlgorithms:
+            raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+        if algorithm == "bcrypt" and bcrypt is None:
+            raise ValueError("The bcrypt library is required for bcrypt hashing (pip install bcrypt)")
+        self.algorithm = algorithm
+        self.columnIndexes = columnIndexes
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.bcryptRounds = bcryptRounds
+        self.chunkSize = chunkSize
+        self.lookahead = lookahead
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def submitBatch(self, csvRows):
+        #######
+        # Split a batch into chunks so every core works on it
+        #######
+        futures = []
+        for start in range(0, len(csvRows), self.chunkSize):
+            futures.append(self.executor.submit(hashRows, csvRows[start:start + self.chunkSize], self.columnIndexes, self.algorithm, self.bcryptRounds))
+        return futures
+
+    def hashBatches(self, batches):
+        #######
+        # Generator - keeps up to lookahead batches hashing while the caller sends the current one
+        # Batches are yielded in their original order
+        #######
+
+        pending = deque()
+        for csvRows in batches:
+            pending.append(self.submitBatch(csvRows))
+            if len(pending) > self.lookahead:
+                yield self.collect(pending.popleft())
+        while pending:
+            yield self.collect(pending.popleft())
+
+    def collect(self, futures):
+        hashedRows = []
+        for future in futures:
+            hashedRows.extend(future.result())
+        return hashedRows
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
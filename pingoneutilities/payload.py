@@ -0,0 +1,86 @@
+# PingOne Utilities - User Payloads
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Converts between PingOne user objects and the flat, dotted attribute names
+# used as CSV headers by the import tool (e.g. name.given).
+
+def flattenUser(user, prefix="", flatUser=None):
+    #######
+    # Flatten nested user attributes to dotted names, the reverse of how importUser nests CSV headers
+    # HAL links and embedded resources are left out
+    #######
+    if flatUser is None:
+        flatUser = {}
+    for key, value in user.items():
+        if key.startswith("_"):
+            continue
+        if isinstance(value, dict):
+            flattenUser(value, prefix + key + ".", flatUser)
+        else:
+            flatUser[prefix + key] = value
+    return flatUser
+
+# Attributes set by PingOne or tied to one environment - never sent when a user is created from a read user
+serverSetAttributes = ("id", "environment", "createdAt", "updatedAt", "lastSignOn", "lifecycle", "identityProvider", "account", "verifyStatus", "memberOfGroupIDs", "memberOfGroupNames")
+
+def copyableAttributes(user):
+    #######
+    # Flattened attributes of a user read from PingOne that can be sent to create it again
+    #######
+    return {name: value for name, value in flattenUser(user).items() if name.split(".")[0] not in serverSetAttributes}
+
+# Attributes that are not copied straight into the user body
+userSpecialFields = {"password", "population", "population.id", "enabled"}
+
+# Attributes PingOne accepts when a user is created but never returns when users are read
+writeOnlyAttributes = {"mfaEmail1", "mfaEmail2", "mfaSmsVoice1", "mfaSmsVoice2"}
+
+def buildUserPayload(userAttributes, p1DefaultPopulation, p1PasswordReset):
+    #######
+    # Build the user import body from dotted attribute names and their values
+    # Values are strings from a CSV row or typed values read from another environment - empty values are left out
+    #######
+
+    user = {}
+
+    # Build user object, handling nested fields
+    for name, value in userAttributes.items():
+        if name in userSpecialFields:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "" or value == []:
+            continue
+        parts = name.split('.')
+        if len(parts) == 1:
+            user[name] = value
+        else:
+            d = user
+            for part in parts[:-1]:
+                if part not in d or not isinstance(d[part], dict):
+                    d[part] = {}
+                d = d[part]
+            d[parts[-1]] = value
+
+    # Handle enabled/disabled user
+    enabled = userAttributes.get("enabled")
+    if isinstance(enabled, bool):
+        user["enabled"] = enabled
+    elif enabled is not None:
+        user["enabled"] = str(enabled).strip().lower() == "true"
+
+    # Handle population
+    population = userAttributes.get("population.id", userAttributes.get("population"))
+    population = population.strip() if isinstance(population, str) else ""
+    user["population"] = {"id": population if population else p1DefaultPopulation}
+
+    # Handle password and forceChange
+    password = userAttributes.get("password")
+    if isinstance(password, str) and password.strip():
+        user["password"] = {
+            "value": password.strip(),
+            "forceChange": p1PasswordReset == "true"
+        }
+
+    return user
@@ -0,0 +1,223 @@
+# PingOne Utilities - Profiling
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Timing spans for the stages of a run (read, build, rate-wait, send, parse,
+# log, ...) and an optional sampling profiler, both switched on with
+# --profile.  While profiling is off a span costs one attribute check.
+#
+# Spans are added up in a table per thread, so the worker threads never wait
+# on each other to record one.  The tables are merged when the run ends.
+# Stage totals are summed across threads, so with 100 workers they can add
+# up to far more than the run's wall clock time - compare the shares.
+#
+# The sampling profiler looks at every thread's stack every few milliseconds
+# and writes the counts as folded stacks (one "frame;frame;frame count" line
+# per stack), the input format of flamegraph.pl, speedscope and inferno.
+
+import atexit
+import os
+import sys
+import threading
+import time
+
+class NoSpan:
+    #######
+    # The span handed out while profiling is off - does nothing
+    #######
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exceptionInfo):
+        return False
+
+noSpan = NoSpan()
+
+class Span:
+    __slots__ = ("recorder", "stage", "start")
+
+    def __init__(self, recorder, stage):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exceptionInfo):
+        self.recorder.add(self.stage, time.perf_counter_ns() - self.start)
+        return False
+
+class SpanRecorder:
+    #######
+    # Per-stage call counts and times - with spans.span("send"): ...
+    #######
+
+    def __init__(self):
+        self.enabled = False
+        self.startTime = None
+        self.local = threading.local()
+        self.tables = []
+        self.tablesLock = threading.Lock()
+
+    def enable(self):
+        self.startTime = time.perf_counter()
+        self.enabled = True
+
+    def span(self, stage):
+        if not self.enabled:
+            return noSpan
+        return Span(self, stage)
+
+    def add(self, stage, elapsedNs):
+        table = getattr(self.local, "table", None)
+        if table is None:
+            table = {}
+            self.local.table = table
+            with self.tablesLock:
+                self.tables.append(table)
+        entry = table.get(stage)
+        if entry is None:
+            table[stage] = [1, elapsedNs, elapsedNs]
+        else:
+            entry[0] += 1
+            entry[1] += elapsedNs
+            if elapsedNs > entry[2]:
+                entry[2] = elapsedNs
+
+    def breakdown(self):
+        #######
+        # Merged stage counts and times, largest total first
+        #######
+        merged = {}
+        with self.tablesLock:
+            tables = list(self.tables)
+        for table in tables:
+            for stage, (count, totalNs, maxNs) in list(table.items()):
+                entry = merged.setdefault(stage, [0, 0, 0])
+                entry[0] += count
+                entry[1] += totalNs
+                entry[2] = max(entry[2], maxNs)
+        allNs = sum(entry[1] for entry in merged.values())
+        stages = {}
+        for stage, (count, totalNs, maxNs) in sorted(merged.items(), key=lambda item: -item[1][1]):
+            stages[stage] = {
+                "count": count,
+                "totalSeconds": round(totalNs / 1e9, 3),
+                "meanMs": round(totalNs / count / 1e6, 3),
+                "maxMs": round(maxNs / 1e6, 3),
+                "sharePercent": round(totalNs * 100 / allNs, 1) if allNs else 0.0
+            }
+        return {"wallSeconds": round(time.perf_counter() - self.startTime, 3) if self.startTime is not None else None, "stages": stages}
+
+# The recorder every module times its stages with
+spans = SpanRecorder()
+
+def frameName(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    #######
+    # Samples every thread's stack on a background thread and counts the folded stacks
+    #######
+
+    def __init__(self, fileName, intervalSeconds=0.005):
+        self.fileName = fileName
+        self.intervalSeconds = intervalSeconds
+        self.stackCounts = {}
+        self.samples = 0
+        self.stopEvent = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="P1Profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def run(self):
+        ownIdent = threading.get_ident()
+        while not self.stopEvent.wait(self.intervalSeconds):
+            threadNames = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == ownIdent:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(frameName(frame.f_code))
+                    frame = frame.f_back
+                # Threads of one pool share a name prefix, so their stacks merge into one tower
+                threadName = threadNames.get(ident, "thread").split("_")[0].rstrip("-0123456789") or "thread"
+                stack = threadName + ";" + ";".join(reversed(names))
+                self.stackCounts[stack] = self.stackCounts.get(stack, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        #######
+        # Stop sampling and write the folded stacks - safe to call more than once
+        #######
+        if self.stopEvent.is_set():
+            return
+        self.stopEvent.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        with open(self.fileName, "w", encoding="utf-8") as stackFile:
+            for stack, count in sorted(self.stackCounts.items()):
+                stackFile.write(f"{stack} {count}\n")
+
+def profileLogger(logger):
+    #######
+    # Time every record the logger creates and hands to its handlers as the "log" stage
+    #######
+    log = logger._log
+
+    def timedLog(*args, **kwargs):
+        with spans.span("log"):
+            return log(*args, **kwargs)
+
+    logger._log = timedLog
+
+def addProfilingArguments(parser):
+    #######
+    # Add the profiling options to a tool's argument parser
+    #######
+    group = parser.add_argument_group("profiling", "Find where a slow run spends its time")
+    group.add_argument("--profile", action="store_true", help="Time each stage of the run (read, build, rate-wait, send, parse, log) and add the breakdown to the run report")
+    group.add_argument("--profile-stacks", metavar="FILE", help="With --profile, also sample every thread's stack and write folded stacks for a flame graph to FILE")
+    group.add_argument("--profile-interval", type=float, default=5, help="Milliseconds between stack samples (default: 5)")
+
+def startProfiling(args, loggers):
+    #######
+    # Switch on the stage spans (and the sampling profiler when asked) - returns the profiler or None
+    #######
+    if not args.profile:
+        return None
+    spans.enable()
+    for logger in loggers:
+        profileLogger(logger)
+    profiler = None
+    if args.profile_stacks:
+        profiler = SamplingProfiler(args.profile_stacks, args.profile_interval / 1000)
+        profiler.start()
+    return profiler
+
+def finishProfiling(profiler, runReport):
+    #######
+    # Stop the sampling profiler and add the stage breakdown to the run report
+    # Returns the breakdown as lines for the tool to print, or [] when profiling is off
+    #######
+    if not spans.enabled:
+        return []
+    if profiler is not None:
+        profiler.stop()
+    breakdown = spans.breakdown()
+    if profiler is not None:
+        breakdown["stackFile"] = profiler.fileName
+        breakdown["stackSamples"] = profiler.samples
+    runReport.setProfile(breakdown)
+    lines = [f"{'Stage':<12} {'Count':>10} {'Total s':>10} {'Mean ms':>10} {'Max ms':>10} {'Share':>7}"]
+    for stage, stats in breakdown["stages"].items():
+        lines.append(f"{stage:<12} {stats['count']:>10} {stats['totalSeconds']:>10.3f} {stats['meanMs']:>10.3f} {stats['maxMs']:>10.3f} {stats['sharePercent']:>6.1f}%")
+    lines.append(f"Stage times are summed across threads - the run took {breakdown['wallSeconds']} s")
+    if profiler is not None:
+        lines.append(f"{profiler.samples} stack samples written to {profiler.fileName} (folded stacks - open with speedscope or flamegraph.pl)")
+    return lines
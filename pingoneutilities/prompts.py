@@ -0,0 +1,92 @@
+# PingOne Utilities - Interactive Prompts
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Prompts for the PingOne environment and worker client details, shared by
+# the interactive tools.
+
+import re
+import pwinput
+
+from pingoneutilities.auth import TokenManager, detectClientType
+
+guidFormat = r"^[a-fA-F0-9]{8}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{4}-[a-fA-F0-9]{12}$"
+guidExample = "aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"
+
+def printError(message):
+    #######
+    # Print an error message inside a banner
+    #######
+    print(f'')
+    print('*' * len(message))
+    print(message)
+    print('*' * len(message))
+    print(f'')
+
+def getGuid(question):
+    #######
+    # Prompt until a value in GUID format is entered
+    #######
+    getValue = input(f'{question} (format: {guidExample}): ').strip()
+    if re.match(guidFormat, getValue):
+        print(f'')
+        return getValue.lower()
+    printError(f'Error: The format of the value is invalid, please retry.')
+    return getGuid(question)
+
+def getP1Geo(label=""):
+    #######
+    # Prompts the user for the PingOne Geography and validates its format.
+    #######
+    getGeo = input(f'What is your {label}PingOne Geography? (.com, .ca, .asia, .au, .eu, etc.): [.com] ').strip()
+    if not getGeo:
+        print(f'')
+        return ".com"
+    if re.match(r"^\.[a-zA-Z]{1,4}$", getGeo):
+        print(f'')
+        return getGeo.lower()
+    printError(f'Invalid format, please retry.')
+    return getP1Geo(label)
+
+def getP1ClientSecret(label=""):
+    #######
+    # Prompts the user for the PingOne Client Secret securely.
+    #######
+    getClientSecret = pwinput.pwinput(prompt=f'What is your {label}PingOne Client Secret? :', mask='*')
+    print(f'')
+    return getClientSecret
+
+def getTokenRefreshDuration():
+    #######
+    # Prompts the user for the token refresh duration (in minutes) and validates the input.
+    #######
+    getRefreshDuration = input(f'How often do you want to refresh the worker access token, in minutes (59 minutes max)?: [30] ').strip()
+    if not getRefreshDuration:
+        print(f'')
+        return 30
+    if re.match(r"^[0-9]{1,2}$", getRefreshDuration) and 0 < int(getRefreshDuration) < 60:
+        print(f'')
+        return int(getRefreshDuration)
+    printError(f'Invalid duration - must be numeric, greater than 0, less than 60.')
+    return getTokenRefreshDuration()
+
+def getP1Connection(session, label=""):
+    #######
+    # Prompt for an environment and worker client until a token can be obtained
+    # Returns a TokenManager for the environment
+    #######
+    while True:
+        p1Environment = getGuid(f'What is your {label}PingOne Environment ID?')
+        p1Geography = getP1Geo(label)
+        p1ClientId = getGuid(f'What is your {label}PingOne Client ID?')
+        p1ClientSecret = getP1ClientSecret(label)
+        print(f'Checking client credentials with PingOne.')
+        p1ClientType = detectClientType(session, p1ClientId, p1ClientSecret, p1Geography, p1Environment)
+        if p1ClientType != "failed":
+            print(f'Client connection validated with {p1ClientType.upper()} auth.')
+            print(f'')
+            break
+        printError(f'Error: Failed to connect to client with both BASIC and POST.  Please re-enter client details and ensure your worker client is enabled.')
+
+    tokenRefresh = getTokenRefreshDuration()
+    return TokenManager(session, p1ClientId, p1ClientSecret, p1Geography, p1Environment, p1ClientType, tokenRefresh)
@@ -0,0 +1,256 @@
+# PingOne Utilities - Run Report
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Collects per-endpoint API call accounting while a tool runs and writes a
+# machine-readable JSON report at the end of the run.
+
+import json
+import math
+import platform
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from pingoneutilities.jsoncodec import jsonBackend
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows - peak memory is reported as null there
+    resource = None
+
+def classifyEndpoint(method, url):
+    #######
+    # Map a request method and URL to the endpoint type used in the report
+    #######
+
+    path = urlsplit(url).path
+    if path.endswith("/as/token"):
+        return "token"
+    if "/schemas" in path:
+        return "schema"
+    if path.endswith("/populations"):
+        return "populations"
+    if "/groups" in path:
+        return "groups"
+    if "/users" in path:
+        isCollection = path.rstrip("/").endswith("/users")
+        if method == "GET":
+            return "userPage" if isCollection else "userRead"
+        if method == "POST":
+            return "userCreate"
+        if method == "DELETE":
+            return "userDelete"
+        if method in ("PATCH", "PUT"):
+            return "userUpdate"
+    return "other"
+
+class LatencyHistogram:
+    #######
+    # Log-bucketed latency histogram (about 2% resolution) so millions of calls take constant memory
+    #######
+
+    bucketsPerE = 50
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.totalMs = 0.0
+        self.maxMs = 0.0
+
+    def record(self, latencyMs):
+        bucket = int(math.log(max(latencyMs, 0.01)) * self.bucketsPerE)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.totalMs += latencyMs
+        if latencyMs > self.maxMs:
+            self.maxMs = latencyMs
+
+    def percentile(self, fraction):
+        if self.count == 0:
+            return None
+        rank = math.ceil(self.count * fraction)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Upper edge of the bucket, capped at the observed maximum
+                return round(min(math.exp((bucket + 1) / self.bucketsPerE), self.maxMs), 2)
+        return round(self.maxMs, 2)
+
+    def summary(self):
+        return {
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+            "max": round(self.maxMs, 2),
+            "mean": round(self.totalMs / self.count, 2) if self.count else None
+        }
+
+class EndpointStats:
+    #######
+    # Call accounting for one endpoint type
+    #######
+
+    def __init__(self):
+        self.calls = 0
+        self.statuses = {}
+        self.bytesReceived = 0
+        self.latency = LatencyHistogram()
+
+class RunReport:
+    #######
+    # Thread-safe counters for one tool run
+    #######
+
+    def __init__(self, tool, version, timelineSeconds=10):
+        self.tool = tool
+        self.version = version
+        self.timelineSeconds = timelineSeconds
+        self.lock = threading.Lock()
+        self.startTime = time.time()
+        self.endpoints = {}
+        self.statusCounts = {}
+        self.retries = 0
+        self.throttleEvents = 0
+        self.totalRows = 0
+        self.timeline = []
+        self.lastSampleTime = self.startTime
+        self.lastSampleRows = 0
+        self.totals = {}
+        # Stage breakdown from --profile
+        self.profile = None
+
+    def recordResponse(self, response, *args, **kwargs):
+        #######
+        # requests response hook - records status, latency, bytes, retries and throttling for every API call
+        #######
+
+        endpoint = classifyEndpoint(response.request.method, response.request.url)
+        latencyMs = response.elapsed.total_seconds() * 1000
+        contentLength = len(response.content) if response.content else 0
+
+        # urllib3 keeps the history of any 429 retries it performed for this call
+        retryHistory = []
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None:
+            retryHistory = retries.history
+
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = EndpointStats()
+                self.endpoints[endpoint] = stats
+            stats.calls += 1
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            stats.bytesReceived += contentLength
+            stats.latency.record(latencyMs)
+            self.statusCounts[response.status_code] = self.statusCounts.get(response.status_code, 0) + 1
+            self.retries += len(retryHistory)
+            for retry in retryHistory:
+                if retry.status == 429:
+                    self.throttleEvents += 1
+            if response.status_code == 429:
+                self.throttleEvents += 1
+
+        return response
+
+    def recordRows(self, rowCount):
+        #######
+        # Add processed rows and sample the rows per second timeline
+        #######
+
+        with self.lock:
+            self.totalRows += rowCount
+            now = time.time()
+            if now - self.lastSampleTime >= self.timelineSeconds:
+                self.sampleTimeline(now)
+
+    def sampleTimeline(self, now):
+        elapsed = now - self.lastSampleTime
+        if elapsed > 0 and (self.totalRows != self.lastSampleRows or elapsed >= self.timelineSeconds):
+            self.timeline.append({
+                "elapsedSeconds": round(now - self.startTime, 1),
+                "rowsPerSecond": round((self.totalRows - self.lastSampleRows) / elapsed, 1)
+            })
+        self.lastSampleTime = now
+        self.lastSampleRows = self.totalRows
+
+    def counters(self):
+        #######
+        # Current call, status and row counts - sampled by the dashboard
+        #######
+        with self.lock:
+            return {
+                "apiCalls": sum(stats.calls for stats in self.endpoints.values()),
+                "statusCounts": dict(self.statusCounts),
+                "rows": self.totalRows,
+                "retries": self.retries,
+                "throttleEvents": self.throttleEvents
+            }
+
+    def setTotals(self, **totals):
+        with self.lock:
+            self.totals.update(totals)
+
+    def setProfile(self, profile):
+        with self.lock:
+            self.profile = profile
+
+    def peakMemoryMb(self):
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        if sys.platform == "darwin":
+            return round(peak / (1024 * 1024), 1)
+        return round(peak / 1024, 1)
+
+    def toDict(self):
+        with self.lock:
+            endTime = time.time()
+            self.sampleTimeline(endTime)
+            duration = endTime - self.startTime
+            endpoints = {}
+            for endpoint, stats in sorted(self.endpoints.items()):
+                endpoints[endpoint] = {
+                    "calls": stats.calls,
+                    "statusCounts": {str(status): count for status, count in sorted(stats.statuses.items())},
+                    "latencyMs": stats.latency.summary(),
+                    "totalSeconds": round(stats.latency.totalMs / 1000, 3),
+                    "bytesReceived": stats.bytesReceived
+                }
+            report = {
+                "tool": self.tool,
+                "version": self.version,
+                "python": platform.python_version(),
+                "jsonBackend": jsonBackend,
+                "startTime": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.startTime)),
+                "endTime": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(endTime)),
+                "durationSeconds": round(duration, 3),
+                "totals": dict(self.totals),
+                "rowsProcessed": self.totalRows,
+                "rowsPerSecond": round(self.totalRows / duration, 1) if duration > 0 else None,
+                "rowsPerSecondTimeline": list(self.timeline),
+                "apiCalls": sum(stats.calls for stats in self.endpoints.values()),
+                "statusCounts": {str(status): count for status, count in sorted(self.statusCounts.items())},
+                "retries": self.retries,
+                "throttleEvents": self.throttleEvents,
+                "endpoints": endpoints,
+                "peakMemoryMB": self.peakMemoryMb()
+            }
+            if self.profile is not None:
+                report["profile"] = self.profile
+            return report
+
+    def write(self, fileName):
+        with open(fileName, "w", encoding="utf-8") as reportFile:
+            json.dump(self.toDict(), reportFile, indent=2)
+
+def defaultReportName(prefix):
+    #######
+    # Timestamped report file name so reports from successive runs can be compared
+    #######
+    return f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json"
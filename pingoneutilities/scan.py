@@ -0,0 +1,264 @@
+# PingOne Utilities - User Scans
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Paging through the PingOne users collection.  A scan can be split into
+# partitions (for example one per population) that are paged concurrently
+# and merged into a single stream of pages through a bounded queue.
+# Populations too large for one cursor chain are split further into
+# creation date ranges.
+
+import queue
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlencode, quote
+
+from pingoneutilities.auth import P1ApiError
+from pingoneutilities.profiling import spans
+from pingoneutilities.jsoncodec import decodeResponse
+
+partitionDone = object()
+
+# Creation date ranges are split between here and now - the first range is open, so nothing older is missed
+earliestCreated = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+def usersUrl(tokenManager, filter="", limit=None, attributes=None):
+    #######
+    # Build the first page URL for a users scan
+    #######
+    params = {}
+    if filter:
+        params['filter'] = filter
+    if limit:
+        params['limit'] = limit
+    if attributes:
+        params['attributes'] = ",".join(attributes)
+    requestUrl = tokenManager.apiUrl("/users")
+    if params:
+        requestUrl += "?" + urlencode(params, quote_via=quote)
+    return requestUrl
+
+def getUserPage(session, tokenManager, requestUrl):
+    #######
+    # Get one page of users - returns the users, the next page URL ("" on the last page) and the match count
+    #######
+    response = session.get(requestUrl, headers=tokenManager.authHeaders())
+    if response.status_code != 200:
+        raise P1ApiError(f"Error getting users: {response.status_code} - {response.text}", response.status_code)
+    with spans.span("parse"):
+        responseJson = decodeResponse(response)
+    users = responseJson.get('_embedded', {}).get('users', [])
+    nextUrl = responseJson.get('_links', {}).get('next', {}).get('href', "")
+    return users, nextUrl, responseJson.get('count')
+
+def scanUsers(session, tokenManager, startUrl):
+    #######
+    # Generator - yield each page of users by following the _links.next cursor
+    #######
+    requestUrl = startUrl
+    while requestUrl:
+        users, requestUrl, count = getUserPage(session, tokenManager, requestUrl)
+        yield users
+
+def listPopulations(session, tokenManager):
+    #######
+    # Get every population in the environment
+    #######
+    populations = []
+    requestUrl = tokenManager.apiUrl("/populations")
+    while requestUrl:
+        response = session.get(requestUrl, headers=tokenManager.authHeaders())
+        if response.status_code != 200:
+            raise P1ApiError(f"Error getting populations: {response.status_code} - {response.text}", response.status_code)
+        responseJson = response.json()
+        populations.extend(responseJson.get('_embedded', {}).get('populations', []))
+        requestUrl = responseJson.get('_links', {}).get('next', {}).get('href', "")
+    return populations
+
+def populationPartitions(session, tokenManager, filter=""):
+    #######
+    # One partition per population - returns [(partition name, filter)]
+    #######
+    partitions = []
+    for population in listPopulations(session, tokenManager):
+        populationFilter = f'population.id eq "{population["id"]}"'
+        if filter:
+            populationFilter = f'({filter}) and {populationFilter}'
+        partitions.append((population['name'], populationFilter))
+    return partitions
+
+def countUsers(session, tokenManager, filter=""):
+    #######
+    # Number of users matching the filter, from a one user page
+    #######
+    users, nextUrl, count = getUserPage(session, tokenManager, usersUrl(tokenManager, filter, 1, ["id"]))
+    return count
+
+def createdFilter(filter, start, end):
+    #######
+    # Add a createdAt range to a filter - start and end are ISO strings, or None for an open end
+    #######
+    clauses = [f"({filter})"] if filter else []
+    if start is not None:
+        clauses.append(f'createdAt ge "{start}"')
+    if end is not None:
+        clauses.append(f'createdAt lt "{end}"')
+    return " and ".join(clauses)
+
+def isoTime(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+def createdPartitions(session, tokenManager, partitionName, filter, userCount, splitSize, maxRanges=64):
+    #######
+    # Split one partition into creation date ranges of about splitSize users, halving the largest range
+    # with a count query each time - returns [(partition name, filter)]
+    # The partition is returned whole if PingOne will not count a createdAt range
+    #######
+    now = datetime.now(timezone.utc)
+    ranges = [(None, None, userCount)]
+    try:
+        while len(ranges) < maxRanges:
+            ranges.sort(key=lambda createdRange: createdRange[2])
+            start, end, count = ranges[-1]
+            if count is None or count <= splitSize:
+                break
+            low = datetime.strptime(start, "%Y-%m-%dT%H:%M:%S.000Z").replace(tzinfo=timezone.utc) if start else earliestCreated
+            high = datetime.strptime(end, "%Y-%m-%dT%H:%M:%S.000Z").replace(tzinfo=timezone.utc) if end else now
+            if (high - low).total_seconds() < 3600:
+                break
+            middle = isoTime(low + (high - low) / 2)
+            lowerCount = countUsers(session, tokenManager, createdFilter(filter, start, middle))
+            if lowerCount is None:
+                break
+            ranges[-1:] = [(start, middle, lowerCount), (middle, end, max(count - lowerCount, 0))]
+    except P1ApiError:
+        return [(partitionName, filter)]
+    if len(ranges) == 1:
+        return [(partitionName, filter)]
+    ranges.sort(key=lambda createdRange: createdRange[0] or "")
+    return [(f"{partitionName} [{start or '...'} - {end or 'now'}]", createdFilter(filter, start, end)) for start, end, count in ranges]
+
+def balancedPartitions(session, tokenManager, filter="", splitSize=250000):
+    #######
+    # One partition per population, with populations of more than splitSize users split by creation date
+    # Falls back to a single partition if PingOne will not combine the filter with a population
+    #######
+    partitions = []
+    for partitionName, partitionFilter in populationPartitions(session, tokenManager, filter):
+        try:
+            userCount = countUsers(session, tokenManager, partitionFilter)
+        except P1ApiError as e:
+            if e.statusCode == 400:
+                return [("all users", filter)]
+            raise
+        if userCount == 0:
+            continue
+        if splitSize and userCount is not None and userCount > splitSize:
+            partitions.extend(createdPartitions(session, tokenManager, partitionName, partitionFilter, userCount, splitSize))
+        else:
+            partitions.append((partitionName, partitionFilter))
+    return partitions
+
+class PartitionedScanner:
+    #######
+    # Pages several partitions concurrently and merges their pages into one stream
+    # The bounded queue keeps memory constant however far the scanners get ahead of the consumer
+    #######
+
+    def __init__(self, session, tokenManager, partitions, limit=None, attributes=None, maxParallel=8, maxQueuedPages=16, resumeUrls=None):
+        self.session = session
+        self.tokenManager = tokenManager
+        self.partitions = partitions
+        self.limit = limit
+        self.attributes = attributes
+        self.maxParallel = max(1, min(maxParallel, len(partitions)))
+        self.pageQueue = queue.Queue(maxsize=maxQueuedPages)
+        self.stopEvent = threading.Event()
+        self.nextPartition = 0
+        self.partitionLock = threading.Lock()
+        # Partition name -> next page URL saved by an earlier run ("" when the partition was finished)
+        self.resumeUrls = resumeUrls if resumeUrls is not None else {}
+
+    def put(self, item):
+        while not self.stopEvent.is_set():
+            try:
+                self.pageQueue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def scanPartition(self, partitionName, partitionFilter):
+        #######
+        # Page through one partition - returns False if the consumer stopped the scan
+        #######
+        requestUrl = self.resumeUrls.get(partitionName)
+        if requestUrl == "":
+            return True
+        firstPage = requestUrl is None
+        if firstPage:
+            requestUrl = usersUrl(self.tokenManager, partitionFilter, self.limit, self.attributes)
+        while requestUrl:
+            try:
+                users, requestUrl, count = getUserPage(self.session, self.tokenManager, requestUrl)
+            except P1ApiError as e:
+                if firstPage and e.statusCode == 400 and self.attributes:
+                    # Projection was not accepted - page full user objects instead
+                    self.attributes = None
+                    requestUrl = usersUrl(self.tokenManager, partitionFilter, self.limit, None)
+                    continue
+                raise
+            firstPage = False
+            if not self.put((partitionName, users, requestUrl)):
+                return False
+        return True
+
+    def scanWorker(self):
+        #######
+        # Take partitions one at a time and page through each of them
+        #######
+        while not self.stopEvent.is_set():
+            with self.partitionLock:
+                if self.nextPartition >= len(self.partitions):
+                    break
+                partitionName, partitionFilter = self.partitions[self.nextPartition]
+                self.nextPartition += 1
+            try:
+                if not self.scanPartition(partitionName, partitionFilter):
+                    return
+            except Exception as e:
+                self.put((partitionName, e, None))
+                return
+        self.put(partitionDone)
+
+    def pages(self):
+        #######
+        # Generator - yield (partition name, users) pages as they arrive from any partition
+        #######
+        for partitionName, users, nextUrl in self.pagesWithCursors():
+            yield partitionName, users
+
+    def pagesWithCursors(self):
+        #######
+        # Generator - yield (partition name, users, next page URL) so a caller can checkpoint each partition
+        # Pages from one partition always arrive in order; the next page URL is "" on its last page
+        #######
+        workers = []
+        for workerNumber in range(self.maxParallel):
+            worker = threading.Thread(target=self.scanWorker, name=f"P1Scan-{workerNumber}", daemon=True)
+            worker.start()
+            workers.append(worker)
+
+        running = len(workers)
+        try:
+            while running > 0:
+                item = self.pageQueue.get()
+                if item is partitionDone:
+                    running -= 1
+                    continue
+                partitionName, users, nextUrl = item
+                if isinstance(users, Exception):
+                    raise users
+                yield partitionName, users, nextUrl
+        finally:
+            self.stopEvent.set()
@@ -0,0 +1,30 @@
+# PingOne Utilities - User Schema
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Reads the user attribute names of a PingOne environment, with complex
+# attributes expanded to dotted names (e.g. name.given).
+
+from pingoneutilities.auth import P1ApiError
+
+def listUserAttributes(session, tokenManager):
+    #######
+    # Get the user attribute names from the environment's schema
+    #######
+    response = session.get(tokenManager.apiUrl("/schemas"), headers=tokenManager.authHeaders())
+    if response.status_code != 200:
+        raise P1ApiError(f"Error reading the PingOne schema: {response.status_code} - {response.text}", response.status_code)
+    schemaId = response.json()['_embedded']['schemas'][0]['id']
+
+    response = session.get(tokenManager.apiUrl(f"/schemas/{schemaId}/attributes"), headers=tokenManager.authHeaders())
+    if response.status_code != 200:
+        raise P1ApiError(f"Error reading the PingOne schema attributes: {response.status_code} - {response.text}", response.status_code)
+
+    attributeNames = []
+    for p1Attribute in response.json()['_embedded']['attributes']:
+        if p1Attribute['type'] == "COMPLEX":
+            for subattribute in p1Attribute.get('subAttributes', []):
+                attributeNames.append(p1Attribute['name'] + "." + subattribute['name'])
+        else:
+            attributeNames.append(p1Attribute['name'])
+    return attributeNames
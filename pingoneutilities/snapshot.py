@@ -0,0 +1,144 @@
+# PingOne Utilities - User ID Snapshots
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# A snapshot is the list of user IDs selected for deletion, written before any
+# user is deleted so the deletes never page through a collection that is
+# changing underneath them.
+#
+# File layout: "P1S1", the 16 byte environment ID, then one 16 byte binary
+# UUID per user.  The file is memory-mapped when it is read, so ten million
+# IDs (160 MB on disk) need very little memory.  Delete progress is kept next
+# to the snapshot in <snapshot>.progress as the number of IDs that are done.
+
+import mmap
+import os
+import threading
+import uuid
+
+snapshotMagic = b"P1S1"
+headerSize = 20
+recordSize = 16
+
+class SnapshotError(Exception):
+    #######
+    # A snapshot file that cannot be read
+    #######
+    pass
+
+class SnapshotWriter:
+    #######
+    # Writes IDs to <file>.part and renames it when the scan completes, so a partial scan is never used
+    #######
+
+    def __init__(self, fileName, p1Environment):
+        self.fileName = fileName
+        self.count = 0
+        self.snapshotFile = open(fileName + ".part", "wb")
+        self.snapshotFile.write(snapshotMagic + uuid.UUID(p1Environment).bytes)
+
+    def add(self, userIds):
+        self.snapshotFile.write(b"".join(uuid.UUID(userId).bytes for userId in userIds))
+        self.count += len(userIds)
+
+    def complete(self):
+        self.snapshotFile.close()
+        # Progress kept for an earlier snapshot of the same name does not apply to the new IDs
+        try:
+            os.remove(self.fileName + ".progress")
+        except FileNotFoundError:
+            pass
+        os.replace(self.fileName + ".part", self.fileName)
+
+class SnapshotReader:
+    #######
+    # Memory-mapped view of a completed snapshot
+    #######
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.snapshotFile = open(fileName, "rb")
+        size = os.fstat(self.snapshotFile.fileno()).st_size
+        header = self.snapshotFile.read(headerSize)
+        if len(header) != headerSize or header[:4] != snapshotMagic or (size - headerSize) % recordSize != 0:
+            self.snapshotFile.close()
+            raise SnapshotError(f"{fileName} is not a complete PingOne user snapshot")
+        self.p1Environment = str(uuid.UUID(bytes=header[4:]))
+        self.count = (size - headerSize) // recordSize
+        self.view = mmap.mmap(self.snapshotFile.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def ids(self, start, end):
+        #######
+        # User IDs from position start up to (not including) end
+        #######
+        data = self.view[headerSize + start * recordSize:headerSize + end * recordSize]
+        return [str(uuid.UUID(bytes=data[offset:offset + recordSize])) for offset in range(0, len(data), recordSize)]
+
+    def chunks(self, start, chunkSize):
+        #######
+        # Generator - yield (chunk start, IDs) from start to the end of the snapshot
+        #######
+        for chunkStart in range(start, self.count, chunkSize):
+            yield chunkStart, self.ids(chunkStart, min(chunkStart + chunkSize, self.count))
+
+    def close(self):
+        if self.view is not None:
+            self.view.close()
+        self.snapshotFile.close()
+
+def readProgress(fileName):
+    #######
+    # Number of IDs at the start of the snapshot that are already deleted
+    #######
+    try:
+        with open(fileName + ".progress", "r") as progressFile:
+            return int(progressFile.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+class DeleteWatermark:
+    #######
+    # Tracks chunks of the snapshot as their deletes complete (in any order) and saves the
+    # position below which every ID is done - a resumed run starts exactly there
+    # A chunk with a failed delete never counts as done, so the saved position stops before it
+    # and a resumed run retries it (users already deleted answer 404 and count as deleted)
+    #######
+
+    def __init__(self, fileName, start, chunkSize):
+        self.progressName = fileName + ".progress"
+        self.position = start
+        self.chunkSize = chunkSize
+        self.pending = {}
+        self.finished = {}
+        self.failedChunks = set()
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def chunkStarted(self, chunkStart, size):
+        with self.lock:
+            self.pending[chunkStart] = size
+
+    def userDone(self, chunkStart, deleted=True):
+        with self.lock:
+            if not deleted:
+                self.failedChunks.add(chunkStart)
+                self.failed += 1
+            self.pending[chunkStart] -= 1
+            if self.pending[chunkStart] > 0:
+                return
+            del self.pending[chunkStart]
+            if chunkStart in self.failedChunks:
+                return
+            self.finished[chunkStart] = True
+            advanced = False
+            while self.position in self.finished:
+                del self.finished[self.position]
+                self.position += self.chunkSize
+                advanced = True
+            if advanced:
+                self.save()
+
+    def save(self):
+        with open(self.progressName + ".tmp", "w") as progressFile:
+            progressFile.write(str(self.position))
+        os.replace(self.progressName + ".tmp", self.progressName)
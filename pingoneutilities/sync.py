@@ -0,0 +1,140 @@
+# PingOne Utilities - CSV Sync
+# Last Update: October 19, 2026
+# Authors: Jeremy Carrier
+#
+# Reconciles a CSV feed against the users already in PingOne.  The live side
+# is held as a compact index (username -> user ID, population ID and a hash of
+# the compared attributes) and each CSV row is probed against it, so only the
+# creates, attribute updates, population moves and deletes need to be sent.
+
+import hashlib
+import json
+
+from pingoneutilities.payload import flattenUser, userSpecialFields, writeOnlyAttributes
+
+# Attributes never compared - passwords and the MFA import attributes cannot be read back, and population is compared separately
+notCompared = (userSpecialFields - {"enabled"}) | writeOnlyAttributes
+
+def comparedNames(importHeaders):
+    #######
+    # Dotted attribute names included in the hash, in a fixed order
+    #######
+    return sorted({header for header in importHeaders if header not in notCompared})
+
+def projectionAttributes(names):
+    #######
+    # Top-level attributes to request when reading the live users
+    #######
+    return sorted({name.split(".")[0] for name in names} | {"username", "population"})
+
+def normalizeValue(value):
+    #######
+    # Text form of a value so a CSV string and the same typed value from PingOne hash the same
+    #######
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    return str(value).strip()
+
+def attributeHash(flatUser, names):
+    #######
+    # 16 byte hash of the compared attributes of a flattened user
+    #######
+    hashInput = "\x1f".join(normalizeValue(flatUser.get(name)) for name in names)
+    return hashlib.blake2b(hashInput.encode("utf-8"), digest_size=16).digest()
+
+def patchBody(user, flatUser, names):
+    #######
+    # Body for a PATCH - the import body without password, population and the import-only attributes, with emptied attributes set to null
+    #######
+    body = {key: value for key, value in user.items() if key not in ("password", "population") and key not in writeOnlyAttributes}
+    for name in names:
+        if name in flatUser:
+            continue
+        parts = name.split(".")
+        d = body
+        for part in parts[:-1]:
+            if part not in d or not isinstance(d[part], dict):
+                d[part] = {}
+            d = d[part]
+        d[parts[-1]] = None
+    return body
+
+class LiveIndex:
+    #######
+    # Compact index of the live users, keyed by lower case username
+    #######
+
+    def __init__(self, names):
+        self.names = names
+        self.users = {}
+        self.seen = set()
+
+    def addPage(self, users):
+        for user in users:
+            username = user.get('username')
+            if not username:
+                continue
+            self.users[username.lower()] = (user['id'], user.get('population', {}).get('id', ""), attributeHash(flattenUser(user), self.names))
+
+    def classify(self, user):
+        #######
+        # Compare one import body with the live user
+        # Returns (user ID or None for a create, attributes changed, population changed, flattened user)
+        #######
+        flatUser = flattenUser(user)
+        username = str(user.get('username', "")).lower()
+        self.seen.add(username)
+        liveUser = self.users.get(username)
+        if liveUser is None:
+            return None, True, False, flatUser
+        userId, populationId, liveHash = liveUser
+        attributesChanged = attributeHash(flatUser, self.names) != liveHash
+        populationChanged = user['population']['id'] != populationId
+        return userId, attributesChanged, populationChanged, flatUser
+
+    def unmatched(self):
+        #######
+        # Live users that were not in the feed - returns [(username, user ID)]
+        #######
+        return [(username, liveUser[0]) for username, liveUser in self.users.items() if username not in self.seen]
+
+class SyncSummary:
+    #######
+    # Counts and a few example usernames for each change set
+    #######
+
+    sampleSize = 5
+
+    def __init__(self):
+        self.counts = {"create": 0, "update": 0, "move": 0, "delete": 0, "unchanged": 0}
+        self.samples = {changeType: [] for changeType in self.counts}
+        # Results of the deletes that were sent, kept apart from the import totals
+        self.deleted = 0
+        self.deleteFailed = 0
+
+    def add(self, changeType, username):
+        self.counts[changeType] += 1
+        if len(self.samples[changeType]) < self.sampleSize:
+            self.samples[changeType].append(username)
+
+    def addDeleteResult(self, deleted):
+        if deleted:
+            self.deleted += 1
+        else:
+            self.deleteFailed += 1
+
+    def lines(self):
+        labels = {"create": "Users to create", "update": "Users to update", "move": "Users to move to another population", "delete": "Users to delete", "unchanged": "Users unchanged"}
+        summaryLines = []
+        for changeType, label in labels.items():
+            line = f"{label}: {self.counts[changeType]}"
+            if self.samples[changeType] and changeType != "unchanged":
+                line += f" (e.g. {', '.join(self.samples[changeType])})"
+            summaryLines.append(line)
+        if self.deleted or self.deleteFailed:
+            summaryLines.append(f"Users deleted: {self.deleted}, delete failed: {self.deleteFailed}")
+        return summaryLines